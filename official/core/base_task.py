@@ -232,7 +232,9 @@ class Task(tf.Module, metaclass=abc.ABCMeta):
     Args:
       inputs: a dictionary of input tensors.
       model: the model, forward pass definition.
-      optimizer: the optimizer for this training step.
+      optimizer: the optimizer for this training step. With gradient
+        accumulation, it only updates the model once every
+        `gradient_accumulation_steps` calls.
       metrics: a nested structure of metrics objects.
 
     Returns:
@@ -193,7 +193,16 @@ class Trainer(_AsyncTrainer):
                  ) and not self._optimizer.has_shadow_copy:
       self._optimizer.shadow_copy(self._model)
 
-    # global_step increases by 1 after each training iteration.
+    # With gradient accumulation, the task is given an optimizer that applies
+    # the gradients of `self.optimizer` once every
+    # `gradient_accumulation_steps` micro-batches.
+    self._gradient_accumulation_steps = (
+        config.trainer.gradient_accumulation_steps)
+    self._train_optimizer = optimization.add_gradient_accumulation(
+        self._optimizer, self._gradient_accumulation_steps)
+
+    # global_step increases by 1 after each training iteration, i.e. after
+    # each optimizer update when gradients are accumulated.
     # We should have global_step.numpy() == self.optimizer.iterations.numpy()
     # when there is only 1 optimizer.
     self._global_step = orbit.utils.create_global_step()
@@ -201,6 +210,10 @@ class Trainer(_AsyncTrainer):
       checkpoint_items = self.model.checkpoint_items
     else:
       checkpoint_items = {}
+    if self._train_optimizer is not self._optimizer:
+      # Tracks the loss scale of the new `LossScaleOptimizer`, if any.
+      checkpoint_items = dict(
+          checkpoint_items, train_optimizer=self._train_optimizer)
     self._checkpoint = tf.train.Checkpoint(
         global_step=self.global_step,
         model=self.model,
@@ -381,9 +394,16 @@ class Trainer(_AsyncTrainer):
     return next(iterator)
 
   def train_step(self, iterator):
-    """See base class."""
+    """See base class.
 
-    def step_fn(inputs):
+    With `gradient_accumulation_steps` N > 1, a train step runs the task train
+    step on N micro-batches and updates the model and `global_step` once.
+
+    Args:
+      iterator: Dataset iterator to generate the inputs from.
+    """
+
+    def step_fn(inputs, increment_global_step=True):
       if self.config.runtime.enable_xla and (self.config.runtime.num_gpus > 0):
         task_train_step = tf.function(self.task.train_step, jit_compile=True)
       else:
@@ -391,11 +411,19 @@ class Trainer(_AsyncTrainer):
       logs = task_train_step(
           inputs,
           model=self.model,
-          optimizer=self.optimizer,
+          optimizer=self._train_optimizer,
           metrics=self.train_metrics)
       self._train_loss.update_state(logs[self.task.loss])
-      self.global_step.assign_add(1)
-
+      if increment_global_step:
+        self.global_step.assign_add(1)
+
+    if self._gradient_accumulation_steps > 1:
+      # Accumulates the gradients of all the micro-batches but the last one,
+      # which applies them.
+      for _ in tf.range(self._gradient_accumulation_steps - 1):
+        inputs = self.next_train_inputs(iterator)
+        self.strategy.run(
+            step_fn, args=(inputs, False), options=self._runtime_options)
     inputs = self.next_train_inputs(iterator)
     self.strategy.run(step_fn, args=(inputs,), options=self._runtime_options)
 
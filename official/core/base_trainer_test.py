@@ -326,6 +326,39 @@ class TrainerTest(tf.test.TestCase, parameterized.TestCase):
     metrics = trainer.train(tf.convert_to_tensor(5, dtype=tf.int32))
     self.assertIn('training_loss', metrics)
 
+  @combinations.generate(
+      combinations.combine(
+          distribution=[
+              strategy_combinations.default_strategy,
+              strategy_combinations.cloud_tpu_strategy,
+              strategy_combinations.one_device_strategy_gpu,
+          ],
+          mixed_precision_dtype=['float32', 'float16'],
+          use_ema=[False, True],
+      ))
+  def test_trainer_gradient_accumulation(self, distribution,
+                                         mixed_precision_dtype, use_ema):
+    config = cfg.ExperimentConfig(
+        runtime=cfg.RuntimeConfig(mixed_precision_dtype=mixed_precision_dtype),
+        trainer=cfg.TrainerConfig(
+            gradient_accumulation_steps=3,
+            optimizer_config=cfg.OptimizationConfig({
+                'optimizer': {
+                    'type': 'sgd'
+                },
+                'ema': {'average_decay': 0.9} if use_ema else None,
+                'learning_rate': {
+                    'type': 'constant'
+                },
+            })))
+    with distribution.scope():
+      trainer = self.create_test_trainer(config)
+      metrics = trainer.train(tf.convert_to_tensor(4, dtype=tf.int32))
+    self.assertIn('training_loss', metrics)
+    # Each train step runs 3 micro-batches and applies the gradients once.
+    self.assertEqual(trainer.global_step.numpy(), 4)
+    self.assertEqual(trainer.optimizer.iterations.numpy(), 4)
+
   def test_export_best_ckpt(self):
     config = cfg.ExperimentConfig(
         trainer=cfg.TrainerConfig(
@@ -51,6 +51,18 @@ class DataConfig(base_config.Config):
       dataset after applying the decode_fn and parse_fn. It can be used to avoid
       re-reading from disk, re-decoding and re-parsing the example on the second
       epoch, but it requires significant memory overhead.
+    cache_dir: An optional directory to persistently cache the dataset examples
+      in, after applying the decode_fn and parse_fn. The examples are written to
+      a subdirectory named after a fingerprint of the input files, this config
+      and the settings bound to the decode and parse functions, so a changed
+      input or setting is written to a new subdirectory, and a restarted or
+      repeated job with the same settings reads the cached examples instead of
+      decoding and parsing them again. The fingerprint does not cover the
+      preprocessing code: change `cache_version` after changing it. Like
+      `cache`, it freezes any random preprocessing done by the parse_fn.
+    cache_version: A string that is part of the fingerprint of `cache_dir`.
+      Changing it, e.g. after changing the decoding or parsing code, writes
+      the examples to a new subdirectory.
     cycle_length: The number of files that will be processed concurrently when
       interleaving files.
     block_length: The number of consecutive elements to produce from each input
@@ -117,6 +129,8 @@ class DataConfig(base_config.Config):
   drop_remainder: bool = True
   shuffle_buffer_size: int = 100
   cache: bool = False
+  cache_dir: str = ""
+  cache_version: str = ""
   cycle_length: Optional[int] = None
   block_length: int = 1
   ram_budget: Optional[int] = None
@@ -247,6 +261,11 @@ class TrainerConfig(base_config.Config):
     validation_summary_subdir: A 'str', sub directory for saving eval summary.
     preemption_on_demand_checkpoint: whether or not to save on-demand
       checkpoints after a preemption.
+    gradient_accumulation_steps: the number of micro-batches to accumulate the
+      gradients of before each optimizer update. Each train step then reads
+      this many batches of `task.train_data.global_batch_size` examples, and
+      `train_steps`, `steps_per_loop` and the intervals keep counting optimizer
+      updates. Requires a legacy optimizer.
   """
   optimizer_config: OptimizationConfig = dataclasses.field(
       default_factory=OptimizationConfig
@@ -283,6 +302,7 @@ class TrainerConfig(base_config.Config):
   validation_summary_subdir: str = "validation"
   # Preemption on-demand checkpoint.
   preemption_on_demand_checkpoint: bool = True  # copybara-replace
+  gradient_accumulation_steps: int = 1
 
 
 @dataclasses.dataclass
@@ -0,0 +1,129 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Library to benchmark the input pipeline of a task without a model."""
+
+import os
+import time
+from typing import Dict, Optional
+
+from absl import logging
+import numpy as np
+import orbit
+import tensorflow as tf, tf_keras
+
+from official.core import base_task
+from official.core import config_definitions
+
+
+def _cpu_seconds() -> float:
+  """Returns the user and system CPU seconds used by this process."""
+  times = os.times()
+  return times.user + times.system
+
+
+def run_input_benchmark(
+    task: base_task.Task,
+    data_config: config_definitions.DataConfig,
+    num_batches: int,
+    num_warmup_batches: int = 10,
+    strategy: Optional[tf.distribute.Strategy] = None,
+    profile_dir: Optional[str] = None,
+    log_every_n_batches: int = 100) -> Dict[str, float]:
+  """Runs only the input pipeline of `task` and measures its throughput.
+
+  The dataset is built with `task.build_inputs(data_config)`, distributed by
+  `strategy` the same way the trainer does, and iterated on the host. The first
+  `num_warmup_batches` batches, which include opening the files and filling the
+  shuffle and prefetch buffers, are excluded from the throughput numbers.
+
+  Per-stage latencies (read, decode, parse, batch) are not measured here: with
+  `profile_dir` set, a `tf.profiler` trace of the measured batches is captured,
+  and the tf.data bottleneck analysis of the TensorBoard profile plugin reports
+  the latency of every iterator of the pipeline.
+
+  Args:
+    task: The task to build the inputs with.
+    data_config: The `DataConfig` to build the inputs from, e.g.
+      `params.task.train_data`.
+    num_batches: The number of batches to measure.
+    num_warmup_batches: The number of batches to read before measuring.
+    strategy: The `tf.distribute.Strategy` to distribute the dataset with. If
+      `None`, the current strategy is used.
+    profile_dir: Optional directory to write a profiler trace of the measured
+      batches to.
+    log_every_n_batches: The interval, in batches, to log the progress at.
+
+  Returns:
+    A dictionary with the number of measured batches and examples, the
+    throughput in batches and examples per second, the warmup time, the
+    p50/p90/p99 latencies of getting a batch in milliseconds, and the CPU
+    utilization as the fraction of all cores used by this process.
+
+  Raises:
+    ValueError: If `num_batches` is not positive.
+  """
+  if num_batches <= 0:
+    raise ValueError(f'`num_batches` must be positive, got {num_batches}.')
+  strategy = strategy or tf.distribute.get_strategy()
+  dataset = orbit.utils.make_distributed_dataset(strategy, task.build_inputs,
+                                                 data_config)
+  iterator = iter(dataset)
+
+  start = time.perf_counter()
+  for _ in range(num_warmup_batches):
+    next(iterator)
+  warmup_seconds = time.perf_counter() - start
+
+  if profile_dir:
+    tf.profiler.experimental.start(profile_dir)
+  latencies = []
+  start_cpu = _cpu_seconds()
+  start = time.perf_counter()
+  try:
+    for i in range(num_batches):
+      batch_start = time.perf_counter()
+      try:
+        next(iterator)
+      except (StopIteration, tf.errors.OutOfRangeError):
+        logging.warning('The dataset ended after %d measured batches.', i)
+        break
+      latencies.append(time.perf_counter() - batch_start)
+      if log_every_n_batches and (i + 1) % log_every_n_batches == 0:
+        logging.info('Read %d/%d batches, %.2f batches/sec.', i + 1,
+                     num_batches, (i + 1) / (time.perf_counter() - start))
+  finally:
+    if profile_dir:
+      tf.profiler.experimental.stop()
+  elapsed = time.perf_counter() - start
+  cpu_seconds = _cpu_seconds() - start_cpu
+
+  if not latencies:
+    raise ValueError('The dataset ended before any batch was measured.')
+  latencies_ms = np.asarray(latencies) * 1000.0
+  num_measured = len(latencies)
+  num_examples = num_measured * data_config.global_batch_size
+  results = {
+      'num_batches': num_measured,
+      'num_examples': num_examples,
+      'batches_per_sec': num_measured / elapsed,
+      'examples_per_sec': num_examples / elapsed,
+      'warmup_sec': warmup_seconds,
+      'batch_latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+      'batch_latency_p90_ms': float(np.percentile(latencies_ms, 90)),
+      'batch_latency_p99_ms': float(np.percentile(latencies_ms, 99)),
+      'cpu_utilization': cpu_seconds / elapsed / (os.cpu_count() or 1),
+  }
+  logging.info('Input benchmark results: %s', results)
+  return results
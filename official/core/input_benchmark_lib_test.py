@@ -0,0 +1,57 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for input_benchmark_lib."""
+
+import tensorflow as tf, tf_keras
+
+from official.core import config_definitions as cfg
+from official.core import input_benchmark_lib
+from official.utils.testing import mock_task
+
+
+class InputBenchmarkLibTest(tf.test.TestCase):
+
+  def test_run_input_benchmark(self):
+    task = mock_task.MockTask()
+    data_config = cfg.DataConfig(global_batch_size=2)
+    results = input_benchmark_lib.run_input_benchmark(
+        task, data_config, num_batches=5, num_warmup_batches=2)
+    self.assertEqual(results['num_batches'], 5)
+    self.assertEqual(results['num_examples'], 10)
+    self.assertGreater(results['examples_per_sec'], 0)
+    self.assertLessEqual(results['batch_latency_p50_ms'],
+                         results['batch_latency_p99_ms'])
+    self.assertGreaterEqual(results['cpu_utilization'], 0)
+
+  def test_run_input_benchmark_with_finite_dataset(self):
+
+    class FiniteTask(mock_task.MockTask):
+
+      def build_inputs(self, params):
+        return tf.data.Dataset.range(3).batch(1)
+
+    results = input_benchmark_lib.run_input_benchmark(
+        FiniteTask(), cfg.DataConfig(global_batch_size=1), num_batches=10,
+        num_warmup_batches=1)
+    self.assertEqual(results['num_batches'], 2)
+
+  def test_invalid_num_batches(self):
+    with self.assertRaisesRegex(ValueError, 'num_batches'):
+      input_benchmark_lib.run_input_benchmark(
+          mock_task.MockTask(), cfg.DataConfig(), num_batches=0)
+
+
+if __name__ == '__main__':
+  tf.test.main()
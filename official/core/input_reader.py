@@ -14,7 +14,12 @@
 
 """A common dataset reader."""
 import dataclasses
+import functools
+import hashlib
+import json
+import os
 import random
+import re
 from typing import Any, Callable, Dict, List, Optional, Sequence, Text, Union
 
 from absl import logging
@@ -35,6 +40,84 @@ def _maybe_map_fn(dataset: tf.data.Dataset,
       fn, num_parallel_calls=tf.data.experimental.AUTOTUNE)
 
 
+# The `DataConfig` fields that do not change the examples written to the
+# persistent cache, and are therefore left out of its fingerprint.
+_CACHE_INDEPENDENT_FIELDS = (
+    'global_batch_size', 'drop_remainder', 'shuffle_buffer_size', 'cache',
+    'cache_dir', 'ram_budget', 'deterministic', 'enable_tf_data_service',
+    'tf_data_service_address', 'tf_data_service_job_name',
+    'enable_shared_tf_data_service_between_parallel_trainers',
+    'apply_tf_data_service_before_batching', 'trainer_id',
+    'prefetch_buffer_size', 'autotune_algorithm')
+
+
+def _closure_value_settings(value: Any) -> str:
+  """Returns a string identifying a value that a function closes over.
+
+  E.g. `Parser.parse_fn(is_training)` returns a closure over the parser, whose
+  settings are its attributes.
+
+  Args:
+    value: The contents of a closure cell.
+
+  Returns:
+    A string identifying `value`.
+  """
+  if value is None or isinstance(
+      value, (bool, int, float, complex, str, bytes, list, tuple, dict, set,
+              frozenset)):
+    return repr(value)
+  if callable(value):
+    return _fn_settings(value)
+  if hasattr(value, '__dict__'):
+    return '|'.join([
+        type(value).__module__, type(value).__qualname__,
+        repr(sorted(vars(value).items()))
+    ])
+  return repr(value)
+
+
+def _fn_settings(fn: Optional[Callable[..., Any]]) -> str:
+  """Returns a string identifying `fn` and the settings bound to it.
+
+  The string covers the name of `fn`, the values it closes over and, for bound
+  methods and callable objects, the attributes of the object, e.g. the
+  settings of a `Parser`. It does not cover the code of `fn` or of the
+  functions it calls. Memory addresses are removed from the object reprs so
+  that the string is the same across processes.
+
+  Args:
+    fn: A function, `functools.partial`, bound method or callable object.
+
+  Returns:
+    A string identifying `fn`.
+  """
+  if fn is None:
+    return 'None'
+  if isinstance(fn, functools.partial):
+    parts = [
+        'partial', _fn_settings(fn.func),
+        repr(fn.args), repr(sorted(fn.keywords.items()))
+    ]
+  else:
+    parts = [
+        getattr(fn, '__module__', None) or type(fn).__module__,
+        getattr(fn, '__qualname__', None) or type(fn).__qualname__
+    ]
+    owner = getattr(fn, '__self__', None)
+    if owner is None and not hasattr(fn, '__code__'):
+      # A callable object.
+      owner = fn
+    if owner is not None:
+      parts.append(repr(sorted(getattr(owner, '__dict__', {}).items())))
+    for cell in getattr(fn, '__closure__', None) or ():
+      try:
+        parts.append(_closure_value_settings(cell.cell_contents))
+      except ValueError:  # An empty cell.
+        parts.append('<empty>')
+  return re.sub(r' at 0x[0-9a-fA-F]+', '', '|'.join(parts))
+
+
 def match_files(input_path: Union[Sequence[str], str]) -> List[str]:
   """Matches files from an input_path."""
   matched_files = []
@@ -291,6 +374,8 @@ class InputReader:
     self._drop_remainder = params.drop_remainder
     self._shuffle_buffer_size = params.shuffle_buffer_size
     self._cache = params.cache
+    self._cache_dir = params.cache_dir
+    self._params = params
     self._cycle_length = params.cycle_length
     self._block_length = params.block_length
     self._deterministic = params.deterministic
@@ -355,6 +440,61 @@ class InputReader:
         self._tf_data_service_job_name = (
             f'{params.tf_data_service_job_name}_{self.static_randnum}')
 
+  @property
+  def _caches_dataset(self) -> bool:
+    """Whether the parsed dataset is cached in memory or on disk."""
+    return self._cache or bool(self._cache_dir)
+
+  def _get_cache_path(
+      self, input_context: Optional[tf.distribute.InputContext] = None) -> str:
+    """Returns the directory to persistently cache the parsed dataset in.
+
+    The directory is named after a fingerprint of the input files with their
+    sizes and modification times, the data config including `cache_version`,
+    the names and bound settings of the decode, combine, sample, parse and
+    filter functions, and the input pipeline that reads them. The code of these
+    functions and of the helpers they call is not part of the fingerprint, so
+    a change of the preprocessing code requires a new `cache_version`.
+
+    Args:
+      input_context: The `tf.distribute.InputContext` of the input pipeline.
+
+    Returns:
+      A subdirectory of `cache_dir`.
+    """
+    params = {
+        k: v for k, v in self._params.as_dict().items()
+        if k not in _CACHE_INDEPENDENT_FIELDS
+    }
+    files = []
+    if self._matched_files:
+      matched_files = self._matched_files
+      if isinstance(matched_files, dict):
+        matched_files = [f for k in sorted(matched_files)
+                         for f in matched_files[k]]
+      for f in matched_files:
+        stat = tf.io.gfile.stat(f)
+        files.append((f, stat.length, stat.mtime_nsec))
+    if input_context:
+      input_pipeline = (input_context.input_pipeline_id,
+                        input_context.num_input_pipelines)
+    else:
+      input_pipeline = None
+    fingerprint = {
+        'params': params,
+        'files': files,
+        'input_pipeline': input_pipeline,
+        'fns': [
+            _fn_settings(fn) for fn in (
+                self._dataset_fn, self._decoder_fn, self._combine_fn,
+                self._sample_fn, self._parser_fn, self._filter_fn)
+        ],
+    }
+    key = hashlib.sha256(
+        json.dumps(fingerprint, sort_keys=True, default=repr).encode('utf-8')
+    ).hexdigest()[:16]
+    return os.path.join(self._cache_dir, key)
+
   def get_files(self, input_path):
     """Gets matched files. Can be overridden by subclasses."""
     if not input_path:
@@ -394,7 +534,7 @@ class InputReader:
               dataset_fn,
               input_context,
               sharding=self._sharding,
-              repeat=self._is_training and not self._cache)
+              repeat=self._is_training and not self._caches_dataset)
         else:
           return _shard_files_then_read(
               files,
@@ -403,7 +543,7 @@ class InputReader:
               seed=self._seed,
               is_training=self._is_training,
               sharding=self._sharding,
-              cache=self._cache,
+              cache=self._caches_dataset,
               cycle_length=self._cycle_length,
               block_length=self._block_length,
               deterministic=self._deterministic)
@@ -413,7 +553,7 @@ class InputReader:
             dataset_fn,
             input_context,
             sharding=self._sharding,
-            repeat=self._is_training and not self._cache)
+            repeat=self._is_training and not self._caches_dataset)
       else:
         raise ValueError('It is unexpected that `tfds_builder` is None and '
                          'there is also no `files`.')
@@ -431,7 +571,7 @@ class InputReader:
               input_context=input_context,
               seed=self._seed,
               is_training=self._is_training,
-              cache=self._cache,
+              cache=self._caches_dataset,
               cycle_length=self._cycle_length,
               block_length=self._block_length)
       else:
@@ -444,7 +584,7 @@ class InputReader:
             input_context=input_context,
             seed=self._seed,
             is_training=self._is_training,
-            cache=self._cache,
+            cache=self._caches_dataset,
             cycle_length=self._cycle_length,
             block_length=self._block_length)
     elif isinstance(matched_files, (list, tuple)):
@@ -468,7 +608,7 @@ class InputReader:
 
     def _shuffle_and_decode(ds):
       # If cache is enabled, we will call `shuffle()` later after `cache()`.
-      if self._is_training and not self._cache:
+      if self._is_training and not self._caches_dataset:
         ds = ds.shuffle(self._shuffle_buffer_size, seed=self._seed)
       # Decode
       ds = _maybe_map_fn(ds, self._decoder_fn)
@@ -485,8 +625,13 @@ class InputReader:
     if self._filter_fn is not None:
       dataset = dataset.filter(self._filter_fn)
 
+    if self._cache_dir:
+      cache_path = self._get_cache_path(input_context)
+      logging.info('Caching the parsed dataset in %s.', cache_path)
+      dataset = dataset.snapshot(cache_path, compression='AUTO')
     if self._cache:
       dataset = dataset.cache()
+    if self._caches_dataset:
       if self._is_training:
         dataset = dataset.repeat()
         dataset = dataset.shuffle(self._shuffle_buffer_size, seed=self._seed)
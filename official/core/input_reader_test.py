@@ -0,0 +1,158 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the persistent cache of input_reader."""
+
+import os
+
+from absl.testing import parameterized
+import tensorflow as tf, tf_keras
+
+from official.core import config_definitions as cfg
+from official.core import input_reader
+
+# pylint: disable=protected-access
+
+
+def _decode(serialized_example):
+  return tf.io.parse_single_example(
+      serialized_example, {'x': tf.io.FixedLenFeature([], tf.float32)})
+
+
+class _Parser:
+  """A parser with a setting that changes the parsed examples."""
+
+  def __init__(self, scale):
+    self._scale = scale
+
+  def parse_fn(self, decoded_tensors):
+    return decoded_tensors['x'] * self._scale
+
+
+class _ClosureParser:
+  """A parser whose `parse_fn` returns a closure, as `parser.Parser` does."""
+
+  def __init__(self, scale):
+    self._scale = scale
+
+  def parse_fn(self, is_training):
+    del is_training
+
+    def parse(decoded_tensors):
+      return decoded_tensors['x'] * self._scale
+
+    return parse
+
+
+class InputReaderCacheTest(tf.test.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self._input_path = os.path.join(self.get_temp_dir(), 'data.tfrecord')
+    with tf.io.TFRecordWriter(self._input_path) as writer:
+      for x in range(4):
+        writer.write(
+            tf.train.Example(
+                features=tf.train.Features(
+                    feature={
+                        'x': tf.train.Feature(
+                            float_list=tf.train.FloatList(value=[x]))
+                    })).SerializeToString())
+    self._cache_dir = os.path.join(self.get_temp_dir(), 'cache')
+
+  def _create_reader(self, scale=1.0, parser_fn=None, **kwargs):
+    params = dict(
+        input_path=self._input_path,
+        global_batch_size=2,
+        is_training=False,
+        cache_dir=self._cache_dir)
+    params.update(kwargs)
+    return input_reader.InputReader(
+        cfg.DataConfig(**params),
+        decoder_fn=_decode,
+        parser_fn=parser_fn or _Parser(scale).parse_fn)
+
+  def _get_cache_path(self, **kwargs):
+    return self._create_reader(**kwargs)._get_cache_path()
+
+  def test_same_config_reuses_cache_path(self):
+    cache_path = self._get_cache_path()
+    self.assertEqual(os.path.dirname(cache_path), self._cache_dir)
+    self.assertEqual(cache_path, self._get_cache_path())
+
+  def test_read_writes_cache(self):
+    reader = self._create_reader()
+    batches = [batch.numpy().tolist() for batch in reader.read()]
+    self.assertEqual(batches, [[0., 1.], [2., 3.]])
+    self.assertTrue(tf.io.gfile.exists(reader._get_cache_path()))
+
+    # A new reader reads the same examples from the cache.
+    batches = [batch.numpy().tolist() for batch in self._create_reader().read()]
+    self.assertEqual(batches, [[0., 1.], [2., 3.]])
+
+  def test_parser_setting_changes_cache_path(self):
+    self.assertNotEqual(
+        self._get_cache_path(scale=1.0), self._get_cache_path(scale=2.0))
+
+  def test_closure_parser_setting_changes_cache_path(self):
+    cache_path = self._get_cache_path(
+        parser_fn=_ClosureParser(1.0).parse_fn(is_training=False))
+    self.assertEqual(
+        cache_path,
+        self._get_cache_path(
+            parser_fn=_ClosureParser(1.0).parse_fn(is_training=False)))
+    self.assertNotEqual(
+        cache_path,
+        self._get_cache_path(
+            parser_fn=_ClosureParser(2.0).parse_fn(is_training=False)))
+
+  def test_input_file_mtime_changes_cache_path(self):
+    cache_path = self._get_cache_path()
+    stat = os.stat(self._input_path)
+    os.utime(self._input_path,
+             ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    self.assertNotEqual(cache_path, self._get_cache_path())
+
+  @parameterized.parameters(
+      ('cache_version', 'v2'),
+      ('seed', 1),
+      ('cycle_length', 2),
+  )
+  def test_config_field_changes_cache_path(self, field, value):
+    self.assertNotEqual(self._get_cache_path(),
+                        self._get_cache_path(**{field: value}))
+
+  @parameterized.parameters(
+      ('global_batch_size', 4),
+      ('drop_remainder', False),
+      ('shuffle_buffer_size', 1000),
+      ('cache', True),
+      ('deterministic', True),
+      ('prefetch_buffer_size', 8),
+  )
+  def test_cache_independent_field_keeps_cache_path(self, field, value):
+    self.assertIn(field, input_reader._CACHE_INDEPENDENT_FIELDS)
+    self.assertEqual(self._get_cache_path(),
+                     self._get_cache_path(**{field: value}))
+
+  def test_cache_dir_is_not_part_of_the_key(self):
+    cache_path = self._get_cache_path()
+    other_cache_path = self._get_cache_path(
+        cache_dir=os.path.join(self.get_temp_dir(), 'other_cache'))
+    self.assertEqual(
+        os.path.basename(cache_path), os.path.basename(other_cache_path))
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -19,6 +19,8 @@ from official.modeling.optimization.configs.learning_rate_config import *
 from official.modeling.optimization.configs.optimization_config import *
 from official.modeling.optimization.configs.optimizer_config import *
 from official.modeling.optimization.ema_optimizer import ExponentialMovingAverage
+from official.modeling.optimization.gradient_accumulation_optimizer import add_gradient_accumulation
+from official.modeling.optimization.gradient_accumulation_optimizer import GradientAccumulationOptimizer
 from official.modeling.optimization.lr_schedule import *
 from official.modeling.optimization.optimizer_factory import OptimizerFactory
 from official.modeling.optimization.optimizer_factory import register_optimizer_cls
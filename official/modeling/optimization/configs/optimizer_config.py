@@ -256,12 +256,16 @@ class EMAConfig(BaseOptimizerConfig):
     average_decay: 'float', average decay value.
     start_step: 'int', start step to apply moving average.
     dynamic_decay: 'bool', whether to apply dynamic decay or not.
+    fused_update: 'bool', whether to keep the averages of each dtype in a
+      single flat buffer updated with one fused op per dtype. Checkpoints are
+      not compatible between fused and non-fused averages.
   """
   name: str = "ExponentialMovingAverage"
   trainable_weights_only: bool = True
   average_decay: float = 0.99
   start_step: int = 0
   dynamic_decay: bool = True
+  fused_update: bool = False
 
 
 @dataclasses.dataclass
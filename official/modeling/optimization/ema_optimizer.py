@@ -48,6 +48,20 @@ def maybe_merge_call(fn, strategy, *args, **kwargs):
     return fn(strategy, *args, **kwargs)
 
 
+def _flatten(tensors: List[tf.Tensor]) -> tf.Tensor:
+  """Concatenates the flattened `tensors` into a single 1D tensor."""
+  return tf.concat([tf.reshape(t, [-1]) for t in tensors], axis=0)
+
+
+def _unflatten(flat: tf.Tensor, like: List[tf.Variable]) -> List[tf.Tensor]:
+  """Splits a flat tensor from `_flatten` back into tensors shaped as `like`."""
+  sizes = [v.shape.num_elements() for v in like]
+  return [
+      tf.reshape(t, v.shape)
+      for t, v in zip(tf.split(flat, sizes, axis=0), like)
+  ]
+
+
 class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
   """Optimizer that computes an exponential moving average of the variables.
 
@@ -71,6 +85,13 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
   # Test eval the model here
   opt.swap_weights()
   ```
+
+  With `fused_update=True`, the averages of all the variables of a dtype are
+  stored in a single flat buffer, and every step updates each buffer with a
+  handful of ops instead of updating every variable separately. The averages
+  are then checkpointed as `average_<dtype>` weights of this optimizer instead
+  of per-variable `average` slots, so checkpoints are not interchangeable
+  between the two modes.
   """
 
   def __init__(self,
@@ -79,6 +100,7 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
                average_decay: float = 0.99,
                start_step: int = 0,
                dynamic_decay: bool = True,
+               fused_update: bool = False,
                name: str = 'ExponentialMovingAverage',
                **kwargs):
     """Construct a new ExponentialMovingAverage optimizer.
@@ -96,6 +118,9 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
         of optimizer updates. Decay will start at 0.1 and gradually increase
         up to `average_decay` after each optimizer update. This behavior is
         similar to `tf.train.ExponentialMovingAverage` in TF 1.x.
+      fused_update: bool. Whether to store the averages of the variables of
+        each dtype in a single flat buffer and update them with one fused
+        update per dtype, instead of one update per variable.
       name: Optional name for the operations created when applying
         gradients. Defaults to "moving_average".
       **kwargs: keyword arguments. Allowed to be {`clipnorm`,
@@ -106,10 +131,13 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
     self._trainable_weights_only = trainable_weights_only
     self._start_step = tf.constant(start_step, tf.float32)
     self._dynamic_decay = dynamic_decay
+    self._fused_update = fused_update
     self._optimizer = optimizer
     self._track_trackable(self._optimizer, 'ema_base_optimizer')
     self._average_weights = None
     self._model_weights = None
+    # The model weights averaged in each flat buffer when `fused_update`.
+    self._fused_model_weights = None
 
   def shadow_copy(self, model: tf_keras.Model):
     """Creates shadow variables for the given model weights."""
@@ -118,6 +146,22 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
       self._model_weights = model.trainable_variables
     else:
       self._model_weights = model.variables
+
+    if self._fused_update:
+      groups = {}
+      for var in self._model_weights:
+        groups.setdefault(var.dtype.base_dtype, []).append(var)
+      self._fused_model_weights = list(groups.values())
+      self._average_weights = [
+          self.add_weight(
+              f'average_{dtype.name}',
+              shape=[sum(v.shape.num_elements() for v in variables)],
+              dtype=dtype,
+              initializer='zeros',
+              trainable=False) for dtype, variables in groups.items()
+      ]
+      return
+
     for var in self._model_weights:
       self.add_slot(var, 'average', initializer='zeros')
 
@@ -133,8 +177,14 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
   def _create_slots(self, var_list):
     self._optimizer._create_slots(var_list=var_list)  # pylint: disable=protected-access
 
-  def apply_gradients(self, grads_and_vars, name: Optional[str] = None):
-    result = self._optimizer.apply_gradients(grads_and_vars, name)
+  def apply_gradients(self,
+                      grads_and_vars,
+                      name: Optional[str] = None,
+                      experimental_aggregate_gradients: bool = True):
+    result = self._optimizer.apply_gradients(
+        grads_and_vars,
+        name,
+        experimental_aggregate_gradients=experimental_aggregate_gradients)
     maybe_merge_call(self.update_average, tf.distribute.get_strategy())
     return result
 
@@ -155,6 +205,17 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
       average.assign_sub(tf.cast(1.0 - decay, average.dtype) * diff)
       return average
 
+    def _apply_fused_moving(average, normals):
+      return _apply_moving(average, _flatten(normals))
+
+    if self._fused_update:
+      for average, normals in zip(self._average_weights,
+                                  self._fused_model_weights):
+        strategy.extended.update(
+            average, _apply_fused_moving, args=(normals,), group=False
+        )
+      return
+
     # Update moving average with the latest value.
     for average, normal in zip(self._average_weights, self._model_weights):
       strategy.extended.update(
@@ -189,8 +250,29 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
       a.assign_sub(b)
       return a
 
+    def fused_fn_0(a, bs):
+      a.assign_add(_flatten(bs))
+      return a
+    def fused_fn_1(b, a, offset):
+      size = b.shape.num_elements()
+      b.assign(tf.reshape(a[offset:offset + size], b.shape) - b)
+      return b
+    def fused_fn_2(a, bs):
+      a.assign_sub(_flatten(bs))
+      return a
+
     def _swap(strategy, a_and_b):
       """Swap `a` and `b` and mirror to all devices."""
+      if self._fused_update:
+        # `a` is the flat buffer of the averages of the variables `bs`.
+        for a, bs in a_and_b:
+          strategy.extended.update(a, fused_fn_0, args=(bs,))  # a = a + b
+          offset = 0
+          for b in bs:
+            strategy.extended.update(b, fused_fn_1, args=(a, offset))
+            offset += b.shape.num_elements()
+          strategy.extended.update(a, fused_fn_2, args=(bs,))  # a = a - b
+        return
       for a, b in a_and_b:
         strategy.extended.update(a, fn_0, args=(b,))  # a = a + b
         strategy.extended.update(b, fn_1, args=(a,))  # b = a - b
@@ -202,16 +284,19 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
     # strategy (MWMS) if nccl/collective_ops are used, which can operate in
     # pure replica context.
     strategy = tf.distribute.get_strategy()
+    model_weights = (
+        self._fused_model_weights
+        if self._fused_update else self._model_weights)
     if isinstance(strategy, tf.distribute.TPUStrategy):
       maybe_merge_call(
           _swap,
           strategy,
-          zip(self._average_weights, self._model_weights),
+          zip(self._average_weights, model_weights),
       )
     else:
       _swap(
           strategy,
-          zip(self._average_weights, self._model_weights),
+          zip(self._average_weights, model_weights),
       )
 
   def assign_average_vars(self, var_list: List[tf.Variable]):
@@ -223,6 +308,16 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
       assign_op: The op corresponding to the assignment operation of
         variables to their average.
     """
+    if self._fused_update:
+      averages = {}
+      for average, variables in zip(self._average_weights,
+                                    self._fused_model_weights):
+        for var, value in zip(variables, _unflatten(average, variables)):
+          averages[var.ref()] = value
+      return tf.group([
+          var.assign(averages[var.ref()]) for var in var_list if var.trainable
+      ])
+
     assign_op = tf.group([
         var.assign(self.get_slot(var, 'average')) for var in var_list
         if var.trainable
@@ -283,6 +378,7 @@ class ExponentialMovingAverage(tf_keras.optimizers.legacy.Optimizer):
         'average_decay': self._average_decay,
         'start_step': self._start_step,
         'dynamic_decay': self._dynamic_decay,
+        'fused_update': self._fused_update,
     }
     base_config = super(ExponentialMovingAverage, self).get_config()
     return dict(list(base_config.items()) + list(config.items()))
@@ -0,0 +1,69 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for ema_optimizer.py."""
+
+import tensorflow as tf, tf_keras
+
+from official.modeling.optimization import ema_optimizer
+
+
+class ExponentialMovingAverageTest(tf.test.TestCase):
+
+  def _train(self, fused_update, num_steps=5):
+    tf_keras.utils.set_random_seed(1)
+    model = tf_keras.Sequential(
+        [tf_keras.layers.Dense(4), tf_keras.layers.Dense(2)])
+    model.build([None, 3])
+    optimizer = ema_optimizer.ExponentialMovingAverage(
+        tf_keras.optimizers.legacy.SGD(0.1), fused_update=fused_update)
+    optimizer.shadow_copy(model)
+
+    inputs = tf.ones([2, 3])
+    for _ in range(num_steps):
+      with tf.GradientTape() as tape:
+        loss = tf.reduce_sum(model(inputs) ** 2)
+      grads = tape.gradient(loss, model.trainable_variables)
+      optimizer.apply_gradients(zip(grads, model.trainable_variables))
+    return model, optimizer
+
+  def test_fused_update_matches_per_variable_update(self):
+    model, optimizer = self._train(fused_update=False)
+    fused_model, fused_optimizer = self._train(fused_update=True)
+    trained_weights = model.get_weights()
+    self.assertAllClose(trained_weights, fused_model.get_weights())
+
+    # Swaps the averages into the models.
+    optimizer.swap_weights()
+    fused_optimizer.swap_weights()
+    self.assertAllClose(model.get_weights(), fused_model.get_weights())
+    self.assertNotAllClose(trained_weights, fused_model.get_weights())
+
+    # Swaps the trained weights back.
+    optimizer.swap_weights()
+    fused_optimizer.swap_weights()
+    self.assertAllClose(trained_weights, model.get_weights())
+    self.assertAllClose(trained_weights, fused_model.get_weights())
+
+  def test_fused_assign_average_vars(self):
+    model, optimizer = self._train(fused_update=False)
+    fused_model, fused_optimizer = self._train(fused_update=True)
+
+    optimizer.assign_average_vars(model.variables)
+    fused_optimizer.assign_average_vars(fused_model.variables)
+    self.assertAllClose(model.get_weights(), fused_model.get_weights())
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -0,0 +1,254 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Gradient accumulation optimizer."""
+
+from typing import Optional
+
+import tensorflow as tf, tf_keras
+
+from official.modeling.optimization import ema_optimizer
+
+# pylint: disable=protected-access
+
+
+class GradientAccumulationOptimizer(tf_keras.optimizers.legacy.Optimizer):
+  """Optimizer that applies the average gradient of several micro-batches.
+
+  Every call to `apply_gradients` adds the (all-reduced) gradients divided by
+  `accumulation_steps` to an `accumulated_gradient` slot of each variable. Every
+  `accumulation_steps` calls, the accumulated gradients are applied once with
+  the wrapped optimizer, and the next call starts a new sum. The wrapped
+  optimizer, its learning rate schedule and its `iterations` thus only see the
+  updates of the large batch, while `iterations` of this optimizer counts the
+  micro-batches.
+
+  An `ExponentialMovingAverage` wrapped optimizer updates its averages once per
+  applied update. With mixed precision, the `LossScaleOptimizer` must wrap this
+  optimizer, see `add_gradient_accumulation`: micro-batches with non-finite
+  gradients are then skipped and not accumulated, but still counted, and the
+  whole update is skipped if the last micro-batch of an update is skipped.
+  """
+
+  def __init__(self,
+               optimizer: tf_keras.optimizers.legacy.Optimizer,
+               accumulation_steps: int,
+               name: str = 'GradientAccumulation',
+               **kwargs):
+    """Construct a new GradientAccumulationOptimizer.
+
+    Args:
+      optimizer: `tf_keras.optimizers.legacy.Optimizer` that will be used to
+        apply the accumulated gradients.
+      accumulation_steps: int. The number of micro-batches to accumulate the
+        gradients of before applying them.
+      name: Optional name for the operations created when applying gradients.
+      **kwargs: keyword arguments. Allowed to be {`clipnorm`, `clipvalue`,
+        `lr`, `decay`}.
+
+    Raises:
+      ValueError: If `accumulation_steps` is not positive or `optimizer` is
+        not a legacy optimizer.
+    """
+    if accumulation_steps < 1:
+      raise ValueError('`accumulation_steps` must be positive, got '
+                       f'{accumulation_steps}.')
+    if not isinstance(optimizer, tf_keras.optimizers.legacy.Optimizer):
+      raise ValueError('Gradient accumulation can only work with the legacy '
+                       'optimizer, please set `use_legacy_optimizer=True`.')
+    super().__init__(name, **kwargs)
+    self._optimizer = optimizer
+    self._accumulation_steps = accumulation_steps
+    self._accumulated_update = None
+    self._track_trackable(self._optimizer, 'accumulation_base_optimizer')
+
+  @property
+  def inner_optimizer(self):
+    """The optimizer that applies the accumulated gradients."""
+    return self._optimizer
+
+  @property
+  def accumulation_steps(self):
+    return self._accumulation_steps
+
+  def _create_slots(self, var_list):
+    for var in var_list:
+      self.add_slot(var, 'accumulated_gradient', initializer='zeros')
+    if self._accumulated_update is None:
+      # The index of the update that the accumulated gradients belong to.
+      self._accumulated_update = self.add_weight(
+          'accumulated_update',
+          shape=[],
+          dtype=tf.int64,
+          initializer=tf_keras.initializers.Constant(-1),
+          trainable=False,
+          aggregation=tf.VariableAggregation.ONLY_FIRST_REPLICA)
+    # Creates the weights of the wrapped optimizer now, as they cannot be
+    # created in the conditional branch that applies the gradients.
+    self._optimizer._create_all_weights(var_list)
+
+  def _current_update(self):
+    """Returns the index of the update of the current micro-batch."""
+    # `iterations` is only incremented after the accumulators are updated.
+    return self.iterations // self._accumulation_steps
+
+  def _keep_accumulated(self, dtype):
+    """Returns 1 if the accumulated gradients belong to the current update."""
+    return tf.cast(
+        tf.equal(self._accumulated_update, self._current_update()), dtype)
+
+  def _resource_apply_dense(self, grad, var, apply_state=None):
+    accumulator = self.get_slot(var, 'accumulated_gradient')
+    # The first accumulated micro-batch of an update overwrites the gradients
+    # of a previous update: those that were already applied, even if the loss
+    # scale optimizer skipped the first micro-batches of this update, and those
+    # that were never applied because it skipped the last micro-batch of the
+    # previous update.
+    return accumulator.assign(
+        accumulator * self._keep_accumulated(accumulator.dtype) +
+        grad / tf.cast(self._accumulation_steps, grad.dtype),
+        use_locking=self._use_locking,
+        read_value=False)
+
+  def _resource_apply_sparse(self, grad, var, indices, apply_state=None):
+    accumulator = self.get_slot(var, 'accumulated_gradient')
+    accumulator.assign(
+        accumulator * self._keep_accumulated(accumulator.dtype),
+        use_locking=self._use_locking,
+        read_value=False)
+    return accumulator.scatter_add(
+        tf.IndexedSlices(
+            grad / tf.cast(self._accumulation_steps, grad.dtype), indices,
+            tf.shape(var, out_type=indices.dtype)),
+        use_locking=self._use_locking)
+
+  def apply_gradients(self,
+                      grads_and_vars,
+                      name: Optional[str] = None,
+                      experimental_aggregate_gradients: bool = True):
+    grads_and_vars = list(grads_and_vars)
+    # Adds the gradients to the accumulators and increments `iterations`.
+    result = super().apply_gradients(
+        grads_and_vars,
+        name=name,
+        experimental_aggregate_gradients=experimental_aggregate_gradients)
+    self._accumulated_update.assign(
+        (self.iterations - 1) // self._accumulation_steps, read_value=False)
+    ema_optimizer.maybe_merge_call(
+        self._apply_accumulated_gradients,
+        tf.distribute.get_strategy(),
+        [var for _, var in grads_and_vars],
+        name)
+    return result
+
+  def _apply_accumulated_gradients(self, distribution, var_list, name):
+    """Applies the accumulated gradients every N micro-batches.
+
+    This is called in a cross-replica context through `merge_call`, or in a
+    replica context if the strategy does not use `merge_call`, as in the Keras
+    `LossScaleOptimizer`.
+
+    Args:
+      distribution: the current `tf.distribute.Strategy`.
+      var_list: the variables to apply the accumulated gradients to.
+      name: optional name for the operations created when applying gradients.
+
+    Returns:
+      The operation that maybe applies the accumulated gradients.
+    """
+
+    def apply_fn():
+      # The accumulated gradients are already aggregated across replicas.
+      if not distribution.extended._use_merge_call():
+        # `maybe_merge_call` called this function in a replica context.
+        return self._apply_accumulators(var_list, name)
+      return distribution.extended.call_for_each_replica(
+          self._apply_accumulators, args=(var_list, name))
+
+    return tf.__internal__.smart_cond.smart_cond(
+        tf.equal(self.iterations % self._accumulation_steps, 0), apply_fn,
+        tf.no_op)
+
+  def _apply_accumulators(self, var_list, name):
+    grads_and_vars = [
+        (tf.identity(self.get_slot(var, 'accumulated_gradient')), var)
+        for var in var_list
+    ]
+    return self._optimizer.apply_gradients(
+        grads_and_vars, name=name, experimental_aggregate_gradients=False)
+
+  def _create_hypers(self):
+    self._optimizer._create_hypers()
+
+  @property
+  def lr(self):
+    return self._optimizer._get_hyper('learning_rate')
+
+  @lr.setter
+  def lr(self, lr):
+    self._optimizer._set_hyper('learning_rate', lr)
+
+  @property
+  def learning_rate(self):
+    return self._optimizer._get_hyper('learning_rate')
+
+  @learning_rate.setter
+  def learning_rate(self, learning_rate):  # pylint: disable=redefined-outer-name
+    self._optimizer._set_hyper('learning_rate', learning_rate)
+
+  def get_config(self):
+    config = {
+        'optimizer': tf_keras.optimizers.serialize(self._optimizer),
+        'accumulation_steps': self._accumulation_steps,
+    }
+    base_config = super().get_config()
+    return dict(list(base_config.items()) + list(config.items()))
+
+  @classmethod
+  def from_config(cls, config, custom_objects=None):
+    optimizer = tf_keras.optimizers.deserialize(
+        config.pop('optimizer'),
+        custom_objects=custom_objects,
+    )
+    return cls(optimizer, **config)
+
+
+def add_gradient_accumulation(
+    optimizer: tf_keras.optimizers.Optimizer,
+    accumulation_steps: int) -> tf_keras.optimizers.Optimizer:
+  """Wraps `optimizer` to accumulate the gradients of several micro-batches.
+
+  A `LossScaleOptimizer` stays the outermost optimizer, so that tasks keep
+  scaling the loss, and a new one with the same loss scale settings wraps the
+  accumulation of its inner optimizer.
+
+  Args:
+    optimizer: The optimizer built by the task, possibly wrapped by a
+      `LossScaleOptimizer` and/or an `ExponentialMovingAverage`.
+    accumulation_steps: The number of micro-batches per update.
+
+  Returns:
+    The optimizer to pass to `Task.train_step`, or `optimizer` itself if
+    `accumulation_steps` is 1.
+  """
+  if accumulation_steps == 1:
+    return optimizer
+  if isinstance(optimizer, tf_keras.mixed_precision.LossScaleOptimizer):
+    return tf_keras.mixed_precision.LossScaleOptimizer(
+        GradientAccumulationOptimizer(optimizer.inner_optimizer,
+                                      accumulation_steps),
+        dynamic=optimizer.dynamic,
+        initial_scale=optimizer.initial_scale,
+        dynamic_growth_steps=optimizer.dynamic_growth_steps)
+  return GradientAccumulationOptimizer(optimizer, accumulation_steps)
@@ -0,0 +1,152 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for gradient_accumulation_optimizer.py."""
+
+from unittest import mock
+
+from absl.testing import parameterized
+import tensorflow as tf, tf_keras
+
+from tensorflow.python.distribute import combinations
+from tensorflow.python.distribute import strategy_combinations
+from official.modeling.optimization import ema_optimizer
+from official.modeling.optimization import gradient_accumulation_optimizer
+
+
+def all_strategy_combinations():
+  return combinations.combine(
+      distribution=[
+          strategy_combinations.default_strategy,
+          strategy_combinations.cloud_tpu_strategy,
+          strategy_combinations.one_device_strategy_gpu,
+      ],
+      # Without `merge_call`, the accumulated gradients are applied in a
+      # replica context.
+      use_merge_call=[True, False],
+  )
+
+
+class GradientAccumulationOptimizerTest(tf.test.TestCase,
+                                        parameterized.TestCase):
+
+  def _apply_gradients_fn(self, distribution, optimizer, var, use_merge_call):
+    """Returns a function applying a gradient to `var` on every replica."""
+
+    @tf.function
+    def apply(grad):
+      # The gradients are summed across replicas.
+      grad /= distribution.num_replicas_in_sync
+      distribution.run(lambda: optimizer.apply_gradients([(grad, var)]))
+
+    def apply_with_merge_call_setting(grad):
+      with mock.patch.object(
+          type(distribution.extended),
+          '_use_merge_call',
+          return_value=use_merge_call):
+        apply(tf.constant(grad))
+
+    return apply_with_merge_call_setting
+
+  @combinations.generate(all_strategy_combinations())
+  def test_apply_accumulated_gradients(self, distribution, use_merge_call):
+    with distribution.scope():
+      var = tf.Variable([1.0, 2.0])
+      inner = tf_keras.optimizers.legacy.SGD(1.0)
+      optimizer = gradient_accumulation_optimizer.GradientAccumulationOptimizer(
+          inner, accumulation_steps=2)
+    apply = self._apply_gradients_fn(distribution, optimizer, var,
+                                     use_merge_call)
+
+    apply([1.0, 1.0])
+    # The gradients are only accumulated.
+    self.assertAllClose([1.0, 2.0], var)
+    apply([3.0, 5.0])
+    # The average gradient is applied once.
+    self.assertAllClose([-1.0, -1.0], var)
+    self.assertEqual(2, optimizer.iterations.numpy())
+    self.assertEqual(1, inner.iterations.numpy())
+
+    # The next update only uses the new gradients.
+    apply([2.0, 2.0])
+    apply([2.0, 2.0])
+    self.assertAllClose([-3.0, -3.0], var)
+    self.assertEqual(2, inner.iterations.numpy())
+
+  @combinations.generate(all_strategy_combinations())
+  def test_apply_accumulated_gradients_with_ema(self, distribution,
+                                                use_merge_call):
+    with distribution.scope():
+      model = tf_keras.Sequential([tf_keras.layers.Dense(1, use_bias=False)])
+      model.build([None, 1])
+      kernel = model.layers[0].kernel
+      kernel.assign([[1.0]])
+      ema = ema_optimizer.ExponentialMovingAverage(
+          tf_keras.optimizers.legacy.SGD(1.0),
+          average_decay=0.5,
+          dynamic_decay=False)
+      ema.shadow_copy(model)
+      optimizer = gradient_accumulation_optimizer.add_gradient_accumulation(
+          ema, accumulation_steps=2)
+    apply = self._apply_gradients_fn(distribution, optimizer, kernel,
+                                     use_merge_call)
+
+    for grad in (0.25, 0.75):
+      apply([[grad]])
+
+    # The model is updated once with the average gradient, and the average,
+    # initialized to zero, once: 0.5 * 0 + 0.5 * 0.5.
+    self.assertAllClose([[0.5]], kernel)
+    self.assertEqual(1, ema.iterations.numpy())
+    with distribution.scope():
+      ema.swap_weights()
+    self.assertAllClose([[0.25]], kernel)
+
+  def test_skipped_first_micro_batch_is_not_accumulated(self):
+    var = tf.Variable([1.0, 2.0])
+    inner = tf_keras.optimizers.legacy.SGD(1.0)
+    optimizer = gradient_accumulation_optimizer.add_gradient_accumulation(
+        tf_keras.mixed_precision.LossScaleOptimizer(inner),
+        accumulation_steps=2)
+
+    for grad in ([1.0, 1.0], [3.0, 5.0]):
+      optimizer.apply_gradients([(tf.constant(grad), var)])
+    self.assertAllClose([-1.0, -1.0], var)
+
+    # The loss scale optimizer skips the first micro-batch of the next update,
+    # so the update only applies the second one, divided by 2, and not the
+    # gradients of the previous update again.
+    for grad in ([float('inf'), 1.0], [2.0, 2.0]):
+      optimizer.apply_gradients([(tf.constant(grad), var)])
+    self.assertAllClose([-2.0, -2.0], var)
+    self.assertEqual(4, optimizer.inner_optimizer.iterations.numpy())
+    self.assertEqual(2, inner.iterations.numpy())
+
+  def test_loss_scale_optimizer_stays_outermost(self):
+    optimizer = tf_keras.mixed_precision.LossScaleOptimizer(
+        tf_keras.optimizers.legacy.SGD(1.0), dynamic=False, initial_scale=8)
+    optimizer = gradient_accumulation_optimizer.add_gradient_accumulation(
+        optimizer, accumulation_steps=4)
+
+    self.assertIsInstance(optimizer,
+                          tf_keras.mixed_precision.LossScaleOptimizer)
+    self.assertIsInstance(
+        optimizer.inner_optimizer,
+        gradient_accumulation_optimizer.GradientAccumulationOptimizer)
+    self.assertFalse(optimizer.dynamic)
+    self.assertEqual(8, optimizer.initial_scale)
+
+
+if __name__ == '__main__':
+  tf.test.main()
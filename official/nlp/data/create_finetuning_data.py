@@ -118,6 +118,11 @@ flags.DEFINE_bool(
     "If true, then data will be preprocessed in a paragraph, query, class order"
     " instead of the BERT-style class, paragraph, query order.")
 
+flags.DEFINE_integer(
+    "squad_num_workers", 0,
+    "If > 1, the number of processes used to generate the WordPiece SQuAD "
+    "features. The output is the same as with a single process.")
+
 # XTREME specific flags.
 flags.DEFINE_bool("only_use_en_dev", True, "Whether only use english dev data.")
 
@@ -324,7 +329,8 @@ def generate_squad_dataset():
         max_query_length=FLAGS.max_query_length,
         doc_stride=FLAGS.doc_stride,
         version_2_with_negative=FLAGS.version_2_with_negative,
-        xlnet_format=FLAGS.xlnet_format)
+        xlnet_format=FLAGS.xlnet_format,
+        num_workers=FLAGS.squad_num_workers)
   else:
     assert FLAGS.tokenization == "SentencePiece"
     return squad_lib_sp.generate_tf_record_from_json_file(
@@ -16,6 +16,7 @@
 
 import collections
 import itertools
+import multiprocessing
 import random
 
 # Import libraries
@@ -100,6 +101,19 @@ flags.DEFINE_float(
     "Probability of creating sequences which are shorter than the "
     "maximum length.")
 
+flags.DEFINE_integer(
+    "num_workers", 0,
+    "If > 0, every input file is processed as an independent shard in a pool "
+    "of `num_workers` processes and its examples are streamed to the output "
+    "files, so that memory is bounded by the size of the shards in flight "
+    "instead of the whole corpus. Random next sentences are then sampled "
+    "from the same input file. The output only depends on `random_seed`, not "
+    "on the number of workers.")
+
+# The tokenizer and text processing function of a shard worker process.
+_worker_tokenizer = None
+_worker_processor_text_fn = None
+
 
 class TrainingInstance(object):
   """A single training instance (sentence pair)."""
@@ -129,6 +143,51 @@ class TrainingInstance(object):
     return self.__str__()
 
 
+def create_example(instance, tokenizer, max_seq_length,
+                   max_predictions_per_seq, use_v2_feature_names):
+  """Creates a `tf.train.Example` from a `TrainingInstance`."""
+  input_ids = tokenizer.convert_tokens_to_ids(instance.tokens)
+  input_mask = [1] * len(input_ids)
+  segment_ids = list(instance.segment_ids)
+  assert len(input_ids) <= max_seq_length
+
+  while len(input_ids) < max_seq_length:
+    input_ids.append(0)
+    input_mask.append(0)
+    segment_ids.append(0)
+
+  assert len(input_ids) == max_seq_length
+  assert len(input_mask) == max_seq_length
+  assert len(segment_ids) == max_seq_length
+
+  masked_lm_positions = list(instance.masked_lm_positions)
+  masked_lm_ids = tokenizer.convert_tokens_to_ids(instance.masked_lm_labels)
+  masked_lm_weights = [1.0] * len(masked_lm_ids)
+
+  while len(masked_lm_positions) < max_predictions_per_seq:
+    masked_lm_positions.append(0)
+    masked_lm_ids.append(0)
+    masked_lm_weights.append(0.0)
+
+  next_sentence_label = 1 if instance.is_random_next else 0
+
+  features = collections.OrderedDict()
+  if use_v2_feature_names:
+    features["input_word_ids"] = create_int_feature(input_ids)
+    features["input_type_ids"] = create_int_feature(segment_ids)
+  else:
+    features["input_ids"] = create_int_feature(input_ids)
+    features["segment_ids"] = create_int_feature(segment_ids)
+
+  features["input_mask"] = create_int_feature(input_mask)
+  features["masked_lm_positions"] = create_int_feature(masked_lm_positions)
+  features["masked_lm_ids"] = create_int_feature(masked_lm_ids)
+  features["masked_lm_weights"] = create_float_feature(masked_lm_weights)
+  features["next_sentence_labels"] = create_int_feature([next_sentence_label])
+
+  return tf.train.Example(features=tf.train.Features(feature=features))
+
+
 def write_instance_to_example_files(instances, tokenizer, max_seq_length,
                                     max_predictions_per_seq, output_files,
                                     gzip_compress, use_v2_feature_names):
@@ -143,46 +202,8 @@ def write_instance_to_example_files(instances, tokenizer, max_seq_length,
 
   total_written = 0
   for (inst_index, instance) in enumerate(instances):
-    input_ids = tokenizer.convert_tokens_to_ids(instance.tokens)
-    input_mask = [1] * len(input_ids)
-    segment_ids = list(instance.segment_ids)
-    assert len(input_ids) <= max_seq_length
-
-    while len(input_ids) < max_seq_length:
-      input_ids.append(0)
-      input_mask.append(0)
-      segment_ids.append(0)
-
-    assert len(input_ids) == max_seq_length
-    assert len(input_mask) == max_seq_length
-    assert len(segment_ids) == max_seq_length
-
-    masked_lm_positions = list(instance.masked_lm_positions)
-    masked_lm_ids = tokenizer.convert_tokens_to_ids(instance.masked_lm_labels)
-    masked_lm_weights = [1.0] * len(masked_lm_ids)
-
-    while len(masked_lm_positions) < max_predictions_per_seq:
-      masked_lm_positions.append(0)
-      masked_lm_ids.append(0)
-      masked_lm_weights.append(0.0)
-
-    next_sentence_label = 1 if instance.is_random_next else 0
-
-    features = collections.OrderedDict()
-    if use_v2_feature_names:
-      features["input_word_ids"] = create_int_feature(input_ids)
-      features["input_type_ids"] = create_int_feature(segment_ids)
-    else:
-      features["input_ids"] = create_int_feature(input_ids)
-      features["segment_ids"] = create_int_feature(segment_ids)
-
-    features["input_mask"] = create_int_feature(input_mask)
-    features["masked_lm_positions"] = create_int_feature(masked_lm_positions)
-    features["masked_lm_ids"] = create_int_feature(masked_lm_ids)
-    features["masked_lm_weights"] = create_float_feature(masked_lm_weights)
-    features["next_sentence_labels"] = create_int_feature([next_sentence_label])
-
-    tf_example = tf.train.Example(features=tf.train.Features(feature=features))
+    tf_example = create_example(instance, tokenizer, max_seq_length,
+                                max_predictions_per_seq, use_v2_feature_names)
 
     writers[writer_index].write(tf_example.SerializeToString())
     writer_index = (writer_index + 1) % len(writers)
@@ -194,6 +215,7 @@ def write_instance_to_example_files(instances, tokenizer, max_seq_length,
       logging.info("tokens: %s", " ".join(
           [tokenization.printable_text(x) for x in instance.tokens]))
 
+      features = tf_example.features.feature
       for feature_name in features.keys():
         feature = features[feature_name]
         values = []
@@ -271,6 +293,142 @@ def create_training_instances(
   return instances
 
 
+def _init_shard_worker(tokenizer_type, vocab_file, sp_model_file,
+                       do_lower_case):
+  global _worker_tokenizer, _worker_processor_text_fn
+  _worker_tokenizer, _worker_processor_text_fn = create_tokenizer(
+      tokenizer_type, vocab_file, sp_model_file, do_lower_case)
+
+
+def _create_shard_examples_from_args(args):
+  """Creates the serialized examples of one input file in a worker."""
+  shard_index, input_file, random_seed, kwargs = args
+  return create_shard_examples(shard_index, input_file, _worker_tokenizer,
+                               _worker_processor_text_fn, random_seed,
+                               **kwargs)
+
+
+def create_shard_examples(shard_index,
+                          input_file,
+                          tokenizer,
+                          processor_text_fn,
+                          random_seed,
+                          max_seq_length,
+                          dupe_factor,
+                          short_seq_prob,
+                          masked_lm_prob,
+                          max_predictions_per_seq,
+                          do_whole_word_mask=False,
+                          max_ngram_size=None,
+                          use_v2_feature_names=False):
+  """Creates the serialized TF examples of a single input file shard.
+
+  The shard is processed with its own random generators seeded from
+  `random_seed` and `shard_index`, so the examples of a shard do not depend on
+  the other shards or on the process creating them.
+
+  Args:
+    shard_index: The index of the shard.
+    input_file: The input file of the shard.
+    tokenizer: The tokenizer.
+    processor_text_fn: The function to process the lines of the input file.
+    random_seed: The random seed of the whole dataset.
+    max_seq_length: Maximum sequence length.
+    dupe_factor: Number of times to duplicate the input data.
+    short_seq_prob: Probability of creating shorter sequences.
+    masked_lm_prob: Masked LM probability.
+    max_predictions_per_seq: Maximum number of masked LM predictions per
+      sequence.
+    do_whole_word_mask: Whether to use whole word masking.
+    max_ngram_size: Maximum size of the masked n-grams.
+    use_v2_feature_names: Whether to use the feature names consistent with the
+      models.
+
+  Returns:
+    A list of serialized `tf.train.Example`s in random order.
+  """
+  shard_seed = "{}-{}".format(random_seed, shard_index)
+  rng = random.Random(shard_seed)
+  # `_masking_ngrams` draws the n-gram sizes from the global generator.
+  random.seed(shard_seed)
+  instances = create_training_instances(
+      [input_file], tokenizer, processor_text_fn, max_seq_length, dupe_factor,
+      short_seq_prob, masked_lm_prob, max_predictions_per_seq, rng,
+      do_whole_word_mask, max_ngram_size)
+  return [
+      create_example(instance, tokenizer, max_seq_length,
+                     max_predictions_per_seq,
+                     use_v2_feature_names).SerializeToString()
+      for instance in instances
+  ]
+
+
+def write_sharded_example_files(input_files, output_files, gzip_compress,
+                                num_workers, tokenizer_type, vocab_file,
+                                sp_model_file, do_lower_case, random_seed,
+                                **kwargs):
+  """Creates TF example files, processing every input file as a shard.
+
+  The shards are processed in a pool of `num_workers` spawned processes and
+  their examples are written as they arrive, in the order of `input_files`, to
+  the output files in round robin. At most two shards per worker are processed
+  or waiting to be written at any time.
+
+  Args:
+    input_files: The list of input files.
+    output_files: The list of output files.
+    gzip_compress: Whether to compress the output files with GZIP.
+    num_workers: The number of worker processes.
+    tokenizer_type: The tokenizer implementation, "WordPiece" or
+      "SentencePiece".
+    vocab_file: The vocab file of the WordPiece tokenizer.
+    sp_model_file: The model file of the SentencePiece tokenizer.
+    do_lower_case: Whether to lower case the input text.
+    random_seed: The random seed.
+    **kwargs: The other arguments of `create_shard_examples`.
+  """
+  writers = []
+  for output_file in output_files:
+    writers.append(
+        tf.io.TFRecordWriter(
+            output_file, options="GZIP" if gzip_compress else ""))
+
+  writer_index = 0
+  total_written = 0
+  # Bounds the number of shards whose examples are held in memory, as the
+  # examples of a whole input file are returned at once.
+  max_pending_shards = 2 * num_workers
+  # TensorFlow is not fork-safe, so the workers are spawned. Leaving the pool
+  # terminates it, so an error does not wait for the remaining shards.
+  with multiprocessing.get_context("spawn").Pool(
+      processes=num_workers,
+      initializer=_init_shard_worker,
+      initargs=(tokenizer_type, vocab_file, sp_model_file,
+                do_lower_case)) as pool:
+    pending = collections.deque()
+    next_shard = 0
+    for shard_index, input_file in enumerate(input_files):
+      while next_shard < len(input_files) and (
+          next_shard - shard_index < max_pending_shards):
+        pending.append(
+            pool.apply_async(
+                _create_shard_examples_from_args,
+                ((next_shard, input_files[next_shard], random_seed, kwargs),)))
+        next_shard += 1
+      examples = pending.popleft().get()
+      for example in examples:
+        writers[writer_index].write(example)
+        writer_index = (writer_index + 1) % len(writers)
+      total_written += len(examples)
+      logging.info("Wrote %d instances of shard %d/%d: %s", len(examples),
+                   shard_index + 1, len(input_files), input_file)
+
+  for writer in writers:
+    writer.close()
+
+  logging.info("Wrote %d total instances", total_written)
+
+
 def create_instances_from_document(
     all_documents, document_index, max_seq_length, short_seq_prob,
     masked_lm_prob, max_predictions_per_seq, vocab_words, rng,
@@ -667,17 +825,22 @@ def get_processor_text_fn(is_sentence_piece, do_lower_case):
   return processor_text_fn
 
 
-def main(_):
-  if FLAGS.tokenization == "WordPiece":
+def create_tokenizer(tokenizer_type, vocab_file, sp_model_file,
+                     do_lower_case):
+  """Creates the tokenizer and the function to process the input text."""
+  if tokenizer_type == "WordPiece":
     tokenizer = tokenization.FullTokenizer(
-        vocab_file=FLAGS.vocab_file, do_lower_case=FLAGS.do_lower_case
+        vocab_file=vocab_file, do_lower_case=do_lower_case
     )
-    processor_text_fn = get_processor_text_fn(False, FLAGS.do_lower_case)
+    processor_text_fn = get_processor_text_fn(False, do_lower_case)
   else:
-    assert FLAGS.tokenization == "SentencePiece"
-    tokenizer = tokenization.FullSentencePieceTokenizer(FLAGS.sp_model_file)
-    processor_text_fn = get_processor_text_fn(True, FLAGS.do_lower_case)
+    assert tokenizer_type == "SentencePiece"
+    tokenizer = tokenization.FullSentencePieceTokenizer(sp_model_file)
+    processor_text_fn = get_processor_text_fn(True, do_lower_case)
+  return tokenizer, processor_text_fn
 
+
+def main(_):
   input_files = []
   for input_pattern in FLAGS.input_file.split(","):
     input_files.extend(tf.io.gfile.glob(input_pattern))
@@ -686,6 +849,36 @@ def main(_):
   for input_file in input_files:
     logging.info("  %s", input_file)
 
+  if FLAGS.num_workers > 0:
+    output_files = FLAGS.output_file.split(",")
+    logging.info("*** Writing to output files ***")
+    for output_file in output_files:
+      logging.info("  %s", output_file)
+
+    write_sharded_example_files(
+        input_files,
+        output_files,
+        FLAGS.gzip_compress,
+        FLAGS.num_workers,
+        FLAGS.tokenization,
+        FLAGS.vocab_file,
+        FLAGS.sp_model_file,
+        FLAGS.do_lower_case,
+        FLAGS.random_seed,
+        max_seq_length=FLAGS.max_seq_length,
+        dupe_factor=FLAGS.dupe_factor,
+        short_seq_prob=FLAGS.short_seq_prob,
+        masked_lm_prob=FLAGS.masked_lm_prob,
+        max_predictions_per_seq=FLAGS.max_predictions_per_seq,
+        do_whole_word_mask=FLAGS.do_whole_word_mask,
+        max_ngram_size=FLAGS.max_ngram_size,
+        use_v2_feature_names=FLAGS.use_v2_feature_names)
+    return
+
+  tokenizer, processor_text_fn = create_tokenizer(
+      FLAGS.tokenization, FLAGS.vocab_file, FLAGS.sp_model_file,
+      FLAGS.do_lower_case)
+
   rng = random.Random(FLAGS.random_seed)
   instances = create_training_instances(
       input_files,
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 """Tests for official.nlp.data.create_pretraining_data."""
+import os
 import random
 
 import tensorflow as tf, tf_keras
@@ -123,6 +124,56 @@ class CreatePretrainingDataTest(tf.test.TestCase):
       self.assertLen(masked_labels, 76)
       self.assertTokens(tokens, output_tokens, masked_positions, masked_labels)
 
+  def test_write_sharded_example_files(self):
+    words = ["the", "red", "boat", "sails", "on", "a", "calm", "sea"]
+    vocab_file = os.path.join(self.get_temp_dir(), "vocab.txt")
+    with tf.io.gfile.GFile(vocab_file, "w") as f:
+      f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] +
+                        words))
+    rng = random.Random(0)
+    input_files = []
+    for i in range(3):
+      input_files.append(os.path.join(self.get_temp_dir(), f"input_{i}.txt"))
+      with tf.io.gfile.GFile(input_files[-1], "w") as f:
+        for _ in range(4):
+          for _ in range(5):
+            f.write(" ".join(rng.choice(words) for _ in range(8)) + "\n")
+          f.write("\n")
+
+    outputs = []
+    for num_workers in (1, 2):
+      output_files = [
+          os.path.join(self.get_temp_dir(), f"output_{num_workers}_{i}")
+          for i in range(2)
+      ]
+      cpd.write_sharded_example_files(
+          input_files,
+          output_files,
+          gzip_compress=False,
+          num_workers=num_workers,
+          tokenizer_type="WordPiece",
+          vocab_file=vocab_file,
+          sp_model_file=None,
+          do_lower_case=True,
+          random_seed=12345,
+          max_seq_length=32,
+          dupe_factor=2,
+          short_seq_prob=0.1,
+          masked_lm_prob=0.15,
+          max_predictions_per_seq=5,
+          do_whole_word_mask=True,
+          max_ngram_size=2)
+      outputs.append([
+          list(tf.data.TFRecordDataset(output_file).as_numpy_iterator())
+          for output_file in output_files
+      ])
+
+    # The output does not depend on the number of workers.
+    self.assertEqual(outputs[0], outputs[1])
+    self.assertNotEmpty(outputs[0][0])
+    example = tf.train.Example.FromString(outputs[0][0][0])
+    self.assertLen(example.features.feature["input_ids"].int64_list.value, 32)
+
 
 if __name__ == "__main__":
   tf.test.main()
@@ -18,11 +18,13 @@ import collections
 import copy
 import json
 import math
+import multiprocessing
 import os
 
 import six
 
 from absl import logging
+import numpy as np
 import tensorflow as tf, tf_keras
 
 from official.nlp.tools import tokenization
@@ -249,35 +251,44 @@ def read_squad_examples(input_file, is_training,
   return examples
 
 
-def convert_examples_to_features(examples,
-                                 tokenizer,
-                                 max_seq_length,
-                                 doc_stride,
-                                 max_query_length,
-                                 is_training,
-                                 output_fn,
-                                 xlnet_format=False,
-                                 batch_size=None):
-  """Loads a data file into a list of `InputBatch`s."""
-
-  base_id = 1000000000
-  unique_id = base_id
-  feature = None
-  for (example_index, example) in enumerate(examples):
+def _tokenize_doc_tokens(doc_tokens, tokenizer):
+  """Tokenizes the whitespace separated tokens of a context."""
+  tok_to_orig_index = []
+  orig_to_tok_index = []
+  all_doc_tokens = []
+  for (i, token) in enumerate(doc_tokens):
+    orig_to_tok_index.append(len(all_doc_tokens))
+    sub_tokens = tokenizer.tokenize(token)
+    for sub_token in sub_tokens:
+      tok_to_orig_index.append(i)
+      all_doc_tokens.append(sub_token)
+  return tok_to_orig_index, orig_to_tok_index, all_doc_tokens
+
+
+def _generate_features(examples,
+                       tokenizer,
+                       max_seq_length,
+                       doc_stride,
+                       max_query_length,
+                       is_training,
+                       xlnet_format=False,
+                       example_index_offset=0):
+  """Yields the `InputFeatures` of `examples`, without their `unique_id`."""
+  # The questions about the same paragraph are consecutive and share their
+  # context, which is only tokenized once.
+  last_doc_tokens = None
+  for (example_index, example) in enumerate(examples, example_index_offset):
     query_tokens = tokenizer.tokenize(example.question_text)
 
     if len(query_tokens) > max_query_length:
       query_tokens = query_tokens[0:max_query_length]
 
-    tok_to_orig_index = []
-    orig_to_tok_index = []
-    all_doc_tokens = []
-    for (i, token) in enumerate(example.doc_tokens):
-      orig_to_tok_index.append(len(all_doc_tokens))
-      sub_tokens = tokenizer.tokenize(token)
-      for sub_token in sub_tokens:
-        tok_to_orig_index.append(i)
-        all_doc_tokens.append(sub_token)
+    if (last_doc_tokens is None or
+        (example.doc_tokens is not last_doc_tokens and
+         example.doc_tokens != last_doc_tokens)):
+      tok_to_orig_index, orig_to_tok_index, all_doc_tokens = (
+          _tokenize_doc_tokens(example.doc_tokens, tokenizer))
+      last_doc_tokens = example.doc_tokens
 
     tok_start_position = None
     tok_end_position = None
@@ -401,39 +412,8 @@ def convert_examples_to_features(examples,
           start_position = tok_start_position - doc_start + doc_offset
           end_position = tok_end_position - doc_start + doc_offset
 
-      if example_index < 20:
-        logging.info("*** Example ***")
-        logging.info("unique_id: %s", (unique_id))
-        logging.info("example_index: %s", (example_index))
-        logging.info("doc_span_index: %s", (doc_span_index))
-        logging.info("tokens: %s",
-                     " ".join([tokenization.printable_text(x) for x in tokens]))
-        logging.info(
-            "token_to_orig_map: %s", " ".join([
-                "%d:%d" % (x, y) for (x, y) in six.iteritems(token_to_orig_map)
-            ]))
-        logging.info(
-            "token_is_max_context: %s", " ".join([
-                "%d:%s" % (x, y)
-                for (x, y) in six.iteritems(token_is_max_context)
-            ]))
-        logging.info("input_ids: %s", " ".join([str(x) for x in input_ids]))
-        logging.info("input_mask: %s", " ".join([str(x) for x in input_mask]))
-        logging.info("segment_ids: %s", " ".join([str(x) for x in segment_ids]))
-        logging.info("paragraph_mask: %s", " ".join(
-            [str(x) for x in paragraph_mask]))
-        logging.info("class_index: %d", class_index)
-        if is_training:
-          if span_contains_answer:
-            answer_text = " ".join(tokens[start_position:(end_position + 1)])
-            logging.info("start_position: %d", (start_position))
-            logging.info("end_position: %d", (end_position))
-            logging.info("answer: %s", tokenization.printable_text(answer_text))
-          else:
-            logging.info("document span doesn't contain answer")
-
-      feature = InputFeatures(
-          unique_id=unique_id,
+      yield InputFeatures(
+          unique_id=None,
           example_index=example_index,
           doc_span_index=doc_span_index,
           tokens=tokens,
@@ -448,13 +428,154 @@ def convert_examples_to_features(examples,
           end_position=end_position,
           is_impossible=not span_contains_answer)
 
-      # Run callback
-      if is_training:
-        output_fn(feature)
-      else:
-        output_fn(feature, is_padding=False)
 
-      unique_id += 1
+def _log_feature(feature, is_training):
+  """Logs the details of a feature."""
+  logging.info("*** Example ***")
+  logging.info("unique_id: %s", (feature.unique_id))
+  logging.info("example_index: %s", (feature.example_index))
+  logging.info("doc_span_index: %s", (feature.doc_span_index))
+  logging.info("tokens: %s",
+               " ".join([tokenization.printable_text(x)
+                         for x in feature.tokens]))
+  logging.info(
+      "token_to_orig_map: %s", " ".join([
+          "%d:%d" % (x, y)
+          for (x, y) in six.iteritems(feature.token_to_orig_map)
+      ]))
+  logging.info(
+      "token_is_max_context: %s", " ".join([
+          "%d:%s" % (x, y)
+          for (x, y) in six.iteritems(feature.token_is_max_context)
+      ]))
+  logging.info("input_ids: %s", " ".join([str(x) for x in feature.input_ids]))
+  logging.info("input_mask: %s", " ".join([str(x) for x in feature.input_mask]))
+  logging.info("segment_ids: %s",
+               " ".join([str(x) for x in feature.segment_ids]))
+  logging.info("paragraph_mask: %s", " ".join(
+      [str(x) for x in feature.paragraph_mask]))
+  logging.info("class_index: %d", feature.class_index)
+  if is_training:
+    if not feature.is_impossible:
+      answer_text = " ".join(
+          feature.tokens[feature.start_position:(feature.end_position + 1)])
+      logging.info("start_position: %d", (feature.start_position))
+      logging.info("end_position: %d", (feature.end_position))
+      logging.info("answer: %s", tokenization.printable_text(answer_text))
+    else:
+      logging.info("document span doesn't contain answer")
+
+
+# The tokenizer of a `convert_examples_to_features` worker process.
+_worker_tokenizer = None
+
+
+def _init_feature_worker(tokenizer):
+  global _worker_tokenizer
+  _worker_tokenizer = tokenizer
+
+
+def _generate_chunk_features(args):
+  """Returns the features of a chunk of examples in a worker process."""
+  example_index_offset, examples, kwargs = args
+  return list(
+      _generate_features(
+          examples,
+          _worker_tokenizer,
+          example_index_offset=example_index_offset,
+          **kwargs))
+
+
+def _chunk_examples(examples, chunk_size):
+  """Splits `examples` into chunks, keeping the same contexts together."""
+  chunks = []
+  start = 0
+  while start < len(examples):
+    end = min(start + chunk_size, len(examples))
+    while (end < len(examples) and
+           examples[end].doc_tokens is examples[end - 1].doc_tokens):
+      end += 1
+    chunks.append((start, examples[start:end]))
+    start = end
+  return chunks
+
+
+def _generate_features_in_pool(examples, tokenizer, num_workers,
+                               chunk_size=64, **kwargs):
+  """Yields the features of `examples` in order, built in a process pool."""
+  # TensorFlow is not fork-safe, so the workers are spawned. The tokenizer is
+  # pickled once per worker.
+  pool = multiprocessing.get_context("spawn").Pool(
+      processes=num_workers,
+      initializer=_init_feature_worker,
+      initargs=(tokenizer,))
+  try:
+    args = [(offset, chunk, kwargs)
+            for offset, chunk in _chunk_examples(examples, chunk_size)]
+    for features in pool.imap(_generate_chunk_features, args):
+      for feature in features:
+        yield feature
+  finally:
+    pool.close()
+    pool.join()
+
+
+def convert_examples_to_features(examples,
+                                 tokenizer,
+                                 max_seq_length,
+                                 doc_stride,
+                                 max_query_length,
+                                 is_training,
+                                 output_fn,
+                                 xlnet_format=False,
+                                 batch_size=None,
+                                 num_workers=0):
+  """Loads a data file into a list of `InputBatch`s.
+
+  Args:
+    examples: A list of `SquadExample`s.
+    tokenizer: The tokenizer. It must be picklable if `num_workers` > 1.
+    max_seq_length: The maximum sequence length.
+    doc_stride: The stride between the chunks of a long context.
+    max_query_length: The maximum number of tokens of a question.
+    is_training: Whether the features are for training.
+    output_fn: The callback for each feature, in the order of `examples`.
+    xlnet_format: Whether to use the XLNet input order.
+    batch_size: The evaluation batch size, used to pad the features.
+    num_workers: If > 1, the features are built in a pool of this many
+      processes. The features and their `unique_id`s are the same as without
+      workers.
+
+  Returns:
+    The number of features, including padding features.
+  """
+
+  base_id = 1000000000
+  unique_id = base_id
+  feature = None
+  kwargs = dict(
+      max_seq_length=max_seq_length,
+      doc_stride=doc_stride,
+      max_query_length=max_query_length,
+      is_training=is_training,
+      xlnet_format=xlnet_format)
+  if num_workers > 1:
+    features = _generate_features_in_pool(examples, tokenizer, num_workers,
+                                          **kwargs)
+  else:
+    features = _generate_features(examples, tokenizer, **kwargs)
+  for feature in features:
+    feature.unique_id = unique_id
+    if feature.example_index < 20:
+      _log_feature(feature, is_training)
+
+    # Run callback
+    if is_training:
+      output_fn(feature)
+    else:
+      output_fn(feature, is_padding=False)
+
+    unique_id += 1
 
   if not is_training and feature:
     assert batch_size
@@ -591,8 +712,32 @@ def postprocess_output(all_examples,
                        version_2_with_negative=False,
                        null_score_diff_threshold=0.0,
                        xlnet_format=False,
-                       verbose=False):
-  """Postprocess model output, to form predicton results."""
+                       verbose=False,
+                       vectorized=True):
+  """Postprocess model output, to form predicton results.
+
+  Args:
+    all_examples: a list of `SquadExample`s.
+    all_features: a list of `InputFeatures` of `all_examples`.
+    all_results: a list of model results with `unique_id`, `start_logits` and
+      `end_logits` (and `start_indexes`, `end_indexes` and `class_logits` in
+      the XLNet format).
+    n_best_size: the number of n-best predictions to keep per example.
+    max_answer_length: the maximum length of a predicted answer, in tokens.
+    do_lower_case: whether the tokenizer lower cased the input text.
+    version_2_with_negative: whether examples may have no answer.
+    null_score_diff_threshold: predict the null answer if its score minus the
+      best non-null score is above this threshold.
+    xlnet_format: whether `all_results` are in the XLNet format.
+    verbose: whether to log the failures of projecting predictions back to
+      the original text.
+    vectorized: whether to score the candidate spans of a feature with NumPy
+      instead of one by one in Python. Both give the same predictions.
+
+  Returns:
+    A tuple of the predictions, the n-best predictions and the null score
+    differences, all keyed by `qas_id`.
+  """
 
   example_index_to_features = collections.defaultdict(list)
   for feature in all_features:
@@ -601,83 +746,26 @@ def postprocess_output(all_examples,
   for result in all_results:
     unique_id_to_result[result.unique_id] = result
 
-  _PrelimPrediction = collections.namedtuple(  # pylint: disable=invalid-name
-      "PrelimPrediction",
-      ["feature_index", "start_index", "end_index", "start_logit", "end_logit"])
-
   all_predictions = collections.OrderedDict()
   all_nbest_json = collections.OrderedDict()
   scores_diff_json = collections.OrderedDict()
 
+  if vectorized:
+    get_prelim_predictions = _get_prelim_predictions
+  else:
+    get_prelim_predictions = _get_prelim_predictions_reference
+
   for (example_index, example) in enumerate(all_examples):
     features = example_index_to_features[example_index]
 
-    prelim_predictions = []
-    # keep track of the minimum score of null start+end of position 0
-    score_null = 1000000  # large and positive
-    min_null_feature_index = 0  # the paragraph slice with min mull score
-    null_start_logit = 0  # the start logit at the slice with min null score
-    null_end_logit = 0  # the end logit at the slice with min null score
-    for (feature_index, feature) in enumerate(features):
-      if feature.unique_id not in unique_id_to_result:
-        logging.info("Skip eval example %s, not in pred.", feature.unique_id)
-        continue
-      result = unique_id_to_result[feature.unique_id]
-
-      # if we could have irrelevant answers, get the min score of irrelevant
-      if version_2_with_negative:
-        if xlnet_format:
-          feature_null_score = result.class_logits
-        else:
-          feature_null_score = result.start_logits[0] + result.end_logits[0]
-        if feature_null_score < score_null:
-          score_null = feature_null_score
-          min_null_feature_index = feature_index
-          null_start_logit = result.start_logits[0]
-          null_end_logit = result.end_logits[0]
-      for (start_index, start_logit,
-           end_index, end_logit) in _get_best_indexes_and_logits(
-               result=result,
-               n_best_size=n_best_size,
-               xlnet_format=xlnet_format):
-        # We could hypothetically create invalid predictions, e.g., predict
-        # that the start of the span is in the question. We throw out all
-        # invalid predictions.
-        if start_index >= len(feature.tokens):
-          continue
-        if end_index >= len(feature.tokens):
-          continue
-        if start_index not in feature.token_to_orig_map:
-          continue
-        if end_index not in feature.token_to_orig_map:
-          continue
-        if not feature.token_is_max_context.get(start_index, False):
-          continue
-        if end_index < start_index:
-          continue
-        length = end_index - start_index + 1
-        if length > max_answer_length:
-          continue
-        prelim_predictions.append(
-            _PrelimPrediction(
-                feature_index=feature_index,
-                start_index=start_index,
-                end_index=end_index,
-                start_logit=start_logit,
-                end_logit=end_logit))
-
-    if version_2_with_negative and not xlnet_format:
-      prelim_predictions.append(
-          _PrelimPrediction(
-              feature_index=min_null_feature_index,
-              start_index=0,
-              end_index=0,
-              start_logit=null_start_logit,
-              end_logit=null_end_logit))
-    prelim_predictions = sorted(
-        prelim_predictions,
-        key=lambda x: (x.start_logit + x.end_logit),
-        reverse=True)
+    (prelim_predictions, score_null, null_start_logit,
+     null_end_logit) = get_prelim_predictions(
+         features=features,
+         unique_id_to_result=unique_id_to_result,
+         n_best_size=n_best_size,
+         max_answer_length=max_answer_length,
+         version_2_with_negative=version_2_with_negative,
+         xlnet_format=xlnet_format)
 
     _NbestPrediction = collections.namedtuple(  # pylint: disable=invalid-name
         "NbestPrediction", ["text", "start_logit", "end_logit"])
@@ -885,6 +973,265 @@ def get_final_text(pred_text, orig_text, do_lower_case, verbose=False):
   return output_text
 
 
+_PrelimPrediction = collections.namedtuple(  # pylint: disable=invalid-name
+    "PrelimPrediction",
+    ["feature_index", "start_index", "end_index", "start_logit", "end_logit"])
+
+
+def _get_prelim_predictions_reference(features,
+                                      unique_id_to_result,
+                                      n_best_size,
+                                      max_answer_length,
+                                      version_2_with_negative=False,
+                                      xlnet_format=False):
+  """Scores the candidate spans of `features` one by one.
+
+  This is the reference implementation of `_get_prelim_predictions`.
+
+  Args:
+    features: the `InputFeatures` of an example.
+    unique_id_to_result: a dict from feature `unique_id` to model result.
+    n_best_size: the number of start and end candidates per feature.
+    max_answer_length: the maximum length of a predicted answer, in tokens.
+    version_2_with_negative: whether to add the null prediction.
+    xlnet_format: whether the results are in the XLNet format.
+
+  Returns:
+    A tuple of the `_PrelimPrediction`s sorted by decreasing score, the
+    minimum null score and the start and end logits of that null score.
+  """
+  prelim_predictions = []
+  # keep track of the minimum score of null start+end of position 0
+  score_null = 1000000  # large and positive
+  min_null_feature_index = 0  # the paragraph slice with min mull score
+  null_start_logit = 0  # the start logit at the slice with min null score
+  null_end_logit = 0  # the end logit at the slice with min null score
+  for (feature_index, feature) in enumerate(features):
+    if feature.unique_id not in unique_id_to_result:
+      logging.info("Skip eval example %s, not in pred.", feature.unique_id)
+      continue
+    result = unique_id_to_result[feature.unique_id]
+
+    # if we could have irrelevant answers, get the min score of irrelevant
+    if version_2_with_negative:
+      if xlnet_format:
+        feature_null_score = result.class_logits
+      else:
+        feature_null_score = result.start_logits[0] + result.end_logits[0]
+      if feature_null_score < score_null:
+        score_null = feature_null_score
+        min_null_feature_index = feature_index
+        null_start_logit = result.start_logits[0]
+        null_end_logit = result.end_logits[0]
+    for (start_index, start_logit,
+         end_index, end_logit) in _get_best_indexes_and_logits(
+             result=result,
+             n_best_size=n_best_size,
+             xlnet_format=xlnet_format):
+      # We could hypothetically create invalid predictions, e.g., predict
+      # that the start of the span is in the question. We throw out all
+      # invalid predictions.
+      if start_index >= len(feature.tokens):
+        continue
+      if end_index >= len(feature.tokens):
+        continue
+      if start_index not in feature.token_to_orig_map:
+        continue
+      if end_index not in feature.token_to_orig_map:
+        continue
+      if not feature.token_is_max_context.get(start_index, False):
+        continue
+      if end_index < start_index:
+        continue
+      length = end_index - start_index + 1
+      if length > max_answer_length:
+        continue
+      prelim_predictions.append(
+          _PrelimPrediction(
+              feature_index=feature_index,
+              start_index=start_index,
+              end_index=end_index,
+              start_logit=start_logit,
+              end_logit=end_logit))
+
+  if version_2_with_negative and not xlnet_format:
+    prelim_predictions.append(
+        _PrelimPrediction(
+            feature_index=min_null_feature_index,
+            start_index=0,
+            end_index=0,
+            start_logit=null_start_logit,
+            end_logit=null_end_logit))
+  prelim_predictions = sorted(
+      prelim_predictions,
+      key=lambda x: (x.start_logit + x.end_logit),
+      reverse=True)
+  return prelim_predictions, score_null, null_start_logit, null_end_logit
+
+
+def _get_top_k_positions(logits, k):
+  """Returns the positions of the `k` largest `logits`, in decreasing order.
+
+  Tied logits are ordered by position, as with the stable `sorted`.
+  """
+  if k >= len(logits):
+    return np.argsort(-logits, kind="stable")
+  threshold = np.partition(logits, len(logits) - k)[len(logits) - k]
+  above = np.flatnonzero(logits > threshold)
+  ties = np.flatnonzero(logits == threshold)[:k - len(above)]
+  positions = np.concatenate([above, ties])
+  return positions[np.argsort(-logits[positions], kind="stable")]
+
+
+def _get_token_mask(indexes, feature, check_max_context):
+  """Returns whether the token `indexes` of `feature` may bound an answer."""
+  num_tokens = len(feature.tokens)
+  if check_max_context:
+    is_valid = (i < num_tokens and i in feature.token_to_orig_map and
+                feature.token_is_max_context.get(i, False)
+                for i in indexes.ravel().tolist())
+  else:
+    is_valid = (i < num_tokens and i in feature.token_to_orig_map
+                for i in indexes.ravel().tolist())
+  return np.fromiter(is_valid, dtype=bool,
+                     count=indexes.size).reshape(indexes.shape)
+
+
+def _get_prelim_predictions(features,
+                            unique_id_to_result,
+                            n_best_size,
+                            max_answer_length,
+                            version_2_with_negative=False,
+                            xlnet_format=False):
+  """Scores the candidate spans of `features` with NumPy.
+
+  For every feature, the n-best start and end candidates form a start x end
+  score matrix which is masked down to the valid spans at once. The valid spans
+  of all the features and the null span are then sorted together, and the
+  `_PrelimPrediction`s are only created as they are consumed, which is usually
+  only a handful of them. The predictions are the same, in the same order, as
+  those of `_get_prelim_predictions_reference`.
+
+  Args:
+    features: the `InputFeatures` of an example.
+    unique_id_to_result: a dict from feature `unique_id` to model result.
+    n_best_size: the number of start and end candidates per feature.
+    max_answer_length: the maximum length of a predicted answer, in tokens.
+    version_2_with_negative: whether to add the null prediction.
+    xlnet_format: whether the results are in the XLNet format.
+
+  Returns:
+    A tuple of an iterator over the `_PrelimPrediction`s sorted by decreasing
+    score, the minimum null score and the start and end logits of that null
+    score.
+  """
+  score_null = 1000000  # large and positive
+  min_null_feature_index = 0
+  null_start_logit = 0
+  null_end_logit = 0
+  results = {}
+  all_scores = []
+  all_feature_indexes = []
+  all_start_positions = []
+  all_end_positions = []
+  for (feature_index, feature) in enumerate(features):
+    if feature.unique_id not in unique_id_to_result:
+      logging.info("Skip eval example %s, not in pred.", feature.unique_id)
+      continue
+    result = unique_id_to_result[feature.unique_id]
+    results[feature_index] = result
+
+    if version_2_with_negative:
+      if xlnet_format:
+        feature_null_score = result.class_logits
+      else:
+        feature_null_score = result.start_logits[0] + result.end_logits[0]
+      if feature_null_score < score_null:
+        score_null = feature_null_score
+        min_null_feature_index = feature_index
+        null_start_logit = result.start_logits[0]
+        null_end_logit = result.end_logits[0]
+
+    # The candidate spans are the pairs of the n-best start and end logits, as
+    # two broadcastable arrays of positions in the logits. Their row-major
+    # order is the order in which `_get_best_indexes_and_logits` generates
+    # them.
+    start_logits = np.asarray(result.start_logits)
+    end_logits = np.asarray(result.end_logits)
+    if xlnet_format:
+      start_positions = np.arange(n_best_size)[:, None]
+      end_positions = np.arange(n_best_size * n_best_size).reshape(
+          n_best_size, n_best_size)
+      start_indexes = np.asarray(result.start_indexes)[start_positions]
+      end_indexes = np.asarray(result.end_indexes)[end_positions]
+    else:
+      start_positions = _get_top_k_positions(start_logits, n_best_size)[:, None]
+      end_positions = _get_top_k_positions(end_logits, n_best_size)[None, :]
+      start_indexes = start_positions
+      end_indexes = end_positions
+
+    # Filter out the invalid spans, e.g. those that start in the question.
+    valid = (_get_token_mask(start_indexes, feature, check_max_context=True) &
+             _get_token_mask(end_indexes, feature, check_max_context=False) &
+             (end_indexes >= start_indexes) &
+             (end_indexes - start_indexes + 1 <= max_answer_length))
+    start_positions, end_positions = np.broadcast_arrays(
+        start_positions, end_positions)
+    start_positions = start_positions[valid]
+    end_positions = end_positions[valid]
+    all_scores.append(start_logits[start_positions] +
+                      end_logits[end_positions])
+    all_feature_indexes.append(np.full_like(start_positions, feature_index))
+    all_start_positions.append(start_positions)
+    all_end_positions.append(end_positions)
+
+  if version_2_with_negative and not xlnet_format:
+    all_scores.append(np.asarray([null_start_logit + null_end_logit]))
+    all_feature_indexes.append(np.asarray([-1]))
+    all_start_positions.append(np.asarray([-1]))
+    all_end_positions.append(np.asarray([-1]))
+  if not all_scores:
+    return iter([]), score_null, null_start_logit, null_end_logit
+
+  scores = np.concatenate(all_scores)
+  feature_indexes = np.concatenate(all_feature_indexes)
+  start_positions = np.concatenate(all_start_positions)
+  end_positions = np.concatenate(all_end_positions)
+  # Python's `sorted` is stable also with `reverse=True`, so the candidates
+  # with the same score stay in the order they were generated in.
+  order = np.argsort(-scores, kind="stable")
+
+  def _generate_prelim_predictions():
+    for k in order:
+      feature_index = int(feature_indexes[k])
+      if feature_index < 0:
+        yield _PrelimPrediction(
+            feature_index=min_null_feature_index,
+            start_index=0,
+            end_index=0,
+            start_logit=null_start_logit,
+            end_logit=null_end_logit)
+        continue
+      result = results[feature_index]
+      start_position = int(start_positions[k])
+      end_position = int(end_positions[k])
+      if xlnet_format:
+        start_index = result.start_indexes[start_position]
+        end_index = result.end_indexes[end_position]
+      else:
+        start_index = start_position
+        end_index = end_position
+      yield _PrelimPrediction(
+          feature_index=feature_index,
+          start_index=start_index,
+          end_index=end_index,
+          start_logit=result.start_logits[start_position],
+          end_logit=result.end_logits[end_position])
+
+  return (_generate_prelim_predictions(), score_null, null_start_logit,
+          null_end_logit)
+
+
 def _get_best_indexes_and_logits(result,
                                  n_best_size,
                                  xlnet_format=False):
@@ -942,7 +1289,8 @@ def generate_tf_record_from_json_file(input_file_path,
                                       max_query_length=64,
                                       doc_stride=128,
                                       version_2_with_negative=False,
-                                      xlnet_format=False):
+                                      xlnet_format=False,
+                                      num_workers=0):
   """Generates and saves training data into a tf record file."""
   train_examples = read_squad_examples(
       input_file=input_file_path,
@@ -960,7 +1308,8 @@ def generate_tf_record_from_json_file(input_file_path,
       max_query_length=max_query_length,
       is_training=True,
       output_fn=train_writer.process_feature,
-      xlnet_format=xlnet_format)
+      xlnet_format=xlnet_format,
+      num_workers=num_workers)
   train_writer.close()
 
   meta_data = {
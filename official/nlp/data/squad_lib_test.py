@@ -0,0 +1,161 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for official.nlp.data.squad_lib."""
+import collections
+import json
+import os
+import random
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf, tf_keras
+
+from official.nlp.data import squad_lib
+from official.nlp.tools import tokenization
+
+_WORDS = ["the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog."]
+_VOCAB = [
+    "[PAD]", "[UNK]", "[CLS]", "[SEP]", "the", "quick", "brown", "fox", "jump",
+    "##s", "over", "la", "##zy", "dog", "."
+]
+
+
+def _create_fake_squad_file(filename, num_paragraphs, seed=0):
+  """Writes a SQuAD 2.0 file with random contexts and questions."""
+  rng = random.Random(seed)
+  paragraphs = []
+  for p in range(num_paragraphs):
+    doc_tokens = [rng.choice(_WORDS) for _ in range(rng.randint(5, 60))]
+    qas = []
+    for q in range(rng.randint(1, 3)):
+      start = rng.randrange(len(doc_tokens))
+      answer = " ".join(doc_tokens[start:start + rng.randint(1, 3)])
+      is_impossible = rng.random() < 0.2
+      qas.append({
+          "id": "{}-{}".format(p, q),
+          "question": " ".join(rng.choice(_WORDS) for _ in range(5)),
+          "answers": [] if is_impossible else [{
+              "text": answer,
+              "answer_start": len(" ".join(doc_tokens[:start] + [""])),
+          }],
+          "is_impossible": is_impossible,
+      })
+    paragraphs.append({"context": " ".join(doc_tokens), "qas": qas})
+  with tf.io.gfile.GFile(filename, "w") as f:
+    json.dump({"data": [{"paragraphs": paragraphs}]}, f)
+
+
+_RawResult = collections.namedtuple("RawResult", [
+    "unique_id", "start_logits", "end_logits", "start_indexes", "end_indexes",
+    "class_logits"
+])
+
+
+class SquadLibTest(tf.test.TestCase, parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    vocab_file = os.path.join(self.get_temp_dir(), "vocab.txt")
+    with tf.io.gfile.GFile(vocab_file, "w") as f:
+      f.write("\n".join(_VOCAB))
+    self._tokenizer = tokenization.FullTokenizer(vocab_file)
+    self._squad_file = os.path.join(self.get_temp_dir(), "squad.json")
+    _create_fake_squad_file(self._squad_file, num_paragraphs=20)
+
+  def _convert_examples_to_features(self, is_training, num_workers):
+    examples = squad_lib.read_squad_examples(
+        self._squad_file,
+        is_training=is_training,
+        version_2_with_negative=True)
+    features = []
+    if is_training:
+      output_fn = lambda feature: features.append(vars(feature))
+    else:
+      # Skip the padding features.
+      output_fn = lambda feature, is_padding: (
+          None if is_padding else features.append(vars(feature)))
+    num_features = squad_lib.convert_examples_to_features(
+        examples,
+        self._tokenizer,
+        max_seq_length=32,
+        doc_stride=16,
+        max_query_length=8,
+        is_training=is_training,
+        output_fn=output_fn,
+        batch_size=4,
+        num_workers=num_workers)
+    return num_features, features
+
+  @parameterized.parameters(True, False)
+  def test_convert_examples_to_features_with_workers(self, is_training):
+    num_features, features = self._convert_examples_to_features(
+        is_training, num_workers=0)
+    self.assertEqual([f["unique_id"] for f in features],
+                     list(range(1000000000, 1000000000 + len(features))))
+
+    self.assertEqual(
+        self._convert_examples_to_features(is_training, num_workers=2),
+        (num_features, features))
+
+  @parameterized.parameters((False, False), (True, False), (True, True))
+  def test_postprocess_output_vectorized(self, version_2_with_negative,
+                                         xlnet_format):
+    max_seq_length = 32
+    n_best_size = 5
+    examples = squad_lib.read_squad_examples(
+        self._squad_file, is_training=False, version_2_with_negative=True)
+    features = []
+    squad_lib.convert_examples_to_features(
+        examples,
+        self._tokenizer,
+        max_seq_length=max_seq_length,
+        doc_stride=16,
+        max_query_length=8,
+        is_training=False,
+        output_fn=lambda feature, is_padding: features.append(feature),
+        batch_size=1)
+
+    # Rounded logits, so that there are ties to break.
+    rng = np.random.RandomState(0)
+    results = []
+    for feature in features[:-1]:
+      results.append(_RawResult(
+          unique_id=feature.unique_id,
+          start_logits=rng.randn(max_seq_length).round(1).tolist(),
+          end_logits=rng.randn(n_best_size * n_best_size).round(1).tolist()
+          if xlnet_format else rng.randn(max_seq_length).round(1).tolist(),
+          start_indexes=rng.randint(max_seq_length, size=n_best_size).tolist(),
+          end_indexes=rng.randint(
+              max_seq_length, size=n_best_size * n_best_size).tolist(),
+          class_logits=rng.randn()))
+
+    outputs = [
+        squad_lib.postprocess_output(
+            examples,
+            features,
+            results,
+            n_best_size=n_best_size,
+            max_answer_length=4,
+            do_lower_case=True,
+            version_2_with_negative=version_2_with_negative,
+            xlnet_format=xlnet_format,
+            vectorized=vectorized) for vectorized in (False, True)
+    ]
+    self.assertEqual(outputs[0], outputs[1])
+    self.assertNotEmpty(outputs[1][0])
+
+
+if __name__ == "__main__":
+  tf.test.main()
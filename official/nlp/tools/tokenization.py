@@ -20,6 +20,7 @@ https://github.com/google-research/bert/blob/master/tokenization.py.
 """
 
 import collections
+import functools
 import re
 import unicodedata
 
@@ -155,6 +156,11 @@ def convert_ids_to_tokens(inv_vocab, ids):
   return convert_by_vocab(inv_vocab, ids)
 
 
+# The key marking the end of a vocab piece in the `WordpieceTokenizer` tries.
+# It cannot clash with the single characters used as the other keys.
+_TRIE_END = ""
+
+
 def whitespace_tokenize(text):
   """Runs basic whitespace cleaning and splitting on a piece of text."""
   text = text.strip()
@@ -182,6 +188,10 @@ class FullTokenizer(object):
 
     return split_tokens
 
+  def tokenize_batch(self, texts):
+    """Tokenizes a batch of texts, returning a list of token lists."""
+    return [self.tokenize(text) for text in texts]
+
   def convert_tokens_to_ids(self, tokens):
     return convert_by_vocab(self.vocab, tokens)
 
@@ -314,10 +324,87 @@ class BasicTokenizer(object):
 class WordpieceTokenizer(object):
   """Runs WordPiece tokenziation."""
 
-  def __init__(self, vocab, unk_token="[UNK]", max_input_chars_per_word=400):
+  def __init__(self, vocab, unk_token="[UNK]", max_input_chars_per_word=400,
+               cache_size=65536):
+    """Constructs a WordpieceTokenizer.
+
+    Args:
+      vocab: A dict mapping the word pieces to ids. The lookup tries are built
+        from it once, so it must not be modified afterwards.
+      unk_token: The token for words that cannot be tokenized.
+      max_input_chars_per_word: Words longer than this are tokenized as
+        `unk_token`.
+      cache_size: The maximum number of words whose word pieces are cached. If
+        0, no caching is done.
+    """
     self.vocab = vocab
     self.unk_token = unk_token
     self.max_input_chars_per_word = max_input_chars_per_word
+    self.cache_size = cache_size
+    # Tries of the pieces matched at the start of a word (all the pieces, as
+    # they are) and of the pieces matched after it (the "##" pieces, without
+    # the "##").
+    self._prefix_trie = {}
+    self._suffix_trie = {}
+    for piece in vocab:
+      self._add_to_trie(self._prefix_trie, piece, piece)
+      if piece.startswith("##"):
+        self._add_to_trie(self._suffix_trie, piece[2:], piece)
+    self._init_cache()
+
+  @staticmethod
+  def _add_to_trie(trie, chars, piece):
+    if not chars:
+      return
+    node = trie
+    for char in chars:
+      node = node.setdefault(char, {})
+    node[_TRIE_END] = piece
+
+  def _init_cache(self):
+    if self.cache_size:
+      self._tokenize_word = functools.lru_cache(maxsize=self.cache_size)(
+          self._tokenize_word_uncached)
+    else:
+      self._tokenize_word = self._tokenize_word_uncached
+
+  def __getstate__(self):
+    # The cache wraps a bound method and cannot be pickled.
+    state = self.__dict__.copy()
+    del state["_tokenize_word"]
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._init_cache()
+
+  def _tokenize_word_uncached(self, word):
+    """Returns the word pieces of a single word as a tuple."""
+    if len(word) > self.max_input_chars_per_word:
+      return (self.unk_token,)
+
+    sub_tokens = []
+    start = 0
+    trie = self._prefix_trie
+    while start < len(word):
+      # Walk the trie to find the longest piece in the vocab starting at
+      # `start`.
+      node = trie
+      cur_substr = None
+      end = start
+      for i in range(start, len(word)):
+        node = node.get(word[i])
+        if node is None:
+          break
+        if _TRIE_END in node:
+          cur_substr = node[_TRIE_END]
+          end = i + 1
+      if cur_substr is None:
+        return (self.unk_token,)
+      sub_tokens.append(cur_substr)
+      start = end
+      trie = self._suffix_trie
+    return tuple(sub_tokens)
 
   def tokenize(self, text):
     """Tokenizes a piece of text into its word pieces.
@@ -341,35 +428,7 @@ class WordpieceTokenizer(object):
 
     output_tokens = []
     for token in whitespace_tokenize(text):
-      chars = list(token)
-      if len(chars) > self.max_input_chars_per_word:
-        output_tokens.append(self.unk_token)
-        continue
-
-      is_bad = False
-      start = 0
-      sub_tokens = []
-      while start < len(chars):
-        end = len(chars)
-        cur_substr = None
-        while start < end:
-          substr = "".join(chars[start:end])
-          if start > 0:
-            substr = "##" + substr
-          if substr in self.vocab:
-            cur_substr = substr
-            break
-          end -= 1
-        if cur_substr is None:
-          is_bad = True
-          break
-        sub_tokens.append(cur_substr)
-        start = end
-
-      if is_bad:
-        output_tokens.append(self.unk_token)
-      else:
-        output_tokens.extend(sub_tokens)
+      output_tokens.extend(self._tokenize_word(token))
     return output_tokens
 
 
@@ -532,6 +591,10 @@ class FullSentencePieceTokenizer(object):
     """Tokenizes text into pieces."""
     return encode_pieces(self.sp_model, text)
 
+  def tokenize_batch(self, texts):
+    """Tokenizes a batch of texts, returning a list of piece lists."""
+    return [self.tokenize(text) for text in texts]
+
   def convert_tokens_to_ids(self, tokens):
     """Converts a list of tokens to a list of ids."""
     return [self.sp_model.PieceToId(printable_text(token)) for token in tokens]
@@ -0,0 +1,145 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks WordPiece tokenization.
+
+Compares `WordpieceTokenizer` with the original quadratic greedy
+longest-match implementation on a synthetic corpus whose word frequencies
+follow Zipf's law, as in natural text. Words are built from a fixed set of
+syllables so that most of them are split into several word pieces.
+
+Run with:
+  python -m official.nlp.tools.tokenization_benchmark --benchmark_filter=.
+"""
+
+import time
+
+import numpy as np
+import tensorflow as tf, tf_keras
+
+from official.nlp.tools import tokenization
+
+_SYLLABLES = [
+    "a", "an", "ar", "be", "ca", "con", "de", "di", "el", "en", "er", "es",
+    "ing", "ion", "is", "ka", "la", "le", "li", "ma", "men", "ne", "o", "or",
+    "pa", "pre", "ra", "re", "ro", "sa", "se", "ta", "te", "ter", "ti", "to",
+    "tion", "u", "un", "ve"
+]
+
+
+def _reference_tokenize(wordpiece_tokenizer, text):
+  """The original greedy longest-match-first WordPiece tokenization."""
+  output_tokens = []
+  for token in tokenization.whitespace_tokenize(text):
+    chars = list(token)
+    if len(chars) > wordpiece_tokenizer.max_input_chars_per_word:
+      output_tokens.append(wordpiece_tokenizer.unk_token)
+      continue
+
+    is_bad = False
+    start = 0
+    sub_tokens = []
+    while start < len(chars):
+      end = len(chars)
+      cur_substr = None
+      while start < end:
+        substr = "".join(chars[start:end])
+        if start > 0:
+          substr = "##" + substr
+        if substr in wordpiece_tokenizer.vocab:
+          cur_substr = substr
+          break
+        end -= 1
+      if cur_substr is None:
+        is_bad = True
+        break
+      sub_tokens.append(cur_substr)
+      start = end
+
+    if is_bad:
+      output_tokens.append(wordpiece_tokenizer.unk_token)
+    else:
+      output_tokens.extend(sub_tokens)
+  return output_tokens
+
+
+def _create_vocab_and_corpus(num_words, num_lines, words_per_line=20,
+                             vocab_size=30000):
+  """Creates a WordPiece vocab and a corpus of `num_lines` lines."""
+  rng = np.random.RandomState(0)
+  words = []
+  for _ in range(num_words):
+    num_syllables = rng.randint(1, 6)
+    words.append("".join(rng.choice(_SYLLABLES, num_syllables)))
+
+  # The most frequent words are in the vocab as a whole, the others are split
+  # into syllables and characters.
+  vocab = ["[UNK]"] + sorted(set(_SYLLABLES))
+  vocab += ["##" + s for s in sorted(set(_SYLLABLES))]
+  vocab += sorted(set("".join(_SYLLABLES)))
+  vocab += ["##" + c for c in sorted(set("".join(_SYLLABLES)))]
+  vocab = list(dict.fromkeys(vocab + words))[:vocab_size]
+  vocab = {piece: i for i, piece in enumerate(vocab)}
+
+  word_ids = np.minimum(
+      rng.zipf(1.2, size=num_lines * words_per_line), num_words) - 1
+  corpus = [
+      " ".join(words[i] for i in word_ids[j:j + words_per_line])
+      for j in range(0, len(word_ids), words_per_line)
+  ]
+  return vocab, corpus
+
+
+class TokenizationBenchmark(tf.test.Benchmark):
+  """Benchmarks for `WordpieceTokenizer`."""
+
+  def _run(self, name, num_lines, num_words=200000):
+    vocab, corpus = _create_vocab_and_corpus(num_words, num_lines)
+    tokenizer = tokenization.WordpieceTokenizer(vocab=vocab)
+
+    start = time.time()
+    reference_tokens = [_reference_tokenize(tokenizer, line) for line in corpus]
+    reference_wall_time = time.time() - start
+
+    start = time.time()
+    tokens = [tokenizer.tokenize(line) for line in corpus]
+    wall_time = time.time() - start
+
+    if tokens != reference_tokens:
+      raise AssertionError("The tokenizers produced different tokens.")
+
+    num_tokens = sum(len(line_tokens) for line_tokens in tokens)
+    self.report_benchmark(
+        name=name + "_reference",
+        iters=1,
+        wall_time=reference_wall_time,
+        extras={"tokens_per_sec": num_tokens / reference_wall_time})
+    self.report_benchmark(
+        name=name,
+        iters=1,
+        wall_time=wall_time,
+        extras={
+            "tokens_per_sec": num_tokens / wall_time,
+            "speedup": reference_wall_time / wall_time
+        })
+
+  def benchmark_wordpiece_10k_lines(self):
+    self._run("wordpiece_10k_lines", num_lines=10000)
+
+  def benchmark_wordpiece_100k_lines(self):
+    self._run("wordpiece_100k_lines", num_lines=100000)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import os
+import pickle
 import tempfile
 
 import six
@@ -109,6 +110,38 @@ class TokenizationTest(tf.test.TestCase):
     self.assertAllEqual(
         tokenizer.tokenize("unwantedX running"), ["[UNK]", "runn", "##ing"])
 
+  def test_wordpiece_tokenizer_cache(self):
+    vocab_tokens = [
+        "[UNK]", "##want", "##ed", "un", "unw", "##anted", "##wanted", "##"
+    ]
+    vocab = {token: i for i, token in enumerate(vocab_tokens)}
+    text = "unwanted unwanted ##wanted unwantedX unwan"
+    expected = ["unw", "##anted", "unw", "##anted", "##wanted", "[UNK]",
+                "[UNK]"]
+
+    for cache_size in (0, 1, 100):
+      tokenizer = tokenization.WordpieceTokenizer(
+          vocab=vocab, cache_size=cache_size)
+      self.assertAllEqual(tokenizer.tokenize(text), expected)
+      self.assertAllEqual(tokenizer.tokenize(text), expected)
+      tokenizer = pickle.loads(pickle.dumps(tokenizer))
+      self.assertAllEqual(tokenizer.tokenize(text), expected)
+
+  def test_full_tokenizer_tokenize_batch(self):
+    vocab_tokens = ["[UNK]", "want", "##ed", "un", "##want", ","]
+    with tempfile.NamedTemporaryFile(delete=False) as vocab_writer:
+      vocab_writer.write("".join([x + "\n" for x in vocab_tokens
+                                 ]).encode("utf-8"))
+      vocab_file = vocab_writer.name
+
+    tokenizer = tokenization.FullTokenizer(vocab_file)
+    os.unlink(vocab_file)
+
+    texts = [u"UNwant\u00E9d,want", u"", u"wanted"]
+    self.assertAllEqual(
+        tokenizer.tokenize_batch(texts),
+        [tokenizer.tokenize(text) for text in texts])
+
   def test_convert_tokens_to_ids(self):
     vocab_tokens = [
         "[UNK]", "[CLS]", "[SEP]", "want", "##want", "##ed", "wa", "un", "runn",
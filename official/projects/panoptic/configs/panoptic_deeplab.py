@@ -174,6 +174,8 @@ class Evaluation(hyperparams.Config):
       default_factory=list)
   rescale_predictions: bool = True
   report_per_class_pq: bool = False
+  # The number of processes to compute the panoptic quality with.
+  num_workers: int = 0
 
   report_per_class_iou: bool = False
   report_train_mean_iou: bool = True  # Turning this off can speed up training.
@@ -230,7 +230,8 @@ class PanopticDeeplabTask(base_task.Task):
                 .max_instances_per_category,
                 offset=eval_config.offset,
                 is_thing=eval_config.is_thing,
-                rescale_predictions=eval_config.rescale_predictions))
+                rescale_predictions=eval_config.rescale_predictions,
+                num_workers=eval_config.num_workers))
 
     return metrics
 
@@ -12,9 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""A script to run waymo open dataset preprocessing."""
+"""A script to run waymo open dataset preprocessing.
 
+By default the preprocessing runs as a Beam pipeline configured by
+--pipeline_options. With --num_workers > 0 it instead runs locally in a process
+pool: the source segments are split into --num_shards output shards of
+balanced size, each shard is processed by one worker, and every completed
+shard is recorded in a manifest next to the output so that an interrupted run
+resumes from the shards that are not done yet.
+"""
+
+import json
+import multiprocessing
 import os
+from typing import List, Mapping, Sequence, Tuple
 
 from absl import app
 from absl import flags
@@ -42,6 +53,13 @@ _PIPELINE_OPTIONS = flags.DEFINE_string(
     'pipeline_options', None,
     'Command line flags to use in constructing the Beam pipeline options. '
     'See https://beam.apache.org/documentation/#runners for available runners.')
+_NUM_WORKERS = flags.DEFINE_integer(
+    'num_workers', 0,
+    'If > 0, processes the dataset locally with this many worker processes '
+    'instead of running a Beam pipeline.')
+_NUM_SHARDS = flags.DEFINE_integer(
+    'num_shards', 256,
+    'The number of output shards per folder in local mode.')
 
 # The --src_dir must contain these two sub-folders.
 _SRC_FOLDERS = ['training', 'validation']
@@ -91,25 +109,232 @@ def process_wod(pipeline: beam.Pipeline,
   write_dataset(examples, dst_path)
 
 
-def main(_):
-  pipeline_options = beam.options.pipeline_options.PipelineOptions(
-      _PIPELINE_OPTIONS.value.split(','))
-
-  if _CONFIG_FILE.value:
-    cfg = hyperparams.read_yaml_to_params_dict(_CONFIG_FILE.value)
+def create_wod_processor(config_file: str) -> WodProcessor:
+  """Creates a `WodProcessor` from a YAML config file or the defaults."""
+  if config_file:
+    cfg = hyperparams.read_yaml_to_params_dict(config_file)
     image_config = cfg.task.model.image
     pillars_config = cfg.task.model.pillars
   else:
     cfg = pointpillars
     image_config = cfg.ImageConfig()
     pillars_config = cfg.PillarsConfig()
+  return WodProcessor(image_config, pillars_config)
+
+
+def assign_segments_to_shards(segments: Sequence[str],
+                              num_shards: int) -> List[List[str]]:
+  """Assigns segment files to output shards of balanced total size.
+
+  Segments are assigned greedily, largest first, to the shard with the
+  smallest total size so far. The assignment only depends on the segment
+  names and sizes, so it is the same when a run is resumed.
+
+  Args:
+    segments: A sequence of segment file paths.
+    num_shards: The number of output shards.
+
+  Returns:
+    A list of `num_shards` lists of segment paths, each sorted by name.
+  """
+  sizes = {segment: tf.io.gfile.stat(segment).length for segment in segments}
+  shards = [[] for _ in range(num_shards)]
+  shard_sizes = [0] * num_shards
+  for segment in sorted(segments, key=lambda s: (-sizes[s], s)):
+    i = min(range(num_shards), key=lambda j: (shard_sizes[j], j))
+    shards[i].append(segment)
+    shard_sizes[i] += sizes[segment]
+  return [sorted(shard) for shard in shards]
+
+
+def _read_manifest(manifest_path: str) -> Mapping[str, Mapping[str, object]]:
+  """Reads the completed shards of a manifest, keyed by shard file name."""
+  if not tf.io.gfile.exists(manifest_path):
+    return {}
+  with tf.io.gfile.GFile(manifest_path, 'r') as f:
+    entries = [json.loads(line) for line in f if line.strip()]
+  return {entry['shard']: entry for entry in entries}
+
+
+def _write_manifest(manifest_path: str,
+                    entries: Mapping[str, Mapping[str, object]]):
+  """Atomically rewrites the manifest with the completed shard `entries`."""
+  tmp_path = manifest_path + '.tmp'
+  with tf.io.gfile.GFile(tmp_path, 'w') as f:
+    for shard in sorted(entries):
+      f.write(json.dumps(entries[shard]) + '\n')
+  tf.io.gfile.rename(tmp_path, manifest_path, overwrite=True)
+
+
+def _shard_path(dst_path: str, index: int, num_shards: int) -> str:
+  return '%s-%05d-of-%05d.tfrecord' % (dst_path, index, num_shards)
+
+
+def remove_stale_shards(dst_path: str, num_shards: int) -> List[str]:
+  """Removes the shards of `dst_path` written with another number of shards.
+
+  Shards of a previous run with a different `num_shards`, and their partial
+  temporary files, would otherwise be matched by `{dst_path}*` globs next to
+  the new shards.
+
+  Args:
+    dst_path: The prefix path of the output files.
+    num_shards: The number of output shards of the current run.
+
+  Returns:
+    The sorted list of removed files.
+  """
+  suffix = '-of-%05d.tfrecord' % num_shards
+  stale = []
+  for pattern in ('-?????-of-?????.tfrecord', '-?????-of-?????.tfrecord.tmp'):
+    for path in tf.io.gfile.glob(dst_path + pattern):
+      if not path.endswith((suffix, suffix + '.tmp')):
+        stale.append(path)
+  for path in sorted(stale):
+    logging.info('Removing %s written with a different number of shards.',
+                 path)
+    tf.io.gfile.remove(path)
+  return sorted(stale)
 
-  wod_processor = WodProcessor(image_config, pillars_config)
+
+def plan_shards(
+    segments: Sequence[str], dst_path: str, num_shards: int,
+    previous_manifest: Mapping[str, Mapping[str, object]]
+) -> Tuple[Mapping[str, Mapping[str, object]], List[Tuple[Sequence[str], str]]]:
+  """Splits the shards into the completed ones and the ones to write.
+
+  A shard is completed if it exists and is listed in `previous_manifest` with
+  the segments it is assigned to now.
+
+  Args:
+    segments: A sequence of segment file paths.
+    dst_path: The prefix path of the output files.
+    num_shards: The number of output shards.
+    previous_manifest: The manifest entries of a previous run, keyed by shard
+      file name.
+
+  Returns:
+    A tuple of the manifest entries of the completed shards, keyed by shard
+    file name, and a list of (segments, shard_path) of the shards to write.
+  """
+  manifest = {}
+  shards_to_write = []
+  for i, segments_of_shard in enumerate(
+      assign_segments_to_shards(segments, num_shards)):
+    shard_path = _shard_path(dst_path, i, num_shards)
+    shard = os.path.basename(shard_path)
+    names = [os.path.basename(segment) for segment in segments_of_shard]
+    entry = previous_manifest.get(shard)
+    if (entry is not None and entry['segments'] == names and
+        tf.io.gfile.exists(shard_path)):
+      manifest[shard] = entry
+    else:
+      shards_to_write.append((segments_of_shard, shard_path))
+  return manifest, shards_to_write
+
+
+def _process_shard(
+    task: Tuple[str, Sequence[str], str]) -> Tuple[str, Sequence[str], int]:
+  """Processes the frames of the segments of a shard into the shard file.
+
+  Args:
+    task: A tuple of (config_file, segments, shard_path).
+
+  Returns:
+    A tuple of (shard_path, segments, number of written examples).
+  """
+  config_file, segments, shard_path = task
+  # A fresh processor per shard keeps the output of a shard independent of
+  # which worker processes it and of the other shards.
+  wod_processor = create_wod_processor(config_file)
+  tmp_path = shard_path + '.tmp'
+  num_examples = 0
+  with tf.io.TFRecordWriter(tmp_path, options='GZIP') as writer:
+    for segment in segments:
+      for record in tf.data.TFRecordDataset(segment):
+        frame = dataset_pb2.Frame.FromString(record.numpy())
+        example = wod_processor.process_and_convert_to_tf_example(frame)
+        writer.write(example.SerializeToString())
+        num_examples += 1
+  tf.io.gfile.rename(tmp_path, shard_path, overwrite=True)
+  return shard_path, segments, num_examples
+
+
+def process_wod_locally(src_file_pattern: str,
+                        dst_path: str,
+                        config_file: str,
+                        num_workers: int,
+                        num_shards: int):
+  """Processes the WOD segments in a local process pool.
+
+  Writes `num_shards` GZIP compressed shards `{dst_path}-?????-of-?????` and a
+  `{dst_path}.manifest.jsonl` file listing the completed shards and their
+  segments. Shards already listed in the manifest with the same segments are
+  skipped, and shards written with a different number of shards are removed.
+
+  Args:
+    src_file_pattern: The file pattern of the source segments.
+    dst_path: The prefix path of the output files.
+    config_file: An optional YAML file to specify configurations.
+    num_workers: The number of worker processes.
+    num_shards: The number of output shards.
+  """
+  segments = tf.io.gfile.glob(src_file_pattern)
+  if not segments:
+    raise ValueError(f'No segments found matching {src_file_pattern}.')
+  num_shards = min(num_shards, len(segments))
+  remove_stale_shards(dst_path, num_shards)
+
+  # Only keep the manifest entries of shards that are still valid, i.e. the
+  # shard exists and was written from the segments it is assigned to now.
+  manifest_path = dst_path + '.manifest.jsonl'
+  manifest, shards_to_write = plan_shards(
+      segments, dst_path, num_shards, _read_manifest(manifest_path))
+  # Drops the entries of removed shards, even if no shard is written.
+  _write_manifest(manifest_path, manifest)
+  tasks = [(config_file, segments_of_shard, shard_path)
+           for segments_of_shard, shard_path in shards_to_write]
+  completed_segments = set()
+  for entry in manifest.values():
+    completed_segments.update(entry['segments'])
+  logging.info(
+      'Processing %d segments into %d shards with %d workers, %d segments '
+      'are already completed.', len(segments), num_shards, num_workers,
+      len(completed_segments))
+
+  # TensorFlow is not fork-safe, so the workers are spawned.
+  context = multiprocessing.get_context('spawn')
+  with context.Pool(num_workers) as pool:
+    for shard_path, segments_of_shard, num_examples in pool.imap_unordered(
+        _process_shard, tasks):
+      names = [os.path.basename(segment) for segment in segments_of_shard]
+      shard = os.path.basename(shard_path)
+      manifest[shard] = {
+          'shard': shard, 'segments': names, 'num_examples': num_examples}
+      _write_manifest(manifest_path, manifest)
+      completed_segments.update(names)
+      logging.info('Wrote %s, %d/%d segments completed.', shard,
+                   len(completed_segments), len(segments))
+
+  num_examples = sum(entry['num_examples'] for entry in manifest.values())
+  with tf.io.gfile.GFile(dst_path + '-00000-of-00001.stats.txt', 'w') as f:
+    f.write(f'{num_examples}\n')
+
+
+def main(_):
   for folder in _SRC_FOLDERS:
     src_file_pattern = os.path.join(_SRC_DIR.value, folder, '*.tfrecord')
     dst_path = os.path.join(_DST_DIR.value, folder)
     logging.info('Processing %s, writing to %s', src_file_pattern, dst_path)
 
+    if _NUM_WORKERS.value > 0:
+      process_wod_locally(src_file_pattern, dst_path, _CONFIG_FILE.value,
+                          _NUM_WORKERS.value, _NUM_SHARDS.value)
+      continue
+
+    pipeline_options = beam.options.pipeline_options.PipelineOptions(
+        _PIPELINE_OPTIONS.value.split(','))
+    wod_processor = create_wod_processor(_CONFIG_FILE.value)
     pipeline = beam.Pipeline(options=pipeline_options)
     process_wod(pipeline, src_file_pattern, dst_path, wod_processor)
     pipeline.run().wait_until_finish()
@@ -0,0 +1,141 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the local sharded mode of process_wod."""
+
+import os
+
+import tensorflow as tf, tf_keras
+
+from official.projects.pointpillars.tools import process_wod
+
+# pylint: disable=protected-access
+
+
+class ProcessWodTest(tf.test.TestCase):
+
+  def _create_segments(self, sizes):
+    """Writes fake segment files of the given sizes in bytes."""
+    segments = []
+    for i, size in enumerate(sizes):
+      path = os.path.join(self.get_temp_dir(), f'segment-{i:02d}.tfrecord')
+      with tf.io.gfile.GFile(path, 'wb') as f:
+        f.write(b'x' * size)
+      segments.append(path)
+    return segments
+
+  def _touch(self, path):
+    with tf.io.gfile.GFile(path, 'w') as f:
+      f.write('')
+
+  def test_assign_segments_to_shards(self):
+    segments = self._create_segments([100, 90, 60, 50, 40, 10])
+    shards = process_wod.assign_segments_to_shards(segments, num_shards=3)
+
+    names = [[os.path.basename(s) for s in shard] for shard in shards]
+    # Largest segment first onto the smallest shard: 100+10, 90+40, 60+50.
+    self.assertEqual(names, [
+        ['segment-00.tfrecord', 'segment-05.tfrecord'],
+        ['segment-01.tfrecord', 'segment-04.tfrecord'],
+        ['segment-02.tfrecord', 'segment-03.tfrecord'],
+    ])
+    # The assignment does not depend on the order of the segments.
+    self.assertEqual(
+        shards,
+        process_wod.assign_segments_to_shards(segments[::-1], num_shards=3))
+
+  def test_plan_shards_skips_completed_shards(self):
+    segments = self._create_segments([100, 90, 50, 40])
+    dst_path = os.path.join(self.get_temp_dir(), 'training')
+    manifest, shards_to_write = process_wod.plan_shards(
+        segments, dst_path, 2, previous_manifest={})
+    self.assertEmpty(manifest)
+    self.assertLen(shards_to_write, 2)
+
+    # Only the first shard was written before the run was interrupted.
+    first_segments, first_path = shards_to_write[0]
+    self._touch(first_path)
+    first_shard = os.path.basename(first_path)
+    entry = {
+        'shard': first_shard,
+        'segments': [os.path.basename(s) for s in first_segments],
+        'num_examples': 3,
+    }
+    manifest, shards_to_write = process_wod.plan_shards(
+        segments, dst_path, 2, previous_manifest={first_shard: entry})
+    self.assertEqual(manifest, {first_shard: entry})
+    self.assertEqual([path for _, path in shards_to_write],
+                     [dst_path + '-00001-of-00002.tfrecord'])
+
+  def test_plan_shards_redoes_invalid_shards(self):
+    segments = self._create_segments([100, 90, 50, 40])
+    dst_path = os.path.join(self.get_temp_dir(), 'training')
+    _, shards_to_write = process_wod.plan_shards(
+        segments, dst_path, 2, previous_manifest={})
+    previous_manifest = {}
+    for segments_of_shard, shard_path in shards_to_write:
+      shard = os.path.basename(shard_path)
+      previous_manifest[shard] = {
+          'shard': shard,
+          'segments': [os.path.basename(s) for s in segments_of_shard],
+          'num_examples': 1,
+      }
+    # The first shard file is missing, and the second one was written from
+    # other segments.
+    self._touch(shards_to_write[1][1])
+    previous_manifest[os.path.basename(shards_to_write[1][1])]['segments'] = [
+        'segment-99.tfrecord'
+    ]
+
+    manifest, redo = process_wod.plan_shards(
+        segments, dst_path, 2, previous_manifest)
+    self.assertEmpty(manifest)
+    self.assertEqual(redo, shards_to_write)
+
+  def test_write_manifest(self):
+    manifest_path = os.path.join(self.get_temp_dir(), 'training.manifest.jsonl')
+    entries = {
+        f'training-0000{i}-of-00002.tfrecord': {
+            'shard': f'training-0000{i}-of-00002.tfrecord',
+            'segments': [f'segment-0{i}.tfrecord'],
+            'num_examples': i,
+        } for i in range(2)
+    }
+    process_wod._write_manifest(manifest_path, entries)
+    self.assertEqual(process_wod._read_manifest(manifest_path), entries)
+
+    # Rewrites the manifest in place, without leaving the temporary file.
+    del entries['training-00001-of-00002.tfrecord']
+    process_wod._write_manifest(manifest_path, entries)
+    self.assertEqual(process_wod._read_manifest(manifest_path), entries)
+    self.assertFalse(tf.io.gfile.exists(manifest_path + '.tmp'))
+    self.assertEqual(
+        process_wod._read_manifest(manifest_path + '.missing'), {})
+
+  def test_remove_stale_shards(self):
+    dst_path = os.path.join(self.get_temp_dir(), 'training')
+    old_shards = [dst_path + '-00000-of-00003.tfrecord',
+                  dst_path + '-00001-of-00003.tfrecord.tmp']
+    new_shards = [dst_path + '-00000-of-00002.tfrecord',
+                  dst_path + '-00001-of-00002.tfrecord.tmp']
+    for path in old_shards + new_shards:
+      self._touch(path)
+
+    removed = process_wod.remove_stale_shards(dst_path, num_shards=2)
+    self.assertEqual(removed, old_shards)
+    self.assertCountEqual(tf.io.gfile.glob(dst_path + '-*'), new_shards)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -61,6 +61,52 @@ def pad_or_trim_to_shape(x: np.ndarray, shape: List[int]) -> np.ndarray:
   return y
 
 
+def group_points_by_pillar(
+    points_location: np.ndarray, image_width: int,
+    max_points_per_pillar: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+  """Group points into pillars by their pseudo image location.
+
+  Points are assigned to the pillar of their image cell in their original
+  order, and only the first `max_points_per_pillar` points of each pillar are
+  kept. This is a vectorized equivalent of filling a dense (h, w, n, f) grid
+  point by point, which is never allocated.
+
+  Args:
+    points_location: An np array (M, 2) of the pseudo image col/row of points.
+    image_width: An int of the pseudo image width.
+    max_points_per_pillar: An int of the maximum number of points per pillar.
+
+  Returns:
+    pillar_locations: An int32 np array (K, 2) of the col/row of the non-empty
+      pillars, in row-major order.
+    pillar_num_points: An int32 np array (K,) of the number of kept points in
+      each pillar.
+    point_indices: An np array (L,) of the indices of the kept points.
+    point_pillars: An np array (L,) of the pillar index of each kept point.
+    point_slots: An np array (L,) of the slot of each kept point in its pillar.
+  """
+  cells = (points_location[:, 1].astype(np.int64) * image_width +
+           points_location[:, 0])
+  # A stable sort keeps the points of each cell in their original order.
+  order = np.argsort(cells, kind='stable')
+  sorted_cells = cells[order]
+  unique_cells, starts, counts = np.unique(
+      sorted_cells, return_index=True, return_counts=True)
+
+  pillar_ids = np.repeat(np.arange(unique_cells.shape[0]), counts)
+  slots = np.arange(sorted_cells.shape[0]) - np.repeat(starts, counts)
+  keep = slots < max_points_per_pillar
+
+  pillar_locations = np.stack(
+      [unique_cells % image_width, unique_cells // image_width],
+      axis=-1).astype(np.int32)
+  pillar_num_points = np.minimum(counts, max_points_per_pillar).astype(
+      np.int32)
+  return (pillar_locations, pillar_num_points, order[keep], pillar_ids[keep],
+          slots[keep])
+
+
 def clip_boxes(boxes: np.ndarray, image_height: int,
                image_width: int) -> np.ndarray:
   """Clip boxes to image boundaries.
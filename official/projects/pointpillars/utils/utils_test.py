@@ -34,6 +34,30 @@ class UtilsTest(parameterized.TestCase, tf.test.TestCase):
     x = utils.pad_or_trim_to_shape(x, expected_shape)
     self.assertAllEqual(x.shape, expected_shape)
 
+  @parameterized.parameters(1, 2, 5)
+  def test_group_points_by_pillar(self, max_points_per_pillar):
+    height, width = 4, 5
+    rng = np.random.default_rng(0)
+    points_location = np.stack(
+        [rng.integers(0, width, 50), rng.integers(0, height, 50)], axis=-1)
+
+    (pillar_locations, pillar_num_points, point_indices, point_pillars,
+     point_slots) = utils.group_points_by_pillar(
+         points_location, width, max_points_per_pillar)
+
+    # Reference: fill a dense grid point by point.
+    grid = {}
+    for i, (c, r) in enumerate(points_location):
+      grid.setdefault((r, c), [])
+      if len(grid[(r, c)]) < max_points_per_pillar:
+        grid[(r, c)].append(i)
+    cells = sorted(grid)
+    self.assertAllEqual(pillar_locations, [[c, r] for r, c in cells])
+    self.assertAllEqual(pillar_num_points, [len(grid[cell]) for cell in cells])
+    for index, pillar, slot in zip(point_indices, point_pillars, point_slots):
+      self.assertEqual(grid[cells[pillar]][slot], index)
+    self.assertLen(point_indices, sum(len(v) for v in grid.values()))
+
   @parameterized.parameters(
       ([[1.1, 1.1, 2.2, 2.2]], 10.0, 5.0),
       ([[1.1, 10.1, 2.2, 10.2]], 10.0, 10.0),
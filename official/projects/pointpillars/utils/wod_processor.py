@@ -218,37 +218,35 @@ class WodProcessor:
       f: number of features per point before processing
       k: number of pillars before trimming or padding
     """
-    h, w = self._image_height, self._image_width
+    w = self._image_width
     p, n, d = (self._num_pillars, self._num_points_per_pillar,
                self._num_features_per_point)
     f = points.shape[-1]
 
-    grid_num_points = np.zeros((h, w), dtype=np.int32)
-    grid_locations = np.zeros((h, w, 2), dtype=np.int32)
-    grid_points = np.zeros((h, w, n, f), dtype=np.float32)
+    # Group points into the non-empty pillars, without materializing the dense
+    # (h, w, n, f) grid.
+    (grid_locations, grid_num_points, point_indices, point_pillars,
+     point_slots) = utils.group_points_by_pillar(points_location, w, n)
 
-    # Fill points into 2D grid.
-    for i, (point, (c, r)) in enumerate(zip(points, points_location)):
-      point_count = grid_num_points[r][c]
-      if point_count == n:
-        continue
-      grid_num_points[r][c] += 1
-      grid_locations[r][c] = [c, r]
-      grid_points[r][c][point_count][:] = point[:]
-
-    # Select k non-empty pillars randomly.
-    selection = np.where(grid_num_points > 0)
-    selection = [(i, j) for i, j in zip(selection[0], selection[1])]
+    # Select k non-empty pillars randomly. Shuffling the pillar indices draws
+    # the same permutation as shuffling the list of pillars.
+    k = grid_num_points.shape[0]
+    selection = np.arange(k)
     self._rng.shuffle(selection)
-    selection = ([i[0] for i in selection], [i[1] for i in selection])
-
-    k = len(selection[0])
+    # Only the pillars kept after trimming to p need to be gathered.
+    selection = selection[:p]
     # (k,)
     pillar_num_points = grid_num_points[selection]
     # (k, 2)
     pillar_locations = grid_locations[selection]
     # (k, n, f)
-    pillar_points = grid_points[selection]
+    pillar_points = np.zeros((selection.shape[0], n, f), dtype=np.float32)
+    pillar_ranks = np.full(k, -1)
+    pillar_ranks[selection] = np.arange(selection.shape[0])
+    point_ranks = pillar_ranks[point_pillars]
+    selected = point_ranks >= 0
+    pillar_points[point_ranks[selected], point_slots[selected]] = (
+        points[point_indices[selected]])
 
     # Pad or trim to p pillars.
     # (p,)
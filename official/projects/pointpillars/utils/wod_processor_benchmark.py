@@ -0,0 +1,76 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks pillar construction in `WodProcessor.compute_pillars`.
+
+Uses synthetic point clouds with roughly as many points as a Waymo frame.
+
+Run with:
+  python -m official.projects.pointpillars.utils.wod_processor_benchmark \
+    --benchmark_filter=.
+"""
+
+import time
+
+import numpy as np
+import tensorflow as tf, tf_keras
+
+from official.projects.pointpillars.configs import pointpillars as cfg
+from official.projects.pointpillars.utils import wod_processor
+
+
+def _create_point_cloud(image_config, num_points, num_features=5):
+  """Creates a random point cloud, denser close to the vehicle."""
+  rng = np.random.default_rng(0)
+  height, width = image_config.height, image_config.width
+  # Most lidar points of a frame are concentrated around the vehicle.
+  radius = np.abs(rng.normal(0, min(height, width) / 6, num_points))
+  angle = rng.uniform(0, 2 * np.pi, num_points)
+  cols = np.clip(width / 2 + radius * np.cos(angle), 0, width - 1)
+  rows = np.clip(height / 2 + radius * np.sin(angle), 0, height - 1)
+  points_location = np.stack([cols, rows], axis=-1).astype(np.int32)
+  points = rng.normal(size=(num_points, num_features)).astype(np.float32)
+  return points, points_location
+
+
+class WodProcessorBenchmark(tf.test.Benchmark):
+  """Benchmarks for `WodProcessor`."""
+
+  def _run(self, name, num_points, iters=5):
+    image_config = cfg.ImageConfig()
+    processor = wod_processor.WodProcessor(image_config, cfg.PillarsConfig())
+    points, points_location = _create_point_cloud(image_config, num_points)
+
+    # Warm up.
+    processor.compute_pillars(points, points_location)
+    start = time.time()
+    for _ in range(iters):
+      processor.compute_pillars(points, points_location)
+    wall_time = (time.time() - start) / iters
+
+    self.report_benchmark(
+        name=name,
+        iters=iters,
+        wall_time=wall_time,
+        extras={'frames_per_sec': 1.0 / wall_time})
+
+  def benchmark_compute_pillars_50k_points(self):
+    self._run('compute_pillars_50k_points', num_points=50000)
+
+  def benchmark_compute_pillars_150k_points(self):
+    self._run('compute_pillars_150k_points', num_points=150000)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -200,6 +200,7 @@ class AnchorBoxes(hyperparams.Config):
   scaling_mode: str = 'sqrt'
   box_generation_mode: str = 'per_level'
   num_samples: int = 1024
+  max_boxes: int = -1
 
   def get(self, min_level, max_level):
     """Distribute them in order to each level.
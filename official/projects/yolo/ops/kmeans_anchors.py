@@ -37,38 +37,113 @@ def _iou(x, centroids_x, iou_type="iou"):
   return iou
 
 
+class _BoxReservoir:
+  """Uniform random sample of a stream of boxes kept in bounded memory."""
+
+  def __init__(self, size, seed=None):
+    self._size = size
+    self._rng = np.random.default_rng(seed)
+    self._boxes = None
+    self.num_seen = 0
+
+  @property
+  def boxes(self):
+    if self._boxes is None:
+      return np.zeros((0, 2), np.float32)
+    return self._boxes[:min(self.num_seen, self._size)]
+
+  def add(self, boxes):
+    """Adds a chunk of boxes with reservoir sampling (Algorithm R)."""
+    if self._boxes is None:
+      self._boxes = np.zeros((self._size,) + boxes.shape[1:], boxes.dtype)
+    positions = self.num_seen + np.arange(boxes.shape[0])
+
+    # the t-th box of the stream fills the reservoir while it is not full, and
+    # then replaces a random box with probability size / (t + 1)
+    slots = np.where(positions < self._size, positions,
+                     self._rng.integers(0, positions + 1))
+    keep = slots < self._size
+
+    # later boxes overwrite the earlier ones that drew the same slot, as if the
+    # boxes of the chunk were added one by one, so only the last box drawing
+    # each slot is written
+    kept_slots = slots[keep][::-1]
+    kept_slots, last = np.unique(kept_slots, return_index=True)
+    self._boxes[kept_slots] = boxes[keep][::-1][last]
+    self.num_seen += boxes.shape[0]
+
+
 class AnchorKMeans:
   """Box Anchor K-means."""
 
+  def __init__(self):
+    self._convergence_report = []
+
   @property
   def boxes(self):
     return self._boxes.numpy()
 
-  def get_box_from_dataset(self, dataset, num_samples=-1):
-    """Load all the boxes in the dataset into memory."""
+  @property
+  def convergence_report(self):
+    """A list with the convergence history of every k-means run.
+
+    Each entry has the number of centroids `k`, the number of boxes, the
+    number of iterations, whether the assignments converged before the maximum
+    number of iterations, and the per-iteration number of reassigned boxes and
+    average IOU between the boxes and their closest centroid.
+    """
+    return self._convergence_report
+
+  def _get_sample_boxes(self, sample):
+    """Returns the normalized width and height of the boxes of a sample."""
+    width = sample["width"]
+    height = sample["height"]
+    boxes = sample["groundtruth_boxes"]
+
+    # convert the box format from yxyx to xywh to allow
+    # kmeans by width height IOU
+    scale = tf.cast([width, height], boxes.dtype)
+
+    # scale the boxes then remove excessily small boxes that are
+    # less than 1 pixel in width or height
+    boxes = box_ops.yxyx_to_xcycwh(boxes)[..., 2:] * scale
+    return boxes[tf.reduce_max(boxes, axis=-1) >= 1] / scale
+
+  def get_box_from_dataset(self, dataset, num_samples=-1, max_boxes=-1,
+                           seed=None):
+    """Load the boxes in the dataset into memory.
+
+    Args:
+      dataset: `tf.data.Dataset` or iterable of decoded samples.
+      num_samples: `int` for number of samples to process in the dataset.
+      max_boxes: `int` for the maximum number of boxes to keep. If positive,
+        the dataset is streamed one sample at a time and a uniform random
+        sample of at most `max_boxes` boxes is kept with reservoir sampling,
+        so the memory is bounded regardless of the dataset size. Otherwise all
+        the boxes are kept.
+      seed: `Optional[int]` seed of the reservoir sampling.
+    """
     box_list = []
+    reservoir = _BoxReservoir(max_boxes, seed) if max_boxes > 0 else None
 
     for i, sample in enumerate(dataset):
       if num_samples > 0 and i > num_samples:
         break
-      width = sample["width"]
-      height = sample["height"]
-      boxes = sample["groundtruth_boxes"]
-
-      # convert the box format from yxyx to xywh to allow
-      # kmeans by width height IOU
-      scale = tf.cast([width, height], boxes.dtype)
-
-      # scale the boxes then remove excessily small boxes that are
-      # less than 1 pixel in width or height
-      boxes = box_ops.yxyx_to_xcycwh(boxes)[..., 2:] * scale
-      boxes = boxes[tf.reduce_max(boxes, axis=-1) >= 1] / scale
-      box_list.append(boxes)
+      boxes = self._get_sample_boxes(sample)
+      if reservoir is not None:
+        reservoir.add(np.asarray(boxes))
+      else:
+        box_list.append(boxes)
 
       # loading is slow, so log the current iteration as a progress bar
       tf.print("loading sample: ", i, end="\r")
 
-    box_list = tf.concat(box_list, axis=0)
+    if reservoir is not None:
+      logging.info("kept %d of %d boxes for k-means", reservoir.boxes.shape[0],
+                   reservoir.num_seen)
+      box_list = tf.convert_to_tensor(reservoir.boxes)
+    else:
+      box_list = tf.concat(box_list, axis=0)
     inds = tf.argsort(tf.reduce_prod(box_list, axis=-1), axis=0)
     box_list = tf.gather(box_list, inds, axis=0)
     self._boxes = box_list
@@ -89,50 +164,77 @@ class AnchorKMeans:
     return clusters
 
   def iou(self, boxes, clusters):
-    """Computes iou."""
-    # broadcast the clusters to the same shape as the boxes
-    n = tf.shape(boxes)[0]
-    k = tf.shape(clusters)[0]
-    boxes = tf.repeat(boxes, k, axis=0)
-    boxes = tf.reshape(boxes, (n, k, -1))
-    boxes = tf.cast(boxes, tf.float32)
-
-    clusters = tf.tile(clusters, [n, 1])
-    clusters = tf.reshape(clusters, (n, k, -1))
-    clusters = tf.cast(clusters, tf.float32)
+    """Computes the [n, k] iou between n boxes and k clusters."""
+    # broadcast the boxes against the clusters instead of tiling both
+    boxes = tf.cast(boxes, tf.float32)[:, tf.newaxis, :]
+    clusters = tf.cast(clusters, tf.float32)[tf.newaxis, :, :]
 
     # compute the IOU
     return _iou(boxes, clusters)
 
   def maximization(self, boxes, clusters, assignments):
-    """K-means maximization term."""
-    for i in range(clusters.shape[0]):
-      hold = tf.math.reduce_mean(boxes[assignments == i], axis=0)
-      clusters = tf.tensor_scatter_nd_update(clusters, [[i]], [hold])
-    return clusters
+    """K-means maximization term.
+
+    Args:
+      boxes: `Tensor` of shape [n, 2] for the boxes.
+      clusters: `Tensor` of shape [k, 2] for the current centroids.
+      assignments: `Tensor` of shape [n] for the centroid of each box.
+
+    Returns:
+      The mean of the boxes assigned to each centroid. Centroids without boxes
+      are left unchanged.
+    """
+    boxes = tf.convert_to_tensor(boxes)
+    clusters = tf.cast(clusters, boxes.dtype)
+    num_clusters = tf.shape(clusters)[0]
+    assignments = tf.cast(assignments, tf.int32)
+    means = tf.math.unsorted_segment_mean(boxes, assignments, num_clusters)
+    counts = tf.math.unsorted_segment_sum(
+        tf.ones_like(assignments), assignments, num_clusters)
+    return tf.where(counts[:, tf.newaxis] > 0, means, clusters)
+
+  def _expectation(self, boxes, clusters, assignments, history):
+    """Assigns the boxes to their closest cluster and records the progress."""
+    ious = self.iou(boxes, clusters)
+    curr = tf.math.argmin(1 - ious, axis=-1)
+    history["num_changed"].append(
+        int(tf.math.count_nonzero(curr != assignments)))
+    history["avg_iou"].append(
+        float(tf.reduce_mean(tf.reduce_max(ious, axis=-1))))
+    return curr
 
   def _kmeans(self, boxes, clusters, k, max_iters=1000):
     """Run Kmeans on arbitrary boxes and clusters with k centers."""
     assignments = tf.zeros((boxes.shape[0]), dtype=tf.int64) - 1
-    dists = tf.zeros((boxes.shape[0], k))
+    history = {"num_changed": [], "avg_iou": []}
     num_iters = 1
 
     # do one iteration outside of the optimization loop
-    dists = 1 - self.iou(boxes, clusters)
-    curr = tf.math.argmin(dists, axis=-1)
+    curr = self._expectation(boxes, clusters, assignments, history)
     clusters = self.maximization(boxes, clusters, curr)
 
     # iterate the boxes until the clusters not longer change
     while not tf.math.reduce_all(curr == assignments) and num_iters < max_iters:
       # get the distiance
       assignments = curr
-      dists = 1 - self.iou(boxes, clusters)
-      curr = tf.math.argmin(dists, axis=-1)
+      curr = self._expectation(boxes, clusters, assignments, history)
       clusters = self.maximization(boxes, clusters, curr)
       tf.print("k-Means box generation iteration: ", num_iters, end="\r")
       num_iters += 1
 
     tf.print("k-Means box generation iteration: ", num_iters, end="\n")
+    converged = bool(tf.math.reduce_all(curr == assignments))
+    self._convergence_report.append({
+        "k": k,
+        "num_boxes": int(boxes.shape[0]),
+        "num_iterations": num_iters,
+        "converged": converged,
+        **history,
+    })
+    logging.info(
+        "k-means with k=%d on %d boxes %s after %d iterations, avg iou: %f",
+        k, boxes.shape[0], "converged" if converged else "did not converge",
+        num_iters, history["avg_iou"][-1])
     assignments = curr
 
     # sort the clusters by area then get the final assigments
@@ -195,7 +297,9 @@ class AnchorKMeans:
                scaling_mode="sqrt_log",
                box_generation_mode="across_level",
                image_resolution=(512, 512, 3),
-               num_samples=-1):
+               num_samples=-1,
+               max_boxes=-1,
+               seed=None):
     """Run k-means on th eboxes for a given input resolution.
 
     Args:
@@ -210,12 +314,19 @@ class AnchorKMeans:
       image_resolution: `List[int]` for the resolution of the boxes to run
         k-means for.
       num_samples: `int` for number of samples to process in the dataset.
+      max_boxes: `int` for the maximum number of boxes to run k-means on. If
+        positive, a uniform random sample of at most `max_boxes` boxes is kept
+        while streaming the dataset, which bounds the memory and the k-means
+        cost on large datasets.
+      seed: `Optional[int]` seed of the sampling of the boxes.
 
     Returns:
       boxes: `List[List[int]]` of shape [k, 2] for the anchor boxes to use for
         box predicitons.
     """
-    self.get_box_from_dataset(dataset, num_samples=num_samples)
+    self._convergence_report = []
+    self.get_box_from_dataset(
+        dataset, num_samples=num_samples, max_boxes=max_boxes, seed=seed)
 
     if scaling_mode == "sqrt":
       boxes_ls = tf.math.sqrt(self._boxes.numpy())
@@ -275,7 +386,8 @@ class BoxGenInputReader(input_reader.InputReader):
            scaling_mode="sqrt",
            box_generation_mode="across_level",
            image_resolution=(512, 512, 3),
-           num_samples=-1):
+           num_samples=-1,
+           max_boxes=-1):
     """Run k-means on th eboxes for a given input resolution.
 
     Args:
@@ -291,6 +403,9 @@ class BoxGenInputReader(input_reader.InputReader):
       num_samples: `Optional[int]` for the number of samples to use for kmeans,
         typically about 5000 samples are all that are needed, but for the best
         results use -1 to run the entire dataset.
+      max_boxes: `int` for the maximum number of boxes to run k-means on. If
+        positive, the boxes are reservoir sampled while streaming the dataset
+        so that k-means runs in bounded memory on any dataset size.
 
     Returns:
       boxes: `List[List[int]]` of shape [k, 2] for the anchor boxes to use for
@@ -308,7 +423,8 @@ class BoxGenInputReader(input_reader.InputReader):
         image_resolution=image_resolution,
         scaling_mode=scaling_mode,
         box_generation_mode=box_generation_mode,
-        num_samples=num_samples)
+        num_samples=num_samples,
+        max_boxes=max_boxes)
     del kmeans_gen  # free the memory
     del dataset
 
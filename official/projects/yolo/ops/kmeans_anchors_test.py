@@ -38,6 +38,40 @@ class KMeansTest(parameterized.TestCase, tf.test.TestCase):
         sample_list, k, anchors_per_scale, image_resolution=[512, 512, 3])
     cl = tf.convert_to_tensor(cl)
     self.assertAllEqual(tf.shape(cl).numpy(), [k, 2])
+    self.assertNotEmpty(kmeans.convergence_report)
+    for report in kmeans.convergence_report:
+      self.assertLen(report["avg_iou"], report["num_iterations"])
+      self.assertEqual(report["num_changed"][0], report["num_boxes"])
+
+  def test_kmeans_max_boxes(self):
+    sample_list = []
+    for _ in range(50):
+      boxes = tf.convert_to_tensor(np.random.uniform(0, 1, [40, 4]))
+      sample_list.append({
+          "groundtruth_boxes": boxes,
+          "width": 100,
+          "height": 100
+      })
+
+    kmeans = kmeans_anchors.AnchorKMeans()
+    cl = kmeans(
+        sample_list, 9, 3, image_resolution=[512, 512, 3], max_boxes=256,
+        seed=1)
+    self.assertAllEqual(tf.shape(cl).numpy(), [9, 2])
+    self.assertLessEqual(kmeans.boxes.shape[0], 256)
+
+  def test_maximization(self):
+    boxes = tf.convert_to_tensor(np.random.uniform(0, 1, [100, 2]))
+    clusters = tf.convert_to_tensor(np.random.uniform(0, 1, [4, 2]))
+    # no box is assigned to the last cluster
+    assignments = tf.convert_to_tensor(np.random.randint(0, 3, [100]))
+
+    kmeans = kmeans_anchors.AnchorKMeans()
+    updated = kmeans.maximization(boxes, clusters, assignments)
+    for i in range(3):
+      self.assertAllClose(
+          tf.reduce_mean(boxes[assignments == i], axis=0), updated[i])
+    self.assertAllClose(clusters[3], updated[3])
 
 
 if __name__ == "__main__":
@@ -94,7 +94,8 @@ class YoloTask(base_task.Task):
         image_resolution=input_size,
         scaling_mode=anchor_cfg.scaling_mode,
         box_generation_mode=anchor_cfg.box_generation_mode,
-        num_samples=anchor_cfg.num_samples)
+        num_samples=anchor_cfg.num_samples,
+        max_boxes=anchor_cfg.max_boxes)
 
     dataset.global_batch_size = gbs
 
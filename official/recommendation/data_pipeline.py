@@ -20,11 +20,11 @@ from __future__ import print_function
 
 import atexit
 import functools
+import hashlib
 import os
 import sys
 import tempfile
 import threading
-import time
 import timeit
 import traceback
 import typing
@@ -101,6 +101,16 @@ class DatasetManager(object):
     self._result_queue = queue.Queue()
     self._result_reuse = []
 
+    # The producer waits on this condition while `CYCLES_TO_BUFFER` epochs are
+    # constructed ahead of the epochs requested by the consumer.
+    self._buffer_condition = threading.Condition()
+
+    # Pipeline health metrics, see `metrics()`.
+    self._producer_stall_count = 0
+    self._producer_stall_seconds = 0.
+    self._consumer_starvation_count = 0
+    self._consumer_starvation_seconds = 0.
+
   @property
   def current_data_root(self):
     subdir = (
@@ -113,6 +123,56 @@ class DatasetManager(object):
     return (self._epochs_completed - self._epochs_requested >=
             rconst.CYCLES_TO_BUFFER and self._is_training)
 
+  def wait_for_buffer(self, should_stop):
+    # type: (typing.Callable[[], bool]) -> None
+    """Blocks until the buffer has room for another epoch.
+
+    Args:
+      should_stop: A callable returning True if the producer is stopping, in
+        which case the wait returns early. `notify_buffer_waiters()` must be
+        called after its value changes.
+    """
+    with self._buffer_condition:
+      if not self.buffer_reached() or should_stop():
+        return
+      self._producer_stall_count += 1
+      start_time = timeit.default_timer()
+      while self.buffer_reached() and not should_stop():
+        if not self._buffer_condition.wait(timeout=60):
+          logging.info(
+              "Waited {:.0f} seconds for training data to be consumed".format(
+                  timeit.default_timer() - start_time))
+      self._producer_stall_seconds += timeit.default_timer() - start_time
+
+  def notify_buffer_waiters(self):
+    with self._buffer_condition:
+      self._buffer_condition.notify_all()
+
+  def metrics(self):
+    # type: () -> typing.Dict[str, float]
+    """Returns counters of producer stalls and consumer starvation.
+
+    A producer stall is a wait of the producer because the buffer is full. A
+    consumer starvation is a wait of the consumer for data that has not been
+    produced yet.
+    """
+    return {
+        "producer_stall_count": self._producer_stall_count,
+        "producer_stall_seconds": self._producer_stall_seconds,
+        "consumer_starvation_count": self._consumer_starvation_count,
+        "consumer_starvation_seconds": self._consumer_starvation_seconds,
+    }
+
+  def _get_result(self):
+    """Gets the next result from the queue, tracking consumer starvation."""
+    if not self._result_queue.empty():
+      return self._result_queue.get()
+    self._consumer_starvation_count += 1
+    start_time = timeit.default_timer()
+    result = self._result_queue.get(timeout=300)
+    self._consumer_starvation_seconds += timeit.default_timer() - start_time
+    return result
+
   @staticmethod
   def serialize(data):
     """Convert NumPy arrays into a TFRecords entry."""
@@ -244,7 +304,8 @@ class DatasetManager(object):
       self._writers = []
       self._result_queue.put(self.current_data_root)
 
-    self._epochs_completed += 1
+    with self._buffer_condition:
+      self._epochs_completed += 1
 
   def data_generator(self, epochs_between_evals):
     """Yields examples during local training."""
@@ -253,7 +314,7 @@ class DatasetManager(object):
 
     if self._is_training:
       for _ in range(self._batches_per_epoch * epochs_between_evals):
-        yield self._result_queue.get(timeout=300)
+        yield self._get_result()
 
     else:
       if self._result_reuse:
@@ -264,12 +325,14 @@ class DatasetManager(object):
       else:
         # First epoch.
         for _ in range(self._batches_per_epoch * epochs_between_evals):
-          result = self._result_queue.get(timeout=300)
+          result = self._get_result()
           self._result_reuse.append(result)
           yield result
 
   def increment_request_epoch(self):
-    self._epochs_requested += 1
+    with self._buffer_condition:
+      self._epochs_requested += 1
+      self._buffer_condition.notify_all()
 
   def get_dataset(self, batch_size, epochs_between_evals):
     """Construct the dataset to be used for training and eval.
@@ -288,7 +351,7 @@ class DatasetManager(object):
       if epochs_between_evals > 1:
         raise ValueError("epochs_between_evals > 1 not supported for file "
                          "based dataset.")
-      epoch_data_dir = self._result_queue.get(timeout=300)
+      epoch_data_dir = self._get_result()
       if not self._is_training:
         self._result_queue.put(epoch_data_dir)  # Eval data is reused.
 
@@ -457,6 +520,8 @@ class BaseDataConstructor(threading.Thread):
     self._stop_loop = False
     self._fatal_exception = None
     self.deterministic = deterministic
+    # Worker pool for batch construction, shared by all epochs.
+    self._batch_pool = None
 
   def __str__(self):
     multiplier = ("(x{} devices)".format(self._batches_per_train_step)
@@ -482,6 +547,15 @@ class BaseDataConstructor(threading.Thread):
 
   def stop_loop(self):
     self._stop_loop = True
+    self._train_dataset.notify_buffer_waiters()
+
+  def metrics(self):
+    # type: () -> typing.Dict[str, typing.Dict[str, float]]
+    """Returns the producer stall and consumer starvation counters."""
+    return {
+        "train": self._train_dataset.metrics(),
+        "eval": self._eval_dataset.metrics(),
+    }
 
   def construct_lookup_variables(self):
     """Perform any one time pre-compute work."""
@@ -495,12 +569,27 @@ class BaseDataConstructor(threading.Thread):
     atexit.register(self.stop_loop)
     self._start_shuffle_iterator()
     self.construct_lookup_variables()
-    self._construct_training_epoch()
-    self._construct_eval_epoch()
-    for _ in range(self._maximum_number_epochs - 1):
+    try:
       self._construct_training_epoch()
+      self._construct_eval_epoch()
+      for _ in range(self._maximum_number_epochs - 1):
+        self._construct_training_epoch()
+    finally:
+      if self._batch_pool is not None:
+        self._batch_pool.close()
+        self._batch_pool = None
+    logging.info("Data pipeline metrics: {}".format(self.metrics()))
     self.stop_loop()
 
+  def _get_batch_pool(self):
+    """Returns the worker pool used to construct batches."""
+    if self._batch_pool is None:
+      get_pool = (
+          popen_helper.get_fauxpool
+          if self.deterministic else popen_helper.get_threadpool)
+      self._batch_pool = get_pool(6, closing=False)
+    return self._batch_pool
+
   def run(self):
     try:
       self._run()
@@ -573,19 +662,10 @@ class BaseDataConstructor(threading.Thread):
                 np.reshape(labels, (self.train_batch_size, 1)),
         })
 
-  def _wait_to_construct_train_epoch(self):
-    count = 0
-    while self._train_dataset.buffer_reached() and not self._stop_loop:
-      time.sleep(0.01)
-      count += 1
-      if count >= 100 and np.log10(count) == np.round(np.log10(count)):
-        logging.info(
-            "Waited {} times for training data to be consumed".format(count))
-
   def _construct_training_epoch(self):
     """Loop to construct a batch of training data."""
     if not self.create_data_offline:
-      self._wait_to_construct_train_epoch()
+      self._train_dataset.wait_for_buffer(lambda: self._stop_loop)
 
     start_time = timeit.default_timer()
     if self._stop_loop:
@@ -595,11 +675,7 @@ class BaseDataConstructor(threading.Thread):
     map_args = list(range(self.train_batches_per_epoch))
     self._current_epoch_order = next(self._shuffle_iterator)
 
-    get_pool = (
-        popen_helper.get_fauxpool
-        if self.deterministic else popen_helper.get_threadpool)
-    with get_pool(6) as pool:
-      pool.map(self._get_training_batch, map_args)
+    self._get_batch_pool().map(self._get_training_batch, map_args)
     self._train_dataset.end_construction()
 
     logging.info("Epoch construction complete. Time: {:.1f} seconds".format(
@@ -685,11 +761,7 @@ class BaseDataConstructor(threading.Thread):
     self._eval_dataset.start_construction()
     map_args = [i for i in range(self.eval_batches_per_epoch)]
 
-    get_pool = (
-        popen_helper.get_fauxpool
-        if self.deterministic else popen_helper.get_threadpool)
-    with get_pool(6) as pool:
-      pool.map(self._get_eval_batch, map_args)
+    self._get_batch_pool().map(self._get_eval_batch, map_args)
     self._eval_dataset.end_construction()
 
     logging.info("Eval construction complete. Time: {:.1f} seconds".format(
@@ -873,20 +945,44 @@ class BisectionDataConstructor(BaseDataConstructor):
   expression.
   """
 
-  def __init__(self, *args, **kwargs):
+  def __init__(self, *args, lookup_cache_dir=None, **kwargs):
     super(BisectionDataConstructor, self).__init__(*args, **kwargs)
     self.index_bounds = None
     self._sorted_train_pos_items = None
     self._total_negatives = None
+    self._lookup_cache_dir = lookup_cache_dir
+
+  def _lookup_cache_paths(self):
+    """Returns the cache files of the lookup variables for this dataset."""
+    dataset_hash = hashlib.sha256()
+    dataset_hash.update(str(self._num_items).encode("utf-8"))
+    for array in (self._train_pos_users, self._train_pos_items):
+      dataset_hash.update(str(array.dtype).encode("utf-8"))
+      dataset_hash.update(np.ascontiguousarray(array).data)
+    prefix = os.path.join(
+        self._lookup_cache_dir,
+        "bisection_{}".format(dataset_hash.hexdigest()[:16]))
+    return (prefix + "_sorted_items.npy", prefix + "_total_negatives.npy")
+
+  def _build_sorted_items_and_total_negatives(self):
+    """Sorts the positive items of each user and tallies the negatives.
+
+    For the jth positive item (in sorted order) of a user, the number of
+    negative items before it is `item_j - j`, which is the cumulative sum of
+    the gaps between consecutive positives.
 
-  def _index_segment(self, user):
-    lower, upper = self.index_bounds[user:user + 2]
-    items = self._sorted_train_pos_items[lower:upper]
-
-    negatives_since_last_positive = np.concatenate(
-        [items[0][np.newaxis], items[1:] - items[:-1] - 1])
-
-    return np.cumsum(negatives_since_last_positive)
+    Returns:
+      A tuple of the positive items sorted within each user segment and the
+      number of negatives before each of them.
+    """
+    # Users are sorted, so a lexsort on (user, item) sorts every segment.
+    order = np.lexsort((self._train_pos_items, self._train_pos_users))
+    sorted_items = self._train_pos_items[order]
+    position_in_segment = (
+        np.arange(sorted_items.shape[0]) -
+        np.repeat(self.index_bounds[:-1], np.diff(self.index_bounds)))
+    total_negatives = sorted_items.astype(np.int64) - position_in_segment
+    return sorted_items, total_negatives
 
   def construct_lookup_variables(self):
     start_time = timeit.default_timer()
@@ -899,14 +995,28 @@ class BisectionDataConstructor(BaseDataConstructor):
     assert np.array_equal(self._train_pos_users[self.index_bounds[:-1]],
                           np.arange(self._num_users))
 
-    self._sorted_train_pos_items = self._train_pos_items.copy()
-
-    for i in range(self._num_users):
-      lower, upper = self.index_bounds[i:i + 2]
-      self._sorted_train_pos_items[lower:upper].sort()
-
-    self._total_negatives = np.concatenate(
-        [self._index_segment(i) for i in range(self._num_users)])
+    if self._lookup_cache_dir is None:
+      (self._sorted_train_pos_items,
+       self._total_negatives) = self._build_sorted_items_and_total_negatives()
+    else:
+      sorted_items_path, total_negatives_path = self._lookup_cache_paths()
+      if not (os.path.exists(sorted_items_path) and
+              os.path.exists(total_negatives_path)):
+        sorted_items, total_negatives = (
+            self._build_sorted_items_and_total_negatives())
+        os.makedirs(self._lookup_cache_dir, exist_ok=True)
+        # Write to temporary files first so that concurrent or interrupted runs
+        # never observe a partial cache.
+        for path, array in ((sorted_items_path, sorted_items),
+                            (total_negatives_path, total_negatives)):
+          tmp_path = "{}.{}.tmp".format(path, os.getpid())
+          with open(tmp_path, "wb") as f:
+            np.save(f, array)
+          os.replace(tmp_path, path)
+        logging.info("Negative total vector cached in {}".format(
+            self._lookup_cache_dir))
+      self._sorted_train_pos_items = np.load(sorted_items_path, mmap_mode="r")
+      self._total_negatives = np.load(total_negatives_path, mmap_mode="r")
 
     logging.info("Negative total vector built. Time: {:.1f} seconds".format(
         timeit.default_timer() - start_time))
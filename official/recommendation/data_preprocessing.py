@@ -205,8 +205,9 @@ def instantiate_pipeline(dataset,
                          constructor_type=None,
                          deterministic=False,
                          epoch_dir=None,
-                         generate_data_offline=False):
-  # type: (str, str, dict, typing.Optional[str], bool, typing.Optional[str], bool) -> (int, int, data_pipeline.BaseDataConstructor)
+                         generate_data_offline=False,
+                         lookup_cache_dir=None):
+  # type: (str, str, dict, typing.Optional[str], bool, typing.Optional[str], bool, typing.Optional[str]) -> (int, int, data_pipeline.BaseDataConstructor)
   """Load and digest data CSV into a usable form.
 
   Args:
@@ -219,6 +220,8 @@ def instantiate_pipeline(dataset,
     epoch_dir: Directory in which to store the training epochs.
     generate_data_offline: Boolean, whether current pipeline is done offline or
       while training.
+    lookup_cache_dir: Optional local directory in which the bisection
+      constructor caches its negative sampling index across runs.
   """
   logging.info("Beginning data preprocessing.")
 
@@ -237,6 +240,10 @@ def instantiate_pipeline(dataset,
     raise ValueError("Expected to find {} items, but found {}".format(
         num_items, len(item_map)))
 
+  constructor_kwargs = {}
+  if lookup_cache_dir and constructor_type == "bisection":
+    constructor_kwargs["lookup_cache_dir"] = lookup_cache_dir
+
   producer = data_pipeline.get_constructor(constructor_type or "materialized")(
       maximum_number_epochs=params["train_epochs"],
       num_users=num_users,
@@ -255,7 +262,8 @@ def instantiate_pipeline(dataset,
       stream_files=params["stream_files"],
       deterministic=deterministic,
       epoch_dir=epoch_dir,
-      create_data_offline=generate_data_offline)
+      create_data_offline=generate_data_offline,
+      **constructor_kwargs)
 
   run_time = timeit.default_timer() - st
   logging.info(
@@ -21,6 +21,7 @@ from __future__ import print_function
 from collections import defaultdict
 import hashlib
 import os
+import threading
 
 import mock
 
@@ -29,6 +30,7 @@ import scipy.stats
 import tensorflow as tf, tf_keras
 
 from official.recommendation import constants as rconst
+from official.recommendation import data_pipeline
 from official.recommendation import data_preprocessing
 from official.recommendation import movielens
 from official.recommendation import popen_helper
@@ -119,6 +121,102 @@ class BaseTest(tf.test.TestCase):
     assert len(data[rconst.USER_MAP]) == NUM_USERS
     assert len(data[rconst.ITEM_MAP]) == NUM_ITEMS
 
+  def test_bisection_lookup_variables(self):
+    users = np.random.randint(0, NUM_USERS, NUM_PTS)
+    users[:NUM_USERS] = np.arange(NUM_USERS)
+    users = np.sort(users).astype(rconst.USER_DTYPE)
+    items = np.random.randint(0, NUM_ITEMS, NUM_PTS).astype(rconst.ITEM_DTYPE)
+    # Positive items are unique within a user.
+    _, unique_index = np.unique(
+        users.astype(np.int64) * NUM_ITEMS + items, return_index=True)
+    # Shuffle the items within each user.
+    order = np.lexsort((np.random.rand(unique_index.shape[0]),
+                        users[unique_index]))
+    users, items = users[unique_index][order], items[unique_index][order]
+
+    cache_dir = os.path.join(self.temp_data_dir, "lookup_cache")
+    producers = []
+    for lookup_cache_dir in (None, cache_dir, cache_dir):
+      producer = data_pipeline.BisectionDataConstructor(
+          maximum_number_epochs=1,
+          num_users=NUM_USERS,
+          num_items=NUM_ITEMS,
+          user_map=None,
+          item_map=None,
+          train_pos_users=users,
+          train_pos_items=items,
+          train_batch_size=BATCH_SIZE,
+          batches_per_train_step=1,
+          num_train_negatives=NUM_NEG,
+          eval_pos_users=np.arange(NUM_USERS),
+          eval_pos_items=np.zeros(NUM_USERS),
+          eval_batch_size=EVAL_BATCH_SIZE,
+          batches_per_eval_step=1,
+          stream_files=False,
+          lookup_cache_dir=lookup_cache_dir)
+      producer.construct_lookup_variables()
+      producers.append(producer)
+    self.assertLen(tf.io.gfile.listdir(cache_dir), 2)
+
+    expected_sorted_items = []
+    expected_total_negatives = []
+    for user in range(NUM_USERS):
+      user_items = np.sort(items[users == user])
+      expected_sorted_items.append(user_items)
+      expected_total_negatives.append(np.cumsum(np.concatenate(
+          [user_items[:1], user_items[1:] - user_items[:-1] - 1])))
+    # pylint: disable=protected-access
+    for producer in producers:
+      self.assertAllEqual(producer._sorted_train_pos_items,
+                          np.concatenate(expected_sorted_items))
+      self.assertAllEqual(producer._total_negatives,
+                          np.concatenate(expected_total_negatives))
+    # pylint: enable=protected-access
+
+  def test_dataset_manager_buffer(self):
+    manager = data_pipeline.DatasetManager(
+        is_training=True, stream_files=False, batches_per_epoch=1)
+
+    def _put_epoch():
+      manager.start_construction()
+      manager.put(0, {
+          movielens.USER_COLUMN: np.zeros((1, 1)),
+          movielens.ITEM_COLUMN: np.zeros((1, 1)),
+          rconst.MASK_START_INDEX: np.array(1),
+          "labels": np.zeros((1, 1)),
+      })
+      manager.end_construction()
+
+    for _ in range(rconst.CYCLES_TO_BUFFER):
+      _put_epoch()
+    self.assertTrue(manager.buffer_reached())
+
+    # The producer is blocked until the consumer requests an epoch.
+    producer = threading.Thread(
+        target=lambda: (manager.wait_for_buffer(lambda: False), _put_epoch()))
+    producer.start()
+    producer.join(timeout=0.1)
+    self.assertTrue(producer.is_alive())
+    manager.increment_request_epoch()
+    producer.join(timeout=10)
+    self.assertFalse(producer.is_alive())
+
+    # Consuming the buffered epochs does not starve, the next one does.
+    generator = manager.data_generator(
+        epochs_between_evals=rconst.CYCLES_TO_BUFFER + 2)
+    for _ in range(rconst.CYCLES_TO_BUFFER + 1):
+      next(generator)
+    producer = threading.Timer(0.1, _put_epoch)
+    producer.start()
+    next(generator)
+    producer.join()
+
+    metrics = manager.metrics()
+    self.assertEqual(metrics["producer_stall_count"], 1)
+    self.assertGreater(metrics["producer_stall_seconds"], 0)
+    self.assertEqual(metrics["consumer_starvation_count"], 1)
+    self.assertGreater(metrics["consumer_starvation_seconds"], 0)
+
   def drain_dataset(self, dataset, g):
     # type: (tf.data.Dataset, tf.Graph) -> list
     with self.session(graph=g) as sess:
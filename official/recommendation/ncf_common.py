@@ -56,7 +56,8 @@ def get_inputs(params):
         data_dir=FLAGS.data_dir,
         params=params,
         constructor_type=FLAGS.constructor_type,
-        deterministic=FLAGS.seed is not None)
+        deterministic=FLAGS.seed is not None,
+        lookup_cache_dir=FLAGS.lookup_cache_dir)
     num_train_steps = producer.train_batches_per_epoch
     num_eval_steps = producer.eval_batches_per_epoch
 
@@ -270,6 +271,14 @@ def define_ncf_flags():
           "precompute that scales badly, but a faster per-epoch construction"
           "time and can be faster on very large systems."))
 
+  flags.DEFINE_string(
+      name="lookup_cache_dir",
+      default=None,
+      help=flags_core.help_wrap(
+          "If set, the bisection constructor caches its negative sampling "
+          "index in this local directory, keyed on a hash of the training "
+          "data, and memory maps it in later runs."))
+
   flags.DEFINE_string(
       name="train_dataset_path",
       default=None,
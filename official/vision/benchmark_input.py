@@ -0,0 +1,89 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""TensorFlow Model Garden Vision input pipeline benchmark driver.
+
+Builds the task of a registered experiment and reads batches from its input
+pipeline without building a model, e.g.:
+
+```
+python3 -m official.vision.benchmark_input \
+  --experiment=resnet_imagenet \
+  --config_file=... \
+  --params_override="task.train_data.cycle_length=16" \
+  --num_batches=1000
+```
+
+For instance, the throughput of decoding only the kept part of the images in
+a detection pipeline is compared with the default full decoding by running the
+benchmark with and without
+`--params_override="task.train_data.decoder.simple_decoder.decode_image=false"`.
+"""
+
+from absl import app
+from absl import flags
+from absl import logging
+import gin
+
+from official.common import distribute_utils
+from official.common import flags as tfm_flags
+from official.core import input_benchmark_lib
+from official.core import task_factory
+from official.core import train_utils
+from official.vision import registry_imports  # pylint: disable=unused-import
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_enum(
+    'data', default='train', enum_values=['train', 'validation'],
+    help='Whether to benchmark `task.train_data` or `task.validation_data`.')
+flags.DEFINE_integer(
+    'num_batches', default=1000, help='The number of batches to measure.')
+flags.DEFINE_integer(
+    'num_warmup_batches', default=10,
+    help='The number of batches to read before measuring.')
+flags.DEFINE_string(
+    'profile_dir', default=None,
+    help='Optional directory to write a profiler trace of the measured batches '
+    'to. Its tf.data analysis reports the latency of every pipeline stage.')
+
+
+def main(_):
+  gin.parse_config_files_and_bindings(FLAGS.gin_file, FLAGS.gin_params)
+  params = train_utils.parse_configuration(FLAGS)
+  distribution_strategy = distribute_utils.get_distribution_strategy(
+      distribution_strategy=params.runtime.distribution_strategy,
+      all_reduce_alg=params.runtime.all_reduce_alg,
+      num_gpus=params.runtime.num_gpus,
+      tpu_address=params.runtime.tpu)
+  with distribution_strategy.scope():
+    task = task_factory.get_task(params.task, logging_dir=FLAGS.model_dir)
+  data_config = (
+      params.task.train_data
+      if FLAGS.data == 'train' else params.task.validation_data)
+  results = input_benchmark_lib.run_input_benchmark(
+      task,
+      data_config,
+      num_batches=FLAGS.num_batches,
+      num_warmup_batches=FLAGS.num_warmup_batches,
+      strategy=distribution_strategy,
+      profile_dir=FLAGS.profile_dir)
+  for key, value in results.items():
+    logging.info('%s: %s', key, value)
+
+
+if __name__ == '__main__':
+  tfm_flags.define_flags()
+  flags.mark_flags_as_required(['experiment'])
+  app.run(main)
@@ -29,6 +29,9 @@ class TfExampleDecoder(hyperparams.Config):
   regenerate_source_id: bool = False
   mask_binarize_threshold: Optional[float] = None
   attribute_names: List[str] = dataclasses.field(default_factory=list)
+  # If False, the image is left encoded and the parser only decodes the part
+  # of it that is kept after resizing and cropping.
+  decode_image: bool = True
 
 
 @dataclasses.dataclass
@@ -37,6 +40,9 @@ class TfExampleDecoderLabelMap(hyperparams.Config):
   regenerate_source_id: bool = False
   mask_binarize_threshold: Optional[float] = None
   label_map: str = ''
+  # If False, the image is left encoded and the parser only decodes the part
+  # of it that is kept after resizing and cropping.
+  decode_image: bool = True
 
 
 @dataclasses.dataclass
@@ -95,6 +95,9 @@ class DataConfig(cfg.DataConfig):
   # (if smaller than padded size) is place in the center of the image.
   # Default behaviour is to place it at left top corner.
   centered_crop: bool = False
+  # If True, only the part of the image that is kept after the scale jittering
+  # and cropping is decoded, at a reduced size for JPEG images when possible.
+  decode_and_crop_image: bool = False
 
 
 @dataclasses.dataclass
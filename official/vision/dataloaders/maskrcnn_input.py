@@ -55,6 +55,11 @@ class Parser(parser.Parser):
                dtype='float32'):
     """Initializes parameters for parsing annotations in the dataset.
 
+    If the decoded `image` is still the encoded image string, e.g. from a
+    `TfExampleDecoder` with `decode_image=False`, only the pixels that are kept
+    after the scale jittering and cropping are decoded, at a reduced size for
+    JPEG images when possible. This is not supported with `aug_type`.
+
     Args:
       output_size: `Tensor` or `list` for [height, width] of output image. The
         output_size should be divided by the largest feature stride 2^max_level.
@@ -200,15 +205,46 @@ class Parser(parser.Parser):
       if self._include_mask:
         masks = tf.gather(masks, indices)
 
+    padded_size = preprocess_ops.compute_padded_size(
+        self._output_size, 2 ** self._max_level)
+
     # Gets original image and its size.
     image = data['image']
-    if self._augmenter is not None:
-      image = self._augmenter.distort(image)
+    decode_image = image.dtype == tf.string
+    if decode_image:
+      if self._augmenter is not None:
+        raise ValueError(
+            '`aug_type` is not supported when the image is not decoded.')
+      # Only decodes the part of the image that is kept, so the image is
+      # resized and cropped before being flipped.
+      image, image_info = preprocess_ops.decode_and_resize_and_crop_image(
+          image,
+          self._output_size,
+          padded_size=None,
+          aug_scale_min=self._aug_scale_min,
+          aug_scale_max=self._aug_scale_max)
+      image_shape = tf.cast(image_info[0, :], tf.int32)
+
+      # Normalizes image with mean and std pixel values.
+      image = preprocess_ops.normalize_scaled_float_image(image / 255.0)
+
+      # Flipping the kept window of the scaled image is the same as keeping the
+      # mirrored window of the flipped image. The window, normalized to the
+      # scaled image, is flipped along with the boxes to get its offset.
+      scaled_size = tf.round(image_info[0, :] * image_info[2, :])
+      window = tf.concat([
+          image_info[3, :],
+          image_info[3, :] + tf.cast(tf.shape(image)[0:2], tf.float32)
+      ], axis=0) / tf.tile(scaled_size, [2])
+      boxes = tf.concat([boxes, tf.expand_dims(window, axis=0)], axis=0)
+    else:
+      if self._augmenter is not None:
+        image = self._augmenter.distort(image)
 
-    image_shape = tf.shape(image)[0:2]
+      image_shape = tf.shape(image)[0:2]
 
-    # Normalizes image with mean and std pixel values.
-    image = preprocess_ops.normalize_image(image)
+      # Normalizes image with mean and std pixel values.
+      image = preprocess_ops.normalize_image(image)
 
     # Flips image randomly during training.
     image, boxes, masks = preprocess_ops.random_horizontal_flip(
@@ -224,18 +260,27 @@ class Parser(parser.Parser):
         prob=tf.where(self._aug_rand_vflip, 0.5, 0.0),
     )
 
+    if decode_image:
+      offset = tf.round(boxes[-1, 0:2] * scaled_size)
+      boxes = boxes[:-1]
+      image_info = tf.concat(
+          [image_info[0:3, :], tf.expand_dims(offset, axis=0)], axis=0)
+      image = tf.image.pad_to_bounding_box(
+          image, 0, 0, padded_size[0], padded_size[1])
+      image = tf.ensure_shape(image, padded_size + [3])
+
     # Converts boxes from normalized coordinates to pixel coordinates.
     # Now the coordinates of boxes are w.r.t. the original image.
     boxes = box_ops.denormalize_boxes(boxes, image_shape)
 
     # Resizes and crops image.
-    image, image_info = preprocess_ops.resize_and_crop_image(
-        image,
-        self._output_size,
-        padded_size=preprocess_ops.compute_padded_size(
-            self._output_size, 2 ** self._max_level),
-        aug_scale_min=self._aug_scale_min,
-        aug_scale_max=self._aug_scale_max)
+    if not decode_image:
+      image, image_info = preprocess_ops.resize_and_crop_image(
+          image,
+          self._output_size,
+          padded_size=padded_size,
+          aug_scale_min=self._aug_scale_min,
+          aug_scale_max=self._aug_scale_max)
     image_height, image_width, _ = image.get_shape().as_list()
 
     # Resizes and crops boxes.
@@ -336,21 +381,39 @@ class Parser(parser.Parser):
             shape [height_l, width_l, 4] representing anchor boxes at each
             level.
     """
+    padded_size = preprocess_ops.compute_padded_size(
+        self._output_size, 2 ** self._max_level)
+
     # Gets original image and its size.
     image = data['image']
-    image_shape = tf.shape(image)[0:2]
-
-    # Normalizes image with mean and std pixel values.
-    image = preprocess_ops.normalize_image(image)
-
-    # Resizes and crops image.
-    image, image_info = preprocess_ops.resize_and_crop_image(
-        image,
-        self._output_size,
-        padded_size=preprocess_ops.compute_padded_size(
-            self._output_size, 2 ** self._max_level),
-        aug_scale_min=1.0,
-        aug_scale_max=1.0)
+    if image.dtype == tf.string:
+      # Only decodes the part of the image that is kept.
+      image, image_info = preprocess_ops.decode_and_resize_and_crop_image(
+          image,
+          self._output_size,
+          padded_size=None,
+          aug_scale_min=1.0,
+          aug_scale_max=1.0)
+      image_shape = tf.cast(image_info[0, :], tf.int32)
+
+      # Normalizes image with mean and std pixel values.
+      image = preprocess_ops.normalize_scaled_float_image(image / 255.0)
+      image = tf.image.pad_to_bounding_box(
+          image, 0, 0, padded_size[0], padded_size[1])
+      image = tf.ensure_shape(image, padded_size + [3])
+    else:
+      image_shape = tf.shape(image)[0:2]
+
+      # Normalizes image with mean and std pixel values.
+      image = preprocess_ops.normalize_image(image)
+
+      # Resizes and crops image.
+      image, image_info = preprocess_ops.resize_and_crop_image(
+          image,
+          self._output_size,
+          padded_size=padded_size,
+          aug_scale_min=1.0,
+          aug_scale_max=1.0)
     image_height, image_width, _ = image.get_shape().as_list()
 
     # Casts input image to self._dtype
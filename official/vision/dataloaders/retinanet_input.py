@@ -63,6 +63,11 @@ class Parser(parser.Parser):
                keep_aspect_ratio=True):
     """Initializes parameters for parsing annotations in the dataset.
 
+    If the decoded `image` is still the encoded image string, e.g. from a
+    `TfExampleDecoder` with `decode_image=False`, only the pixels that are kept
+    after the scale jittering and cropping are decoded, at a reduced size for
+    JPEG images when possible. This is not supported with `aug_type`.
+
     If one provides `input_anchor` when calling `_parse_eval_data()` and
     `_parse_train_data()`, the `min_level`, `num_scales`, `aspect_ratios`, and
     `anchor_size` can be `None`.
@@ -216,6 +221,39 @@ class Parser(parser.Parser):
                                                  image_info[1, :], offset)
     return image, boxes, image_info
 
+  def _decode_and_resize_image_and_boxes(
+      self, image_bytes, boxes, aug_scale_min, aug_scale_max
+  ):
+    """Decodes, resizes and crops an encoded image and its normalized boxes.
+
+    Args:
+      image_bytes: a string `Tensor` of the encoded image.
+      boxes: a `Tensor` of shape [N, 4] of boxes normalized to the original
+        image.
+      aug_scale_min: the minimum random scale applied to `output_size`.
+      aug_scale_max: the maximum random scale applied to `output_size`.
+
+    Returns:
+      image: an unpadded float32 `Tensor` of shape [height, width, 3].
+      boxes: a `Tensor` of shape [N, 4] of boxes normalized to `image`.
+      image_info: a 2D `Tensor` as returned by `resize_and_crop_image`.
+    """
+    image, image_info = preprocess_ops.decode_and_resize_and_crop_image(
+        image_bytes,
+        self._output_size,
+        padded_size=None,
+        aug_scale_min=aug_scale_min,
+        aug_scale_max=aug_scale_max,
+        keep_aspect_ratio=self._keep_aspect_ratio,
+    )
+
+    boxes = box_ops.denormalize_boxes(boxes, image_info[0, :])
+    boxes = preprocess_ops.resize_and_crop_boxes(
+        boxes, image_info[2, :], image_info[1, :], image_info[3, :]
+    )
+    boxes = box_ops.normalize_boxes(boxes, tf.shape(image)[0:2])
+    return image, boxes, image_info
+
   def _parse_train_data(self, data, anchor_labeler=None, input_anchor=None):
     """Parses data for training and evaluation."""
     classes = data['groundtruth_classes']
@@ -240,23 +278,37 @@ class Parser(parser.Parser):
 
     # Gets original image.
     image = data['image']
-    image_size = tf.cast(tf.shape(image)[0:2], tf.float32)
-
-    less_output_pixels = (
-        self._output_size[0] * self._output_size[1]
-    ) < image_size[0] * image_size[1]
-
-    # Resizing first can reduce augmentation computation if the original image
-    # has more pixels than the desired output image.
-    # There might be a smarter threshold to compute less_output_pixels as
-    # we keep the padding to the very end, i.e., a resized image likely has less
-    # pixels than self._output_size[0] * self._output_size[1].
-    resize_first = self._resize_first and less_output_pixels
-    if resize_first:
-      image, boxes, image_info = self._resize_and_crop_image_and_boxes(
-          image, boxes, pad=False
+    if image.dtype == tf.string:
+      if self._augmenter is not None:
+        raise ValueError(
+            '`aug_type` is not supported when the image is not decoded.'
+        )
+      # Decodes only the part of the image that is kept, which is equivalent
+      # to resizing first.
+      resize_first = True
+      image, boxes, image_info = self._decode_and_resize_image_and_boxes(
+          image, boxes, self._aug_scale_min, self._aug_scale_max
       )
-      image = tf.cast(image, dtype=tf.uint8)
+      # Like a decoded image resized first, for `random_jpeg_quality`.
+      image = tf.cast(tf.round(image), dtype=tf.uint8)
+    else:
+      image_size = tf.cast(tf.shape(image)[0:2], tf.float32)
+
+      less_output_pixels = (
+          self._output_size[0] * self._output_size[1]
+      ) < image_size[0] * image_size[1]
+
+      # Resizing first can reduce augmentation computation if the original
+      # image has more pixels than the desired output image.
+      # There might be a smarter threshold to compute less_output_pixels as
+      # we keep the padding to the very end, i.e., a resized image likely has
+      # less pixels than self._output_size[0] * self._output_size[1].
+      resize_first = self._resize_first and less_output_pixels
+      if resize_first:
+        image, boxes, image_info = self._resize_and_crop_image_and_boxes(
+            image, boxes, pad=False
+        )
+        image = tf.cast(image, dtype=tf.uint8)
 
     # Apply autoaug or randaug.
     if self._augmenter is not None:
@@ -355,17 +407,6 @@ class Parser(parser.Parser):
     # `ground_truth` of attributes is assumed in shape [N, attribute_size].
     attributes = data.get('groundtruth_attributes', {})
 
-    # Gets original image and its size.
-    image = data['image']
-    image_shape = tf.shape(input=image)[0:2]
-
-    # Normalizes image with mean and std pixel values.
-    image = preprocess_ops.normalize_image(image)
-
-    # Converts boxes from normalized coordinates to pixel coordinates.
-    boxes = box_ops.denormalize_boxes(boxes, image_shape)
-
-    # Resizes and crops image.
     if self._pad:
       padded_size = preprocess_ops.compute_padded_size(
           self._output_size, 2**self._max_level
@@ -373,22 +414,47 @@ class Parser(parser.Parser):
     else:
       padded_size = self._output_size
 
-    image, image_info = preprocess_ops.resize_and_crop_image(
-        image,
-        self._output_size,
-        padded_size=padded_size,
-        aug_scale_min=1.0,
-        aug_scale_max=1.0,
-        keep_aspect_ratio=self._keep_aspect_ratio,
-    )
+    # Gets original image and its size.
+    image = data['image']
+    if image.dtype == tf.string:
+      image, boxes, image_info = self._decode_and_resize_image_and_boxes(
+          image, boxes, aug_scale_min=1.0, aug_scale_max=1.0
+      )
+      image_shape = tf.cast(image_info[0, :], tf.int32)
+      boxes = box_ops.denormalize_boxes(boxes, tf.shape(image)[0:2])
+
+      # Normalizes image with mean and std pixel values.
+      image = preprocess_ops.normalize_image(image)
+      image = tf.image.pad_to_bounding_box(
+          image, 0, 0, padded_size[0], padded_size[1]
+      )
+    else:
+      image_shape = tf.shape(input=image)[0:2]
+
+      # Normalizes image with mean and std pixel values.
+      image = preprocess_ops.normalize_image(image)
+
+      # Converts boxes from normalized coordinates to pixel coordinates.
+      boxes = box_ops.denormalize_boxes(boxes, image_shape)
+
+      # Resizes and crops image.
+      image, image_info = preprocess_ops.resize_and_crop_image(
+          image,
+          self._output_size,
+          padded_size=padded_size,
+          aug_scale_min=1.0,
+          aug_scale_max=1.0,
+          keep_aspect_ratio=self._keep_aspect_ratio,
+      )
+
+      # Resizes and crops boxes.
+      image_scale = image_info[2, :]
+      offset = image_info[3, :]
+      boxes = preprocess_ops.resize_and_crop_boxes(boxes, image_scale,
+                                                   image_info[1, :], offset)
     image = tf.ensure_shape(image, padded_size + [3])
     image_height, image_width, _ = image.get_shape().as_list()
 
-    # Resizes and crops boxes.
-    image_scale = image_info[2, :]
-    offset = image_info[3, :]
-    boxes = preprocess_ops.resize_and_crop_boxes(boxes, image_scale,
-                                                 image_info[1, :], offset)
     # Filters out ground-truth boxes that are all zeros.
     indices = box_ops.get_non_empty_box_indices(boxes)
     boxes = tf.gather(boxes, indices)
@@ -0,0 +1,113 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for retinanet_input.py."""
+
+from unittest import mock
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf, tf_keras
+
+from official.vision.data import tf_example_builder
+from official.vision.dataloaders import retinanet_input
+from official.vision.dataloaders import tf_example_decoder
+
+
+def _create_jpeg_example(height, width):
+  """Creates a serialized example with a smooth JPEG image and 3 boxes."""
+  y, x = np.meshgrid(np.arange(height), np.arange(width), indexing='ij')
+  image = np.uint8(
+      np.stack([y * 255 / (height - 1), x * 255 / (width - 1),
+                (x + y) * 255 / (height + width - 2)], -1))
+  builder = tf_example_builder.TfExampleBuilder()
+  builder.add_image_matrix_feature(image, image_format='JPEG')
+  builder.add_boxes_feature(
+      xmins=[0.2, 0.05, 0.6],
+      xmaxs=[0.7, 0.5, 0.95],
+      ymins=[0.1, 0.3, 0.5],
+      ymaxs=[0.6, 0.9, 0.95],
+      labels=[1, 2, 1])
+  builder.add_ints_feature('image/object/is_crowd', [0, 0, 0])
+  return builder.example.SerializeToString()
+
+
+def _fake_uniform(x_offset_fraction):
+  """Returns a deterministic `tf.random.uniform`.
+
+  Scalar draws are a quarter of the way from `minval` to `maxval`, so random
+  flips with a probability of 0.5 always happen, and the crop offset is
+  [0.25, `x_offset_fraction`] of the maximum offset.
+
+  Args:
+    x_offset_fraction: the x fraction of the random crop offset.
+  """
+
+  def uniform(shape, minval=0, maxval=None, dtype=tf.float32, seed=None,
+              name=None):
+    del seed, name
+    if maxval is None:
+      maxval = 1
+    if list(shape) == [2]:
+      fraction = tf.constant([0.25, x_offset_fraction])
+    else:
+      fraction = tf.fill(shape, 0.25)
+    return tf.cast(minval + (maxval - minval) * fraction, dtype)
+
+  return uniform
+
+
+class RetinaNetInputTest(tf.test.TestCase, parameterized.TestCase):
+
+  def _parse(self, decode_image, **kwargs):
+    decoder = tf_example_decoder.TfExampleDecoder(decode_image=decode_image)
+    parser = retinanet_input.Parser(
+        output_size=[128, 128],
+        min_level=3,
+        max_level=3,
+        num_scales=1,
+        aspect_ratios=[1.0],
+        anchor_size=3,
+        dtype='float32',
+        # The encoded image is resized first, before being flipped.
+        resize_first=True,
+        **kwargs)
+    data = decoder.decode(tf.constant(_create_jpeg_example(120, 160)))
+    with mock.patch.object(tf.random, 'uniform', _fake_uniform(0.25)):
+      return parser.parse_fn(is_training=True)(data)
+
+  @parameterized.parameters(
+      (False, 1.0),
+      (True, 1.0),
+      (False, 2.0),
+      (True, 2.0),
+  )
+  def test_encoded_image_matches_decoded_image(self, aug_rand_hflip,
+                                               aug_scale_max):
+    kwargs = dict(aug_rand_hflip=aug_rand_hflip, aug_scale_max=aug_scale_max)
+    image, labels = self._parse(decode_image=False, **kwargs)
+    expected_image, expected_labels = self._parse(decode_image=True, **kwargs)
+
+    self.assertAllEqual([128, 128, 3], image.shape)
+    self.assertAllClose(expected_image, image, atol=0.05)
+    for key in ('image_info', 'cls_targets', 'box_targets', 'cls_weights',
+                'box_weights'):
+      self.assertAllClose(expected_labels[key], labels[key], msg=key)
+    if aug_scale_max > 1.0:
+      # The scaled image is 120x160, so the crop offset is 0.25 * 32.
+      self.assertAllEqual([0, 8], labels['image_info'][3])
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -72,6 +72,7 @@ class Parser(parser.Parser):
       image_feature=config_lib.DenseFeatureConfig(),
       additional_dense_features=None,
       centered_crop=False,
+      decode_and_crop_image=False,
   ):
     """Initializes parameters for parsing annotations in the dataset.
 
@@ -109,6 +110,10 @@ class Parser(parser.Parser):
       centered_crop: If `centered_crop` is set to True, then resized crop (if
         smaller than padded size) is place in the center of the image. Default
         behaviour is to place it at left top corner.
+      decode_and_crop_image: If True, only the pixels of the image that are
+        kept after the scale jittering and cropping are decoded, at a reduced
+        size for JPEG images when possible. Requires `preserve_aspect_ratio`,
+        a 3-channel image, and no `crop_size` or `additional_dense_features`.
     """
     self._output_size = output_size
     self._crop_size = crop_size
@@ -139,17 +144,51 @@ class Parser(parser.Parser):
           'centered_crop is only supported when resize_eval_groundtruth is'
           ' True.'
       )
+    self._decode_and_crop_image = decode_and_crop_image
+    if decode_and_crop_image and (
+        crop_size
+        or additional_dense_features
+        or not preserve_aspect_ratio
+        or image_feature.num_channels != 3
+    ):
+      raise ValueError(
+          'decode_and_crop_image requires preserve_aspect_ratio, a 3-channel'
+          ' image_feature, and no crop_size or additional_dense_features.'
+      )
+
+  def _decode_label(self, data):
+    """Decodes the label to a float `Tensor` of shape [1, height, width]."""
+    label = tf.io.decode_image(
+        data['image/segmentation/class/encoded'], channels=1
+    )
+    label = tf.reshape(label, (1, data['image/height'], data['image/width']))
+    return tf.cast(label, tf.float32)
+
+  def _decode_and_resize_image(
+      self, data, output_size, aug_scale_min=1.0, aug_scale_max=1.0
+  ):
+    """Decodes only the kept part of the image, and normalizes it."""
+    image, image_info = preprocess_ops.decode_and_resize_and_crop_image(
+        data[self._image_feature.feature_name],
+        output_size,
+        padded_size=None,
+        aug_scale_min=aug_scale_min,
+        aug_scale_max=aug_scale_max,
+        centered_crop=self._centered_crop,
+    )
+    image = preprocess_ops.normalize_scaled_float_image(
+        image / 255.0,
+        [mean / 255.0 for mean in self._image_feature.mean],
+        [stddev / 255.0 for stddev in self._image_feature.stddev],
+    )
+    return image, image_info
 
   def _prepare_image_and_label(self, data):
     """Prepare normalized image and label."""
     height = data['image/height']
     width = data['image/width']
 
-    label = tf.io.decode_image(
-        data['image/segmentation/class/encoded'], channels=1
-    )
-    label = tf.reshape(label, (1, height, width))
-    label = tf.cast(label, tf.float32)
+    label = self._decode_label(data)
 
     image = tf.io.decode_image(
         data[self._image_feature.feature_name],
@@ -197,6 +236,8 @@ class Parser(parser.Parser):
 
   def _parse_train_data(self, data):
     """Parses data for training and evaluation."""
+    if self._decode_and_crop_image:
+      return self._parse_train_data_with_decode_and_crop(data)
     image, label = self._prepare_image_and_label(data)
 
     # Normalize the label into the range of 0 and 1 for matting ground-truth.
@@ -242,6 +283,45 @@ class Parser(parser.Parser):
         centered_crop=self._centered_crop,
     )
 
+    return self._pack_train_data(image, label, image_info, train_image_size)
+
+  def _parse_train_data_with_decode_and_crop(self, data):
+    """Parses data for training, only decoding the kept part of the image."""
+    label = self._decode_label(data)
+    if self._gt_is_matting_map:
+      label /= 255.0
+
+    image, image_info = self._decode_and_resize_image(
+        data, self._output_size, self._aug_scale_min, self._aug_scale_max
+    )
+
+    # Flipping the kept window of the scaled image is the same as keeping the
+    # mirrored window of the flipped image. The window, normalized to the
+    # scaled image, is flipped as a box along with the label to get its offset.
+    if self._aug_rand_hflip:
+      scaled_size = tf.round(image_info[0, :] * image_info[2, :])
+      window = tf.concat(
+          [
+              image_info[3, :],
+              image_info[3, :] + tf.cast(tf.shape(image)[0:2], tf.float32),
+          ],
+          axis=0,
+      ) / tf.tile(scaled_size, [2])
+      image, window, label = preprocess_ops.random_horizontal_flip(
+          image, tf.expand_dims(window, axis=0), masks=label
+      )
+      offset = tf.round(window[0, 0:2] * scaled_size)
+      image_info = tf.concat(
+          [image_info[0:3, :], tf.expand_dims(offset, axis=0)], axis=0
+      )
+
+    image = preprocess_ops.pad_scaled_image(
+        image, self._output_size, self._centered_crop
+    )
+    return self._pack_train_data(image, label, image_info, self._output_size)
+
+  def _pack_train_data(self, image, label, image_info, train_image_size):
+    """Resizes and crops the label, and packs the training data."""
     # Resizes and crops boxes.
     image_scale = image_info[2, :]
     offset = image_info[3, :]
@@ -277,7 +357,10 @@ class Parser(parser.Parser):
 
   def _parse_eval_data(self, data):
     """Parses data for training and evaluation."""
-    image, label = self._prepare_image_and_label(data)
+    if self._decode_and_crop_image:
+      label = self._decode_label(data)
+    else:
+      image, label = self._prepare_image_and_label(data)
 
     # Binarize mask if ground-truth is a matting map
     if self._gt_is_matting_map:
@@ -289,12 +372,20 @@ class Parser(parser.Parser):
     label = tf.expand_dims(label, axis=3)
 
     # Resizes and crops image.
-    image, image_info = preprocess_ops.resize_and_crop_image(
-        image,
-        self._output_size,
-        self._output_size,
-        centered_crop=self._centered_crop,
-    )
+    if self._decode_and_crop_image:
+      image, image_info = self._decode_and_resize_image(
+          data, self._output_size
+      )
+      image = preprocess_ops.pad_scaled_image(
+          image, self._output_size, self._centered_crop
+      )
+    else:
+      image, image_info = preprocess_ops.resize_and_crop_image(
+          image,
+          self._output_size,
+          self._output_size,
+          centered_crop=self._centered_crop,
+      )
 
     if self._resize_eval_groundtruth:
       # Resizes eval masks to match input image sizes. In that case, mean IoU
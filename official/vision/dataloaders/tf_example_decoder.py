@@ -37,8 +37,23 @@ class TfExampleDecoder(decoder.Decoder):
       regenerate_source_id=False,
       mask_binarize_threshold=None,
       attribute_names=None,
+      decode_image=True,
   ):
+    """Initializes the decoder.
+
+    Args:
+      include_mask: whether to decode the instance masks.
+      regenerate_source_id: whether to generate the source id from the hash of
+        the encoded image instead of reading `image/source_id`.
+      mask_binarize_threshold: if not None, the threshold to binarize the
+        decoded instance masks with.
+      attribute_names: the names of the per-object attributes to decode.
+      decode_image: whether to decode the image. If False, `image` is the
+        encoded image string, which lets the parser decode only the pixels it
+        keeps, e.g. with `preprocess_ops.decode_and_resize_and_crop_image`.
+    """
     self._include_mask = include_mask
+    self._decode_image_bytes = decode_image
     self._regenerate_source_id = regenerate_source_id
     self._keys_to_features = {
         'image/encoded': tf.io.FixedLenFeature((), tf.string),
@@ -71,10 +86,19 @@ class TfExampleDecoder(decoder.Decoder):
 
   def _decode_image(self, parsed_tensors):
     """Decodes the image and set its static shape."""
+    if not self._decode_image_bytes:
+      return parsed_tensors['image/encoded']
     image = tf.io.decode_image(parsed_tensors['image/encoded'], channels=3)
     image.set_shape([None, None, 3])
     return image
 
+  def _get_encoded_image_shape(self, image_bytes):
+    """Returns the shape of an encoded image, only reading JPEG headers."""
+    return tf.cond(
+        tf.io.is_jpeg(image_bytes),
+        lambda: tf.image.extract_jpeg_shape(image_bytes),
+        lambda: tf.shape(tf.io.decode_image(image_bytes, channels=3)))
+
   def _decode_boxes(self, parsed_tensors):
     """Concat box coordinates in the format of [ymin, xmin, ymax, xmax]."""
     xmin = parsed_tensors['image/object/bbox/xmin']
@@ -133,7 +157,8 @@ class TfExampleDecoder(decoder.Decoder):
     Returns:
       decoded_tensors: a dictionary of tensors with the following fields:
         - source_id: a string scalar tensor.
-        - image: a uint8 tensor of shape [None, None, 3].
+        - image: a uint8 tensor of shape [None, None, 3], or the encoded image
+            string if `decode_image` is False.
         - height: an integer scalar tensor.
         - width: an integer scalar tensor.
         - groundtruth_classes: a int64 tensor of shape [None].
@@ -172,7 +197,15 @@ class TfExampleDecoder(decoder.Decoder):
     decode_image_shape = tf.logical_or(
         tf.equal(parsed_tensors['image/height'], -1),
         tf.equal(parsed_tensors['image/width'], -1))
-    image_shape = tf.cast(tf.shape(image), dtype=tf.int64)
+    if self._decode_image_bytes:
+      image_shape = tf.cast(tf.shape(image), dtype=tf.int64)
+    else:
+      image_shape = tf.cond(
+          decode_image_shape,
+          lambda: tf.cast(self._get_encoded_image_shape(image), tf.int64),
+          lambda: tf.stack([  # pylint: disable=g-long-lambda
+              parsed_tensors['image/height'], parsed_tensors['image/width'],
+              tf.constant(3, tf.int64)]))
 
     parsed_tensors['image/height'] = tf.where(decode_image_shape,
                                               image_shape[0],
@@ -76,6 +76,28 @@ class TfExampleDecoderTest(tf.test.TestCase, parameterized.TestCase):
     self.assertAllEqual(
         (num_instances,), results['groundtruth_instance_masks_png'].shape)
 
+  @parameterized.parameters(True, False)
+  def test_keeps_encoded_image(self, fill_image_size):
+    decoder = tf_example_decoder.TfExampleDecoder(decode_image=False)
+
+    serialized_example = tfexample_utils.create_detection_test_example(
+        image_height=80,
+        image_width=120,
+        image_channel=3,
+        num_instances=2,
+        fill_image_size=fill_image_size,
+    ).SerializeToString()
+    decoded_tensors = decoder.decode(
+        tf.convert_to_tensor(value=serialized_example))
+
+    results = tf.nest.map_structure(lambda x: x.numpy(), decoded_tensors)
+
+    self.assertEqual(
+        (80, 120, 3), tf.io.decode_image(results['image']).numpy().shape)
+    self.assertEqual(80, results['height'])
+    self.assertEqual(120, results['width'])
+    self.assertAllEqual((2, 4), results['groundtruth_boxes'].shape)
+
   def test_result_content(self):
     decoder = tf_example_decoder.TfExampleDecoder(
         include_mask=True, attribute_names=['attr1', 'attr2']
@@ -28,10 +28,11 @@ class TfExampleDecoderLabelMap(tf_example_decoder.TfExampleDecoder):
   """Tensorflow Example proto decoder."""
 
   def __init__(self, label_map, include_mask=False, regenerate_source_id=False,
-               mask_binarize_threshold=None):
+               mask_binarize_threshold=None, decode_image=True):
     super(TfExampleDecoderLabelMap, self).__init__(
         include_mask=include_mask, regenerate_source_id=regenerate_source_id,
-        mask_binarize_threshold=mask_binarize_threshold)
+        mask_binarize_threshold=mask_binarize_threshold,
+        decode_image=decode_image)
     self._keys_to_features.update({
         'image/object/class/text': tf.io.VarLenFeature(tf.string),
     })
@@ -27,6 +27,8 @@ See also: https://github.com/cocodataset/cocoapi/
 """
 
 import atexit
+import collections
+import multiprocessing.pool
 import tempfile
 # Import libraries
 from absl import logging
@@ -36,6 +38,7 @@ import six
 import tensorflow as tf, tf_keras
 
 from official.vision.evaluation import coco_utils
+from official.vision.evaluation import parallel_cocoeval
 
 
 class COCOEvaluator(object):
@@ -49,7 +52,9 @@ class COCOEvaluator(object):
                need_rescale_keypoints=False,
                per_category_metrics=False,
                max_num_eval_detections=100,
-               kpt_oks_sigmas=None):
+               kpt_oks_sigmas=None,
+               num_eval_workers=0,
+               num_mask_encoding_workers=0):
     """Constructs COCO evaluation class.
 
     The class provides the interface to COCO metrics_fn. The
@@ -75,6 +80,15 @@ class COCOEvaluator(object):
       kpt_oks_sigmas: The sigmas used to calculate keypoint OKS. See
         http://cocodataset.org/#keypoints-eval. When None, it will use the
         defaults in COCO.
+      num_eval_workers: The number of worker processes used to run the
+        per-image COCO evaluation. The box, mask and keypoint evaluations are
+        sharded by image id and run concurrently. When 0, the evaluations run
+        sequentially with `COCOeval.evaluate` in the current process.
+      num_mask_encoding_workers: The number of background threads used to paste
+        and RLE-encode the predicted masks of each batch. When 0, the masks are
+        encoded synchronously in `update_state`. Either way only the RLEs are
+        kept until `evaluate`. The threads are started by the first
+        `update_state` and stopped by `evaluate` or `reset_states`.
     Raises:
       ValueError: if max_num_eval_detections is not an integer.
     """
@@ -102,6 +116,15 @@ class COCOEvaluator(object):
         f'ARmax{max_num_eval_detections}', 'ARs', 'ARm', 'ARl'
     ]
     self.max_num_eval_detections = max_num_eval_detections
+    self._num_eval_workers = num_eval_workers
+    self._num_mask_encoding_workers = (
+        num_mask_encoding_workers if include_mask else 0)
+    # Bounds the number of batches whose raw masks are held while waiting to be
+    # encoded.
+    self._max_pending_mask_batches = 2 * self._num_mask_encoding_workers
+    # Created on the first `update_state` of each evaluation and released once
+    # its pending masks are encoded, so idle evaluators hold no threads.
+    self._mask_encoding_pool = None
     self._required_prediction_fields = [
         'source_id', 'num_detections', 'detection_classes', 'detection_scores',
         'detection_boxes'
@@ -137,7 +160,13 @@ class COCOEvaluator(object):
 
   def reset_states(self):
     """Resets internal states for a fresh run."""
-    self._predictions = {}
+    self._detections = []
+    self._pending_masks = collections.deque()
+    if self._mask_encoding_pool is not None:
+      # Drops the encodings of a partial evaluation.
+      self._mask_encoding_pool.terminate()
+      self._mask_encoding_pool.join()
+      self._mask_encoding_pool = None
     if not self._annotation_file:
       self._groundtruths = {}
 
@@ -165,38 +194,40 @@ class COCOEvaluator(object):
     else:
       logging.info('Using annotation file: %s', self._annotation_file)
       coco_gt = self._coco_gt
-    coco_predictions = coco_utils.convert_predictions_to_coco_annotations(
-        self._predictions)
-    coco_dt = coco_gt.loadRes(predictions=coco_predictions)
-    image_ids = [ann['image_id'] for ann in coco_predictions]
+    self._wait_for_pending_masks(0)
+    if self._mask_encoding_pool is not None:
+      self._mask_encoding_pool.close()
+      self._mask_encoding_pool.join()
+      self._mask_encoding_pool = None
+    detections = coco_utils.concatenate_coco_arrays(self._detections)
+    coco_dt = coco_gt.loadResFromArrays(detections)
+    image_ids = np.unique(detections['image_id']).tolist()
 
     coco_eval = cocoeval.COCOeval(coco_gt, coco_dt, iouType='bbox')
     coco_eval.params.imgIds = image_ids
     coco_eval.params.maxDets[2] = self.max_num_eval_detections
-    coco_eval.evaluate()
-    coco_eval.accumulate()
-    coco_eval.summarize()
-    coco_metrics = coco_eval.stats
-    metrics = coco_metrics
+    coco_evals = [coco_eval]
 
     if self._include_mask:
       mcoco_eval = cocoeval.COCOeval(coco_gt, coco_dt, iouType='segm')
       mcoco_eval.params.imgIds = image_ids
-      mcoco_eval.evaluate()
-      mcoco_eval.accumulate()
-      mcoco_eval.summarize()
-      mask_coco_metrics = mcoco_eval.stats
-      metrics = np.hstack((metrics, mask_coco_metrics))
+      coco_evals.append(mcoco_eval)
 
     if self._include_keypoint:
       kcoco_eval = cocoeval.COCOeval(coco_gt, coco_dt, iouType='keypoints',
                                      kpt_oks_sigmas=self._kpt_oks_sigmas)
       kcoco_eval.params.imgIds = image_ids
-      kcoco_eval.evaluate()
-      kcoco_eval.accumulate()
-      kcoco_eval.summarize()
-      keypoint_coco_metrics = kcoco_eval.stats
-      metrics = np.hstack((metrics, keypoint_coco_metrics))
+      coco_evals.append(kcoco_eval)
+
+    if self._num_eval_workers:
+      parallel_cocoeval.evaluate(coco_evals, self._num_eval_workers)
+    else:
+      for evaluation in coco_evals:
+        evaluation.evaluate()
+    for evaluation in coco_evals:
+      evaluation.accumulate()
+      evaluation.summarize()
+    metrics = np.hstack([evaluation.stats for evaluation in coco_evals])
 
     metrics_dict = {}
     for i, name in enumerate(self._metric_names):
@@ -293,6 +324,12 @@ class COCOEvaluator(object):
         predictions['detection_keypoints'].astype(np.float32))
     predictions['detection_keypoints'] /= image_scale
 
+  def _wait_for_pending_masks(self, max_pending):
+    """Waits until at most `max_pending` batches of masks are being encoded."""
+    while len(self._pending_masks) > max_pending:
+      detections, encoded_masks = self._pending_masks.popleft()
+      detections['segmentation'] = encoded_masks.get()
+
   def _convert_to_numpy(self, groundtruths, predictions):
     """Converts tesnors to numpy arrays."""
     if groundtruths:
@@ -366,11 +403,27 @@ class COCOEvaluator(object):
       self._process_bbox_predictions(predictions)
     if self._need_rescale_keypoints:
       self._process_keypoints_predictions(predictions)
-    for k, v in six.iteritems(predictions):
-      if k not in self._predictions:
-        self._predictions[k] = [v]
-      else:
-        self._predictions[k].append(v)
+    # Converts each batch to columnar COCO detections as it arrives, so only
+    # the compact arrays and mask RLEs are retained until `evaluate`.
+    if self._num_mask_encoding_workers:
+      if self._mask_encoding_pool is None:
+        self._mask_encoding_pool = multiprocessing.pool.ThreadPool(
+            self._num_mask_encoding_workers)
+      masks = predictions.pop('detection_masks')
+      detections = coco_utils.convert_batch_predictions_to_coco_arrays(
+          predictions)
+      encoded_masks = self._mask_encoding_pool.apply_async(
+          coco_utils.encode_instance_masks,
+          (masks,
+           predictions.get('detection_outer_boxes',
+                           predictions['detection_boxes']),
+           predictions['image_info']))
+      self._pending_masks.append((detections, encoded_masks))
+      self._wait_for_pending_masks(self._max_pending_mask_batches)
+    else:
+      detections = coco_utils.convert_batch_predictions_to_coco_arrays(
+          predictions)
+    self._detections.append(detections)
 
     if not self._annotation_file:
       assert groundtruths
@@ -0,0 +1,154 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for coco_evaluator."""
+
+import json
+import os
+
+from absl.testing import parameterized
+import numpy as np
+import tensorflow as tf, tf_keras
+
+from official.vision.evaluation import coco_evaluator
+
+_IMAGE_SIZE = 64
+_NUM_CLASSES = 3
+
+
+def _create_annotation_file(path, num_images, rng):
+  """Writes a COCO annotation file with box-shaped instance polygons."""
+  annotations = []
+  for image_id in range(1, num_images + 1):
+    for _ in range(3):
+      x, y = rng.uniform(0, _IMAGE_SIZE / 2, [2])
+      w, h = rng.uniform(4, _IMAGE_SIZE / 2, [2])
+      annotations.append({
+          'id': len(annotations) + 1,
+          'image_id': image_id,
+          'category_id': int(rng.randint(1, _NUM_CLASSES + 1)),
+          'bbox': [x, y, w, h],
+          'area': w * h,
+          'iscrowd': 0,
+          'segmentation': [[x, y, x, y + h, x + w, y + h, x + w, y]],
+      })
+  with open(path, 'w') as f:
+    json.dump({
+        'images': [{'id': i, 'height': _IMAGE_SIZE, 'width': _IMAGE_SIZE}
+                   for i in range(1, num_images + 1)],
+        'categories': [{'id': i} for i in range(1, _NUM_CLASSES + 1)],
+        'annotations': annotations,
+    }, f)
+  return annotations
+
+
+def _create_predictions(annotations, num_images, batch_size, rng,
+                        include_mask):
+  """Creates batched predictions close to the ground-truth annotations."""
+  max_num_detections = 6
+  batches = []
+  for start in range(1, num_images + 1, batch_size):
+    source_id = np.arange(start, start + batch_size)
+    boxes = np.zeros([batch_size, max_num_detections, 4], dtype=np.float32)
+    classes = rng.randint(1, _NUM_CLASSES + 1, [batch_size, max_num_detections])
+    for j, image_id in enumerate(source_id):
+      gts = [ann for ann in annotations if ann['image_id'] == image_id]
+      for k in range(max_num_detections):
+        if k < len(gts):
+          x, y, w, h = np.array(gts[k]['bbox']) + rng.normal(0, 1, [4])
+          classes[j, k] = gts[k]['category_id']
+        else:
+          x, y = rng.uniform(0, _IMAGE_SIZE / 2, [2])
+          w, h = rng.uniform(4, _IMAGE_SIZE / 2, [2])
+        boxes[j, k] = [y, x, y + h, x + w]
+    predictions = {
+        'source_id': source_id,
+        'num_detections': np.full([batch_size], max_num_detections),
+        'detection_boxes': boxes,
+        'detection_classes': classes,
+        'detection_scores': rng.random_sample(
+            [batch_size, max_num_detections]).astype(np.float32),
+        'image_info': np.tile(
+            np.array([[_IMAGE_SIZE, _IMAGE_SIZE], [_IMAGE_SIZE, _IMAGE_SIZE],
+                      [1, 1], [0, 0]], dtype=np.float32),
+            [batch_size, 1, 1]),
+    }
+    if include_mask:
+      predictions['detection_masks'] = rng.random_sample(
+          [batch_size, max_num_detections, 7, 7]).astype(np.float32)
+    batches.append(
+        {k: tf.convert_to_tensor(v) for k, v in predictions.items()})
+  return batches
+
+
+class COCOEvaluatorTest(tf.test.TestCase, parameterized.TestCase):
+
+  def _evaluate(self, include_mask, **kwargs):
+    return self._evaluate_with_evaluator(include_mask, **kwargs)[0]
+
+  def _evaluate_with_evaluator(self, include_mask, **kwargs):
+    rng = np.random.RandomState(0)
+    num_images = 8
+    annotation_file = os.path.join(self.get_temp_dir(), 'annotations.json')
+    annotations = _create_annotation_file(annotation_file, num_images, rng)
+    evaluator = coco_evaluator.COCOEvaluator(
+        annotation_file=annotation_file,
+        include_mask=include_mask,
+        need_rescale_bboxes=False,
+        **kwargs)
+    for predictions in _create_predictions(
+        annotations, num_images, batch_size=2, rng=rng,
+        include_mask=include_mask):
+      evaluator.update_state(None, predictions)
+    return evaluator.result(), evaluator
+
+  @parameterized.parameters(False, True)
+  def test_evaluate(self, include_mask):
+    metrics = self._evaluate(include_mask)
+    self.assertGreater(metrics['AP50'], 0.)
+    if include_mask:
+      self.assertIn('mask_AP', metrics)
+
+  @parameterized.parameters(False, True)
+  def test_parallel_evaluation_matches(self, include_mask):
+    expected_metrics = self._evaluate(include_mask)
+    metrics = self._evaluate(include_mask, num_eval_workers=2)
+    self.assertEqual(metrics, expected_metrics)
+
+  def test_background_mask_encoding_matches(self):
+    expected_metrics = self._evaluate(include_mask=True)
+    metrics = self._evaluate(include_mask=True, num_mask_encoding_workers=2)
+    self.assertEqual(metrics, expected_metrics)
+
+  def test_mask_encoding_threads_are_released(self):
+    # pylint: disable=protected-access
+    _, evaluator = self._evaluate_with_evaluator(
+        include_mask=True, num_mask_encoding_workers=2)
+    self.assertIsNone(evaluator._mask_encoding_pool)
+
+    # A partial evaluation releases its threads on `reset_states`.
+    rng = np.random.RandomState(0)
+    annotations = _create_annotation_file(
+        os.path.join(self.get_temp_dir(), 'partial.json'), 2, rng)
+    evaluator.update_state(
+        None,
+        _create_predictions(
+            annotations, 2, batch_size=2, rng=rng, include_mask=True)[0])
+    self.assertIsNotNone(evaluator._mask_encoding_pool)
+    evaluator.reset_states()
+    self.assertIsNone(evaluator._mask_encoding_pool)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -14,6 +14,7 @@
 
 """Util functions related to pycocotools and COCO eval."""
 
+import collections
 import copy
 import json
 
@@ -104,6 +105,81 @@ class COCOWrapper(coco.COCO):
     res.createIndex()
     return res
 
+  def loadResFromArrays(self, detections):
+    """Loads columnar detections and return a result api object.
+
+    Unlike `loadRes`, the detections are never deep-copied and the index of the
+    result api object is built directly from the arrays instead of iterating
+    `createIndex` over the annotations.
+
+    Args:
+      detections: a dictionary of columnar detections as returned by
+        `convert_predictions_to_coco_arrays`. The required fields are
+        `image_id`, `category_id`, `bbox`, `score`; `segmentation` is required
+        for the `mask` eval type and `keypoints` is optional.
+
+    Returns:
+      res: result COCO api object.
+
+    Raises:
+      ValueError: if the set of image id from detections is not the subset of
+        the set of image id of the ground-truth dataset.
+    """
+    res = coco.COCO()
+    res.dataset['images'] = list(self.dataset['images'])
+    res.dataset['categories'] = list(self.dataset['categories'])
+
+    image_ids = np.asarray(detections['image_id'])
+    category_ids = np.asarray(detections['category_id'])
+    boxes = np.asarray(detections['bbox'])
+    if np.setdiff1d(image_ids, list(self.getImgIds())).size:
+      raise ValueError('Results do not correspond to the current dataset!')
+
+    num_detections = image_ids.shape[0]
+    ann_ids = np.arange(1, num_detections + 1)
+    columns = {
+        'image_id': image_ids.tolist(),
+        'category_id': category_ids.tolist(),
+        'bbox': boxes.tolist(),
+        'score': np.asarray(detections['score']).tolist(),
+        'id': ann_ids.tolist(),
+    }
+    if self._eval_type == 'box':
+      columns['area'] = (boxes[:, 2] * boxes[:, 3]).tolist()
+      x1, y1 = boxes[:, 0], boxes[:, 1]
+      x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+      polygons = np.stack([x1, y1, x1, y2, x2, y2, x2, y1], axis=-1)
+      columns['segmentation'] = [[polygon] for polygon in polygons.tolist()]
+    elif self._eval_type == 'mask':
+      columns['area'] = mask_api.area(detections['segmentation']).tolist()
+      columns['segmentation'] = detections['segmentation']
+    if 'keypoints' in detections:
+      columns['keypoints'] = np.asarray(detections['keypoints']).tolist()
+
+    keys = list(columns.keys())
+    annotations = [dict(zip(keys, values)) for values in zip(*columns.values())]
+    res.dataset['annotations'] = annotations
+
+    # Builds the same index as `coco.COCO.createIndex`, grouping annotations
+    # by image and category with a stable sort so that the per-image order
+    # (and hence score tie-breaking in COCOeval) is unchanged.
+    res.anns = dict(zip(columns['id'], annotations))
+    res.imgs = {img['id']: img for img in res.dataset['images']}
+    res.cats = {cat['id']: cat for cat in res.dataset['categories']}
+    res.imgToAnns = collections.defaultdict(list)
+    res.catToImgs = collections.defaultdict(list)
+    order = np.argsort(image_ids, kind='stable')
+    unique_ids, starts = np.unique(image_ids[order], return_index=True)
+    for image_id, indices in zip(unique_ids.tolist(),
+                                 np.split(order, starts[1:])):
+      res.imgToAnns[image_id] = [annotations[i] for i in indices]
+    order = np.argsort(category_ids, kind='stable')
+    unique_ids, starts = np.unique(category_ids[order], return_index=True)
+    for category_id, indices in zip(unique_ids.tolist(),
+                                    np.split(order, starts[1:])):
+      res.catToImgs[category_id] = image_ids[indices].tolist()
+    return res
+
 
 def convert_predictions_to_coco_annotations(predictions):
   """Converts a batch of predictions to annotations in COCO format.
@@ -189,6 +265,152 @@ def convert_predictions_to_coco_annotations(predictions):
   return coco_predictions
 
 
+def convert_batch_predictions_to_coco_arrays(predictions):
+  """Converts a single batch of predictions to columnar COCO detections.
+
+  This is the incremental counterpart of
+  `convert_predictions_to_coco_annotations`: instead of building one dictionary
+  per detection, each field is flattened into an array with one row per
+  detection, in the same order.
+
+  Args:
+    predictions: a dictionary of numpy arrays for a single batch including the
+      following fields. 'K' below denotes the maximum number of instances per
+      image.
+      Required fields:
+        - source_id: a numpy array of int of shape [batch_size].
+        - detection_boxes: a numpy array of float of shape [batch_size, K, 4],
+            where coordinates are in the original image space (not the scaled
+            image space).
+        - detection_classes: a numpy array of int of shape [batch_size, K].
+        - detection_scores: a numpy array of float of shape [batch_size, K].
+      Optional fields:
+        - detection_masks: a numpy array of float of shape
+            [batch_size, K, mask_height, mask_width]. `image_info` is required
+            when masks are present.
+        - detection_outer_boxes: a numpy array of float of shape
+            [batch_size, K, 4] used to paste the masks.
+        - detection_keypoints: a numpy array of float of shape
+            [batch_size, K, num_keypoints, 2].
+
+  Returns:
+    detections: a dictionary with the fields `image_id` [N], `category_id` [N],
+      `bbox` [N, 4] in [x, y, w, h] format and `score` [N], where
+      N = batch_size * K, plus `segmentation` (a list of N RLE dictionaries)
+      and `keypoints` [N, num_keypoints * 3] when available.
+  """
+  batch_size, max_num_detections = predictions['detection_classes'].shape[:2]
+  boxes = box_ops.yxyx_to_xywh(predictions['detection_boxes'])
+  detections = {
+      'image_id': np.repeat(
+          np.reshape(predictions['source_id'], [-1]), max_num_detections),
+      'category_id': np.reshape(predictions['detection_classes'], [-1]),
+      'bbox': np.reshape(boxes, [-1, 4]),
+      'score': np.reshape(predictions['detection_scores'], [-1]),
+  }
+
+  if 'detection_masks' in predictions:
+    detections['segmentation'] = encode_instance_masks(
+        predictions['detection_masks'],
+        predictions.get('detection_outer_boxes',
+                        predictions['detection_boxes']),
+        predictions['image_info'])
+
+  if 'detection_keypoints' in predictions:
+    # Adds extra ones to indicate the visibility for each keypoint as is
+    # recommended by MSCOCO. Also, convert keypoint from [y, x] to [x, y]
+    # as mandated by COCO.
+    keypoints = predictions['detection_keypoints']
+    coco_keypoints = np.concatenate(
+        [
+            keypoints[..., 1:],
+            keypoints[..., :1],
+            np.ones(keypoints.shape[:-1] + (1,)),
+        ],
+        axis=-1,
+    ).astype(int)
+    detections['keypoints'] = np.reshape(
+        coco_keypoints, [batch_size * max_num_detections, -1])
+
+  return detections
+
+
+def encode_instance_masks(masks, boxes, image_info):
+  """Pastes a batch of instance masks and encodes them as COCO RLEs.
+
+  The masks are pasted into crop-local canvases and encoded from the crops
+  directly, so no full-resolution mask is ever materialized, and only the RLEs
+  are returned.
+
+  Args:
+    masks: a numpy array of float of shape
+      [batch_size, K, mask_height, mask_width].
+    boxes: a numpy array of float of shape [batch_size, K, 4] representing the
+      boxes the masks are pasted into, in [ymin, xmin, ymax, xmax] format in
+      the original image space.
+    image_info: a numpy array of float of shape [batch_size, 4, 2] where
+      `image_info[:, 0, :]` is the original image size.
+
+  Returns:
+    encoded_masks: a list of batch_size * K RLE dictionaries.
+  """
+  mask_boxes = box_ops.yxyx_to_xywh(boxes)
+  encoded_masks = []
+  for j in range(masks.shape[0]):
+    image_height = int(image_info[j, 0, 0])
+    image_width = int(image_info[j, 0, 1])
+    crops, offsets = mask_ops.paste_instance_masks_to_crops(
+        masks[j], mask_boxes[j], image_height, image_width)
+    counts = mask_ops.crop_masks_to_rle_counts(
+        crops, offsets, image_height, image_width)
+    encoded_masks.extend(mask_api.frPyObjects(
+        [{'size': [image_height, image_width], 'counts': c.tolist()}
+         for c in counts],
+        image_height, image_width))
+  return encoded_masks
+
+
+def concatenate_coco_arrays(detections_list):
+  """Concatenates a list of columnar COCO detections into a single one.
+
+  Args:
+    detections_list: a list of dictionaries as returned by
+      `convert_batch_predictions_to_coco_arrays`.
+
+  Returns:
+    detections: a dictionary with the same fields, concatenated along the first
+      dimension.
+  """
+  detections = {}
+  for key in detections_list[0]:
+    if key == 'segmentation':
+      detections[key] = [
+          rle for batch in detections_list for rle in batch[key]]
+    else:
+      detections[key] = np.concatenate(
+          [batch[key] for batch in detections_list], axis=0)
+  return detections
+
+
+def convert_predictions_to_coco_arrays(predictions):
+  """Converts a dictionary of lists of batched predictions to COCO arrays.
+
+  Args:
+    predictions: a dictionary of lists of numpy arrays with the same fields as
+      in `convert_predictions_to_coco_annotations`.
+
+  Returns:
+    detections: a dictionary of columnar detections as returned by
+      `convert_batch_predictions_to_coco_arrays`, covering all batches.
+  """
+  num_batches = len(predictions['source_id'])
+  return concatenate_coco_arrays([
+      convert_batch_predictions_to_coco_arrays(
+          {k: v[i] for k, v in six.iteritems(predictions)})
+      for i in range(num_batches)
+  ])
+
+
 def convert_groundtruths_to_coco_dataset(groundtruths, label_map=None):
   """Converts ground-truths to the dataset in COCO format.
 
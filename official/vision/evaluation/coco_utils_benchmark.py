@@ -0,0 +1,112 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks COCO prediction conversion and result loading.
+
+Compares the per-detection dictionary path
+(`convert_predictions_to_coco_annotations` + `COCOWrapper.loadRes`) with the
+columnar path (`convert_batch_predictions_to_coco_arrays` +
+`COCOWrapper.loadResFromArrays`) used by `COCOEvaluator`.
+
+Run with:
+  python -m official.vision.evaluation.coco_utils_benchmark \
+    --benchmark_filter=.
+"""
+
+import copy
+import time
+
+import numpy as np
+import tensorflow as tf, tf_keras
+
+from official.vision.evaluation import coco_utils
+
+
+def _create_predictions(num_images, batch_size, max_num_detections,
+                        image_size=640):
+  """Creates random batched predictions in the `COCOEvaluator` format."""
+  rng = np.random.RandomState(0)
+  predictions = {
+      'source_id': [], 'detection_boxes': [], 'detection_classes': [],
+      'detection_scores': []}
+  for start in range(0, num_images, batch_size):
+    ymin_xmin = rng.uniform(
+        0, image_size / 2, [batch_size, max_num_detections, 2])
+    height_width = rng.uniform(
+        1, image_size / 2, [batch_size, max_num_detections, 2])
+    predictions['source_id'].append(np.arange(start, start + batch_size) + 1)
+    predictions['detection_boxes'].append(
+        np.concatenate([ymin_xmin, ymin_xmin + height_width], axis=-1)
+        .astype(np.float32))
+    predictions['detection_classes'].append(
+        rng.randint(1, 81, [batch_size, max_num_detections]))
+    predictions['detection_scores'].append(
+        rng.random_sample([batch_size, max_num_detections]).astype(np.float32))
+  return predictions
+
+
+class COCOUtilsBenchmark(tf.test.Benchmark):
+  """Benchmarks for COCO prediction conversion."""
+
+  def _run(self, name, num_images, batch_size=8, max_num_detections=100):
+    predictions = _create_predictions(
+        num_images, batch_size, max_num_detections)
+    coco_gt = coco_utils.COCOWrapper(
+        eval_type='box',
+        gt_dataset={
+            'images': [{'id': i + 1, 'height': 640, 'width': 640}
+                       for i in range(num_images)],
+            'categories': [{'id': i} for i in range(1, 81)],
+            'annotations': [],
+        })
+
+    dict_predictions = copy.deepcopy(predictions)
+    start = time.time()
+    annotations = coco_utils.convert_predictions_to_coco_annotations(
+        dict_predictions)
+    coco_gt.loadRes(annotations)
+    dict_wall_time = time.time() - start
+
+    start = time.time()
+    detections = []
+    for i in range(len(predictions['source_id'])):
+      detections.append(coco_utils.convert_batch_predictions_to_coco_arrays(
+          {k: v[i] for k, v in predictions.items()}))
+    coco_gt.loadResFromArrays(coco_utils.concatenate_coco_arrays(detections))
+    arrays_wall_time = time.time() - start
+
+    num_detections = num_images * max_num_detections
+    self.report_benchmark(
+        name=name + '_dict',
+        iters=1,
+        wall_time=dict_wall_time,
+        extras={'detections_per_sec': num_detections / dict_wall_time})
+    self.report_benchmark(
+        name=name + '_arrays',
+        iters=1,
+        wall_time=arrays_wall_time,
+        extras={
+            'detections_per_sec': num_detections / arrays_wall_time,
+            'speedup': dict_wall_time / arrays_wall_time
+        })
+
+  def benchmark_convert_and_load_500_images(self):
+    self._run('convert_and_load_500_images', num_images=500)
+
+  def benchmark_convert_and_load_5000_images(self):
+    self._run('convert_and_load_5000_images', num_images=5000)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -14,8 +14,10 @@
 
 """Tests for coco_utils."""
 
+import copy
 import os
 
+from absl.testing import parameterized
 import numpy as np
 import tensorflow as tf, tf_keras
 
@@ -23,7 +25,7 @@ from official.vision.dataloaders import tfexample_utils
 from official.vision.evaluation import coco_utils
 
 
-class CocoUtilsTest(tf.test.TestCase):
+class CocoUtilsTest(tf.test.TestCase, parameterized.TestCase):
 
   def test_scan_and_generator_annotation_file(self):
     num_samples = 10
@@ -90,6 +92,99 @@ class CocoUtilsTest(tf.test.TestCase):
       expected_keypoint_ann = expected_keypoint_ann.flatten().tolist()
       self.assertAllEqual(anns[i]['keypoints'], expected_keypoint_ann)
 
+  def _create_predictions(self, include_mask=False, num_batches=2):
+    batch_size = 2
+    max_num_detections = 5
+    image_size = 64
+    predictions = {
+        'source_id': [], 'detection_boxes': [], 'detection_classes': [],
+        'detection_scores': [], 'image_info': []}
+    if include_mask:
+      predictions['detection_masks'] = []
+    for i in range(num_batches):
+      ymin_xmin = np.random.uniform(
+          0, image_size / 2, [batch_size, max_num_detections, 2])
+      height_width = np.random.uniform(
+          1, image_size / 2, [batch_size, max_num_detections, 2])
+      predictions['source_id'].append(
+          np.arange(i * batch_size, (i + 1) * batch_size) + 1)
+      predictions['detection_boxes'].append(
+          np.concatenate([ymin_xmin, ymin_xmin + height_width], axis=-1)
+          .astype(np.float32))
+      predictions['detection_classes'].append(
+          np.random.randint(1, 3, [batch_size, max_num_detections]))
+      predictions['detection_scores'].append(
+          np.random.random([batch_size, max_num_detections])
+          .astype(np.float32))
+      predictions['image_info'].append(np.tile(
+          np.array([[image_size, image_size]], dtype=np.float32),
+          [batch_size, 4, 1]))
+      if include_mask:
+        predictions['detection_masks'].append(np.random.random(
+            [batch_size, max_num_detections, 8, 8]).astype(np.float32))
+    return predictions
+
+  @parameterized.parameters(False, True)
+  def test_convert_predictions_to_coco_arrays(self, include_mask):
+    predictions = self._create_predictions(include_mask=include_mask)
+    detections = coco_utils.convert_predictions_to_coco_arrays(
+        copy.deepcopy(predictions))
+    anns = coco_utils.convert_predictions_to_coco_annotations(predictions)
+
+    self.assertLen(detections['image_id'], len(anns))
+    for i, ann in enumerate(anns):
+      self.assertEqual(detections['image_id'][i], ann['image_id'])
+      self.assertEqual(detections['category_id'][i], ann['category_id'])
+      self.assertAllEqual(detections['bbox'][i], ann['bbox'])
+      self.assertEqual(detections['score'][i], ann['score'])
+      if include_mask:
+        self.assertEqual(detections['segmentation'][i], ann['segmentation'])
+
+  @parameterized.parameters(('box', False), ('mask', True))
+  def test_load_res_from_arrays(self, eval_type, include_mask):
+    predictions = self._create_predictions(include_mask=include_mask)
+    gt_dataset = {
+        'images': [{'id': i, 'height': 64, 'width': 64} for i in range(1, 5)],
+        'categories': [{'id': 1}, {'id': 2}],
+        'annotations': [],
+    }
+    coco_gt = coco_utils.COCOWrapper(eval_type=eval_type, gt_dataset=gt_dataset)
+    detections = coco_utils.convert_predictions_to_coco_arrays(
+        copy.deepcopy(predictions))
+    anns = coco_utils.convert_predictions_to_coco_annotations(predictions)
+
+    res = coco_gt.loadResFromArrays(detections)
+    expected_res = coco_gt.loadRes(anns)
+
+    self.assertEqual(sorted(res.anns), sorted(expected_res.anns))
+    for ann_id, expected_ann in expected_res.anns.items():
+      ann = res.anns[ann_id]
+      self.assertAllClose(ann['bbox'], expected_ann['bbox'])
+      self.assertAllClose(ann['area'], expected_ann['area'])
+      self.assertEqual(ann['score'], expected_ann['score'])
+      self.assertEqual(ann['image_id'], expected_ann['image_id'])
+    for image_id, expected_anns in expected_res.imgToAnns.items():
+      self.assertEqual([ann['id'] for ann in res.imgToAnns[image_id]],
+                       [ann['id'] for ann in expected_anns])
+    for category_id, expected_image_ids in expected_res.catToImgs.items():
+      self.assertEqual(res.catToImgs[category_id], expected_image_ids)
+
+  def test_load_res_from_arrays_rejects_unknown_images(self):
+    gt_dataset = {
+        'images': [{'id': 1, 'height': 64, 'width': 64}],
+        'categories': [{'id': 1}],
+        'annotations': [],
+    }
+    coco_gt = coco_utils.COCOWrapper(eval_type='box', gt_dataset=gt_dataset)
+    detections = {
+        'image_id': np.array([2]),
+        'category_id': np.array([1]),
+        'bbox': np.array([[0., 0., 1., 1.]]),
+        'score': np.array([1.]),
+    }
+    with self.assertRaisesRegex(ValueError, 'Results do not correspond'):
+      coco_gt.loadResFromArrays(detections)
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -42,12 +42,6 @@ def realdiv_maybe_zero(x, y):
       np.less(np.abs(y), _EPSILON), np.zeros_like(x), np.divide(x, y))
 
 
-def _ids_to_counts(id_array):
-  """Given a numpy array, a mapping from each unique entry to its count."""
-  ids, counts = np.unique(id_array, return_counts=True)
-  return dict(zip(ids, counts))
-
-
 class PanopticQuality:
   """Metric class for Panoptic Quality.
 
@@ -118,22 +112,9 @@ class PanopticQuality:
     gt_segment_id = self._naively_combine_labels(groundtruth_category_mask,
                                                  groundtruth_instance_mask)
 
-    # Pre-calculate areas for all ground-truth and predicted segments.
-    gt_segment_areas = _ids_to_counts(gt_segment_id)
-    pred_segment_areas = _ids_to_counts(pred_segment_id)
-
     # We assume there is only one void segment and it has instance id = 0.
     void_segment_id = self.ignored_label * self.max_instances_per_category
 
-    # There may be other ignored ground-truth segments with instance id > 0,
-    # find those ids using the unique segment ids extracted with the area
-    # computation above.
-    ignored_segment_ids = {
-        gt_segment_id for gt_segment_id in gt_segment_areas
-        if (gt_segment_id //
-            self.max_instances_per_category) == self.ignored_label
-    }
-
     # Next, combine the ground-truth and predicted labels. Divide up the pixels
     # based on which ground-truth segment and predicted segment they belong to,
     # this will assign a different 32-bit integer label to each choice of
@@ -145,74 +126,97 @@ class PanopticQuality:
 
     # For every combination of (ground-truth segment, predicted segment) with a
     # non-empty intersection, this counts the number of pixels in that
-    # intersection.
-    intersection_areas = _ids_to_counts(intersection_id_array)
-
-    # Helper function that computes the area of the overlap between a predicted
-    # segment and the ground-truth void/ignored segment.
-    def prediction_void_overlap(pred_segment_id):
-      void_intersection_id = void_segment_id * self.offset + pred_segment_id
-      return intersection_areas.get(void_intersection_id, 0)
-
-    # Compute overall ignored overlap.
-    def prediction_ignored_overlap(pred_segment_id):
-      total_ignored_overlap = 0
-      for ignored_segment_id in ignored_segment_ids:
-        intersection_id = ignored_segment_id * self.offset + pred_segment_id
-        total_ignored_overlap += intersection_areas.get(intersection_id, 0)
-      return total_ignored_overlap
-
-    # Sets that are populated with segments which ground-truth/predicted
-    # segments have been matched with overlapping predicted/ground-truth
-    # segments respectively.
-    gt_matched = set()
-    pred_matched = set()
+    # intersection. The intersections are sorted by id.
+    intersection_ids, intersection_areas = np.unique(
+        intersection_id_array, return_counts=True)
+    intersection_gt_ids = intersection_ids // self.offset
+    intersection_pred_ids = intersection_ids % self.offset
+
+    # The areas of all ground-truth and predicted segments are the sums of the
+    # areas of their intersections, which avoids sorting the pixels again.
+    gt_segment_ids, intersection_gt_indices = np.unique(
+        intersection_gt_ids, return_inverse=True)
+    gt_segment_areas = np.bincount(
+        intersection_gt_indices, weights=intersection_areas).astype(np.int64)
+    pred_segment_ids, intersection_pred_indices = np.unique(
+        intersection_pred_ids, return_inverse=True)
+    pred_segment_areas = np.bincount(
+        intersection_pred_indices, weights=intersection_areas).astype(np.int64)
+
+    # The area of the overlap between each predicted segment and the
+    # ground-truth void segment, and all the ignored ground-truth segments,
+    # which may have instance id > 0.
+    is_void = intersection_gt_ids == void_segment_id
+    prediction_void_overlap = np.zeros_like(pred_segment_areas)
+    prediction_void_overlap[intersection_pred_indices[is_void]] = (
+        intersection_areas[is_void])
+    is_ignored = (intersection_gt_ids //
+                  self.max_instances_per_category) == self.ignored_label
+    prediction_ignored_overlap = np.zeros_like(pred_segment_areas)
+    np.add.at(prediction_ignored_overlap,
+              intersection_pred_indices[is_ignored],
+              intersection_areas[is_ignored])
 
     # Calculate IoU per pair of intersecting segments of the same category.
-    for intersection_id, intersection_area in intersection_areas.items():
-      gt_segment_id = int(intersection_id // self.offset)
-      pred_segment_id = int(intersection_id % self.offset)
-
-      gt_category = int(gt_segment_id // self.max_instances_per_category)
-      pred_category = int(pred_segment_id // self.max_instances_per_category)
-      if gt_category != pred_category:
-        continue
-
-      # Union between the ground-truth and predicted segments being compared
-      # does not include the portion of the predicted segment that consists of
-      # ground-truth "void" pixels.
-      union = (
-          gt_segment_areas[gt_segment_id] +
-          pred_segment_areas[pred_segment_id] - intersection_area -
-          prediction_void_overlap(pred_segment_id))
-      iou = intersection_area / union
-      if iou > 0.5:
-        self.tp_per_class[gt_category] += 1
-        self.iou_per_class[gt_category] += iou
-        gt_matched.add(gt_segment_id)
-        pred_matched.add(pred_segment_id)
-
-    # Count false negatives for each category.
-    for gt_segment_id in gt_segment_areas:
-      if gt_segment_id in gt_matched:
-        continue
-      category = gt_segment_id // self.max_instances_per_category
-      # Failing to detect a void segment is not a false negative.
-      if category == self.ignored_label:
-        continue
-      self.fn_per_class[category] += 1
-
-    # Count false positives for each category.
-    for pred_segment_id in pred_segment_areas:
-      if pred_segment_id in pred_matched:
-        continue
-      # A false positive is not penalized if is mostly ignored in the
-      # ground-truth.
-      if (prediction_ignored_overlap(pred_segment_id) /
-          pred_segment_areas[pred_segment_id]) > 0.5:
-        continue
-      category = pred_segment_id // self.max_instances_per_category
-      self.fp_per_class[category] += 1
+    gt_categories = intersection_gt_ids // self.max_instances_per_category
+    pred_categories = intersection_pred_ids // self.max_instances_per_category
+    same_category = gt_categories == pred_categories
+    categories = gt_categories[same_category].astype(np.int64)
+    gt_indices = intersection_gt_indices[same_category]
+    pred_indices = intersection_pred_indices[same_category]
+    intersection_areas = intersection_areas[same_category]
+
+    # Union between the ground-truth and predicted segments being compared
+    # does not include the portion of the predicted segment that consists of
+    # ground-truth "void" pixels.
+    unions = (
+        gt_segment_areas[gt_indices] + pred_segment_areas[pred_indices] -
+        intersection_areas - prediction_void_overlap[pred_indices])
+    ious = intersection_areas / unions
+    is_match = ious > 0.5
+    matched_categories = categories[is_match]
+    # Accumulates the IoUs in the order of the intersection ids, so that the
+    # sums do not depend on how the segments are matched.
+    np.add.at(self.tp_per_class, matched_categories, 1)
+    np.add.at(self.iou_per_class, matched_categories, ious[is_match])
+
+    # Arrays that mark segments which ground-truth/predicted segments have been
+    # matched with overlapping predicted/ground-truth segments respectively.
+    gt_matched = np.zeros(gt_segment_ids.shape, dtype=bool)
+    gt_matched[gt_indices[is_match]] = True
+    pred_matched = np.zeros(pred_segment_ids.shape, dtype=bool)
+    pred_matched[pred_indices[is_match]] = True
+
+    # Count false negatives for each category. Failing to detect a void
+    # segment is not a false negative.
+    gt_segment_categories = (
+        gt_segment_ids // self.max_instances_per_category).astype(np.int64)
+    is_fn = ~gt_matched & (gt_segment_categories != self.ignored_label)
+    np.add.at(self.fn_per_class, gt_segment_categories[is_fn], 1)
+
+    # Count false positives for each category. A false positive is not
+    # penalized if is mostly ignored in the ground-truth.
+    pred_segment_categories = (
+        pred_segment_ids // self.max_instances_per_category).astype(np.int64)
+    is_fp = ~pred_matched & (
+        prediction_ignored_overlap / pred_segment_areas <= 0.5)
+    np.add.at(self.fp_per_class, pred_segment_categories[is_fp], 1)
+
+  def merge(self, other):
+    """Adds the metrics accumulated by another `PanopticQuality`.
+
+    Args:
+      other: A `PanopticQuality` with the same number of categories, e.g. one
+        that accumulated a disjoint set of images in another process.
+    """
+    if other.num_categories != self.num_categories:
+      raise ValueError(
+          'Cannot merge a PanopticQuality with {} categories into one with {} '
+          'categories.'.format(other.num_categories, self.num_categories))
+    self.iou_per_class += other.iou_per_class
+    self.tp_per_class += other.tp_per_class
+    self.fn_per_class += other.fn_per_class
+    self.fp_per_class += other.fp_per_class
 
   def _valid_categories(self):
     """Categories with a "valid" value for the metric, have > 0 instances.
@@ -26,6 +26,9 @@ The following snippet demonstrates the use of interfaces:
 See also: https://github.com/cocodataset/cocoapi/
 """
 
+import collections
+import multiprocessing
+
 import numpy as np
 import tensorflow as tf, tf_keras
 
@@ -49,11 +52,20 @@ def _crop_padding(mask, image_info):
   return tf.expand_dims(mask[:, :, 0], axis=0)
 
 
+def _compare_and_accumulate(pq_args, groundtruths_list, predictions_list):
+  """Accumulates the metrics of a list of images in a new `PanopticQuality`."""
+  pq_metric_module = panoptic_quality.PanopticQuality(*pq_args)
+  for groundtruths, predictions in zip(groundtruths_list, predictions_list):
+    pq_metric_module.compare_and_accumulate(groundtruths, predictions)
+  return pq_metric_module
+
+
 class PanopticQualityEvaluator:
   """Panoptic Quality metric class."""
 
   def __init__(self, num_categories, ignored_label, max_instances_per_category,
-               offset, is_thing=None, rescale_predictions=False):
+               offset, is_thing=None, rescale_predictions=False,
+               num_workers=0, max_pending_batches_per_worker=2):
     """Constructs Panoptic Quality evaluation class.
 
     The class provides the interface to Panoptic Quality metrics_fn.
@@ -75,13 +87,29 @@ class PanopticQualityEvaluator:
       rescale_predictions: `bool`, whether to scale back prediction to original
         image sizes. If True, groundtruths['image_info'] is used to rescale
         predictions.
+      num_workers: The number of worker processes to compare the images of the
+        batches with. If greater than 1, `update_state` sends the images of
+        each batch to a process pool and returns before they are compared; the
+        per-class metrics of every batch are merged into the accumulated ones,
+        in order, as they become available and at the latest in `result`. The
+        results then only differ from a single-process evaluation by the
+        floating point summation order of the IoUs. The pool is kept across
+        evaluations until `close` is called or the evaluator is deleted.
+      max_pending_batches_per_worker: The maximum number of batches per worker
+        that are being compared before `update_state` blocks, which bounds the
+        memory used by the pending batches.
     """
-    self._pq_metric_module = panoptic_quality.PanopticQuality(
-        num_categories, ignored_label, max_instances_per_category, offset)
+    self._pq_args = (num_categories, ignored_label, max_instances_per_category,
+                     offset)
+    self._pq_metric_module = panoptic_quality.PanopticQuality(*self._pq_args)
     self._is_thing = is_thing
     self._rescale_predictions = rescale_predictions
     self._required_prediction_fields = ['category_mask', 'instance_mask']
     self._required_groundtruth_fields = ['category_mask', 'instance_mask']
+    self._num_workers = num_workers
+    self._max_pending_batches = num_workers * max_pending_batches_per_worker
+    self._pool = None
+    self._pending_results = collections.deque()
     self.reset_states()
 
   @property
@@ -89,15 +117,55 @@ class PanopticQualityEvaluator:
     return 'panoptic_quality'
 
   def reset_states(self):
-    """Resets internal states for a fresh run."""
+    """Resets internal states for a fresh run, but keeps the worker pool."""
+    self._pending_results.clear()
     self._pq_metric_module.reset()
 
   def result(self):
     """Evaluates detection results, and reset_states."""
+    self._merge_pending_results()
     results = self._pq_metric_module.result(self._is_thing)
     self.reset_states()
     return results
 
+  def _merge_pending_results(self, max_pending_results=0):
+    """Merges the oldest pending results until at most `max_pending_results`."""
+    while len(self._pending_results) > max_pending_results:
+      self._pq_metric_module.merge(self._pending_results.popleft().get())
+
+  def close(self):
+    """Discards the pending results and terminates the worker pool.
+
+    The evaluator can still be used afterwards, and then starts a new pool.
+    """
+    self._pending_results.clear()
+    if self._pool is not None:
+      self._pool.terminate()
+      self._pool.join()
+      self._pool = None
+
+  def __del__(self):
+    # `__init__` may have failed before the pool was set.
+    if getattr(self, '_pool', None) is not None:
+      self.close()
+
+  def _accumulate(self, groundtruths_list, predictions_list):
+    """Compares the images of a batch, maybe in the worker pool."""
+    if self._num_workers <= 1:
+      for groundtruths, predictions in zip(groundtruths_list, predictions_list):
+        self._pq_metric_module.compare_and_accumulate(groundtruths, predictions)
+      return
+
+    if self._pool is None:
+      # TensorFlow is not fork-safe, so the workers are spawned. They only
+      # receive and return numpy arrays.
+      self._pool = multiprocessing.get_context('spawn').Pool(self._num_workers)
+    self._pending_results.append(
+        self._pool.apply_async(
+            _compare_and_accumulate,
+            (self._pq_args, groundtruths_list, predictions_list)))
+    self._merge_pending_results(self._max_pending_batches)
+
   def _convert_to_numpy(self, groundtruths, predictions):
     """Converts tesnors to numpy arrays."""
     if groundtruths:
@@ -160,6 +228,8 @@ class PanopticQualityEvaluator:
         raise ValueError(
             'Missing the required key `{}` in groundtruths!'.format(k))
 
+    groundtruths_list = []
+    predictions_list = []
     if self._rescale_predictions:
       for idx in range(len(groundtruths['category_mask'])):
         image_info = groundtruths['image_info'][idx]
@@ -177,18 +247,16 @@ class PanopticQualityEvaluator:
             }
         groundtruths_, predictions_ = self._convert_to_numpy(
             groundtruths_, predictions_)
-
-        self._pq_metric_module.compare_and_accumulate(
-            groundtruths_, predictions_)
+        groundtruths_list.append(groundtruths_)
+        predictions_list.append(predictions_)
     else:
       for idx in range(len(groundtruths['category_mask'])):
-        groundtruths_ = {
+        groundtruths_list.append({
             'category_mask': groundtruths['category_mask'][idx],
             'instance_mask': groundtruths['instance_mask'][idx]
-        }
-        predictions_ = {
+        })
+        predictions_list.append({
             'category_mask': predictions['category_mask'][idx],
             'instance_mask': predictions['instance_mask'][idx]
-        }
-        self._pq_metric_module.compare_and_accumulate(groundtruths_,
-                                                      predictions_)
+        })
+    self._accumulate(groundtruths_list, predictions_list)
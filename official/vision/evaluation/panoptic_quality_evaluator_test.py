@@ -91,6 +91,43 @@ class PanopticQualityEvaluatorTest(tf.test.TestCase):
     self.assertAlmostEqual(results['All_sq'], 0.84236111)
     self.assertEqual(results['All_num_categories'], 1)
 
+  def test_multiple_workers(self):
+    rng = np.random.default_rng(0)
+    batches = []
+    for _ in range(5):
+      category_mask = rng.integers(0, 3, [2, 16, 16]).astype(np.uint16)
+      instance_mask = rng.integers(0, 2, [2, 16, 16]).astype(np.uint16)
+      predicted_category_mask = np.where(
+          rng.random([2, 16, 16]) < 0.2, 1, category_mask).astype(np.uint16)
+      groundtruths = {
+          'category_mask': tf.convert_to_tensor(category_mask),
+          'instance_mask': tf.convert_to_tensor(instance_mask),
+      }
+      predictions = {
+          'category_mask': tf.convert_to_tensor(predicted_category_mask),
+          'instance_mask': tf.convert_to_tensor(instance_mask),
+      }
+      batches.append((groundtruths, predictions))
+
+    results = []
+    for num_workers in (0, 2):
+      pq_evaluator = panoptic_quality_evaluator.PanopticQualityEvaluator(
+          num_categories=3,
+          ignored_label=0,
+          max_instances_per_category=16,
+          offset=256,
+          num_workers=num_workers,
+          max_pending_batches_per_worker=1)
+      # The second evaluation reuses the worker pool of the first one.
+      for _ in range(2):
+        for groundtruths, predictions in batches:
+          pq_evaluator.update_state(groundtruths, predictions)
+        results.append(pq_evaluator.result())
+      pq_evaluator.close()
+
+    for result in results[1:]:
+      self.assertAllClose(results[0], result)
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -301,6 +301,48 @@ class PanopticQualityTest(absltest.TestCase):
     self.assertAlmostEqual(results['All_sq'], 1.0)
     self.assertEqual(results['All_num_categories'], 2)
 
+  def test_merge(self):
+    rng = np.random.default_rng(0)
+    pq_metric = panoptic_quality.PanopticQuality(
+        num_categories=3,
+        ignored_label=0,
+        max_instances_per_category=16,
+        offset=256)
+    merged_pq_metric = panoptic_quality.PanopticQuality(
+        num_categories=3,
+        ignored_label=0,
+        max_instances_per_category=16,
+        offset=256)
+    for _ in range(4):
+      category_mask = rng.integers(0, 3, [8, 8]).astype(np.uint16)
+      instance_mask = rng.integers(0, 2, [8, 8]).astype(np.uint16)
+      groundtruths = {
+          'category_mask': category_mask,
+          'instance_mask': instance_mask
+      }
+      predictions = {
+          'category_mask': np.where(
+              rng.random([8, 8]) < 0.2, 1, category_mask).astype(np.uint16),
+          'instance_mask': instance_mask
+      }
+      pq_metric.compare_and_accumulate(groundtruths, predictions)
+      image_pq_metric = panoptic_quality.PanopticQuality(
+          num_categories=3,
+          ignored_label=0,
+          max_instances_per_category=16,
+          offset=256)
+      image_pq_metric.compare_and_accumulate(groundtruths, predictions)
+      merged_pq_metric.merge(image_pq_metric)
+
+    np.testing.assert_allclose(merged_pq_metric.iou_per_class,
+                               pq_metric.iou_per_class)
+    np.testing.assert_array_equal(merged_pq_metric.tp_per_class,
+                                  pq_metric.tp_per_class)
+    np.testing.assert_array_equal(merged_pq_metric.fn_per_class,
+                                  pq_metric.fn_per_class)
+    np.testing.assert_array_equal(merged_pq_metric.fp_per_class,
+                                  pq_metric.fp_per_class)
+
 
 class PanopticQualityV2Test(tf.test.TestCase):
 
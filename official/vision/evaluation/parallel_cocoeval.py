@@ -0,0 +1,185 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Multi-process per-image evaluation for pycocotools `COCOeval`.
+
+`COCOeval.evaluate()` computes the IoUs and the per-image matching for every
+(image, category) pair in a single process. `evaluate` below shards that work
+by image id across a process pool, for several `COCOeval` objects (e.g. box,
+mask and keypoint evaluations) at once, and merges the per-image results back
+into each object in the order pycocotools expects. `accumulate()` and
+`summarize()` are then run as usual, so the final stats match a serial run
+exactly.
+
+  coco_evals = [cocoeval.COCOeval(coco_gt, coco_dt, iouType='bbox'),
+                cocoeval.COCOeval(coco_gt, coco_dt, iouType='segm')]
+  parallel_cocoeval.evaluate(coco_evals, num_workers=8)
+  for coco_eval in coco_evals:
+    coco_eval.accumulate()
+    coco_eval.summarize()
+"""
+
+import copy
+import multiprocessing
+from typing import Any, Dict, List, Sequence
+
+from absl import logging
+import numpy as np
+from pycocotools import coco
+from pycocotools import cocoeval
+
+# The `COCOeval` objects being evaluated in a worker process. They are sent
+# once to every worker by `_init_worker` instead of being pickled for every
+# shard.
+_COCO_EVALS = []
+
+
+def _normalize_params(coco_eval: cocoeval.COCOeval) -> None:
+  """Normalizes the parameters the same way as `COCOeval.evaluate`."""
+  p = coco_eval.params
+  if p.useSegm is not None:
+    p.iouType = 'segm' if p.useSegm == 1 else 'bbox'
+  p.imgIds = list(np.unique(p.imgIds))
+  if p.useCats:
+    p.catIds = list(np.unique(p.catIds))
+  p.maxDets = sorted(p.maxDets)
+
+
+def _evaluate_images(coco_eval: cocoeval.COCOeval) -> List[Dict[str, Any]]:
+  """Runs the per-image evaluation of `COCOeval.evaluate` on its params.
+
+  Args:
+    coco_eval: a `COCOeval` object with normalized parameters.
+
+  Returns:
+    A list of per-image evaluation results ordered by category, area range and
+    image id, as in `COCOeval.evalImgs`.
+  """
+  p = coco_eval.params
+  coco_eval._prepare()  # pylint: disable=protected-access
+  cat_ids = p.catIds if p.useCats else [-1]
+  if p.iouType == 'keypoints':
+    compute_iou = coco_eval.computeOks
+  else:
+    compute_iou = coco_eval.computeIoU
+  coco_eval.ious = {(img_id, cat_id): compute_iou(img_id, cat_id)
+                    for img_id in p.imgIds
+                    for cat_id in cat_ids}
+  max_det = p.maxDets[-1]
+  return [coco_eval.evaluateImg(img_id, cat_id, area_rng, max_det)
+          for cat_id in cat_ids
+          for area_rng in p.areaRng
+          for img_id in p.imgIds]
+
+
+def _to_plain_coco(coco_api: coco.COCO) -> coco.COCO:
+  """Returns a plain `COCO` object sharing the indexes of `coco_api`.
+
+  `coco_api` can be of a subclass such as `COCOWrapper`, which the workers would
+  otherwise have to import to unpickle it.
+  """
+  plain_coco_api = coco.COCO.__new__(coco.COCO)
+  plain_coco_api.__dict__.update(vars(coco_api))
+  return plain_coco_api
+
+
+def _to_worker_coco_eval(coco_eval: cocoeval.COCOeval) -> cocoeval.COCOeval:
+  """Returns a copy of `coco_eval` to send to the workers."""
+  worker_coco_eval = copy.copy(coco_eval)
+  worker_coco_eval.cocoGt = _to_plain_coco(coco_eval.cocoGt)
+  worker_coco_eval.cocoDt = _to_plain_coco(coco_eval.cocoDt)
+  return worker_coco_eval
+
+
+def _init_worker(coco_evals: List[cocoeval.COCOeval]) -> None:
+  """Sets the `COCOeval` objects evaluated by a worker process."""
+  global _COCO_EVALS
+  _COCO_EVALS = coco_evals
+
+
+def _evaluate_shard(index: int, img_ids: List[int]) -> List[Dict[str, Any]]:
+  """Evaluates the images `img_ids` of the `index`-th `COCOeval` object."""
+  coco_eval = copy.copy(_COCO_EVALS[index])
+  coco_eval.params = copy.deepcopy(coco_eval.params)
+  coco_eval.params.imgIds = img_ids
+  return _evaluate_images(coco_eval)
+
+
+def _merge_shards(coco_eval: cocoeval.COCOeval,
+                  shards: Sequence[List[int]],
+                  shard_eval_imgs: Sequence[List[Dict[str, Any]]]):
+  """Merges the per-shard results into the `COCOeval.evalImgs` layout."""
+  p = coco_eval.params
+  num_cats = len(p.catIds) if p.useCats else 1
+  num_area_rngs = len(p.areaRng)
+  eval_imgs = []
+  for k in range(num_cats * num_area_rngs):
+    for img_ids, results in zip(shards, shard_eval_imgs):
+      num_imgs = len(img_ids)
+      eval_imgs.extend(results[k * num_imgs:(k + 1) * num_imgs])
+  return eval_imgs
+
+
+def evaluate(coco_evals: Sequence[cocoeval.COCOeval],
+             num_workers: int,
+             num_shards_per_worker: int = 4) -> None:
+  """Runs `COCOeval.evaluate` for `coco_evals` in a process pool.
+
+  The images of every `COCOeval` object are split into contiguous shards and
+  all the shards of all the objects are evaluated concurrently. On return each
+  object is in the same state as after `COCOeval.evaluate()`, except that
+  `ious` is not populated, and `accumulate()` can be called directly.
+
+  Args:
+    coco_evals: a sequence of `COCOeval` objects to evaluate.
+    num_workers: the number of worker processes.
+    num_shards_per_worker: the number of image shards per worker and per
+      `COCOeval` object. More shards balance the load better at the cost of
+      more per-shard overhead.
+  """
+  for coco_eval in coco_evals:
+    _normalize_params(coco_eval)
+
+  if num_workers <= 1:
+    for coco_eval in coco_evals:
+      coco_eval.evalImgs = _evaluate_images(coco_eval)
+      coco_eval._paramsEval = copy.deepcopy(coco_eval.params)  # pylint: disable=protected-access
+    return
+
+  all_shards = []
+  tasks = []
+  for index, coco_eval in enumerate(coco_evals):
+    img_ids = coco_eval.params.imgIds
+    num_shards = max(min(num_workers * num_shards_per_worker, len(img_ids)), 1)
+    shards = [
+        list(shard) for shard in np.array_split(np.asarray(img_ids), num_shards)
+    ]
+    all_shards.append(shards)
+    tasks.extend((index, shard) for shard in shards)
+
+  logging.info('Evaluating %d COCO shards with %d workers.', len(tasks),
+               num_workers)
+  # TensorFlow is not fork-safe, so the workers are spawned.
+  with multiprocessing.get_context('spawn').Pool(
+      num_workers,
+      initializer=_init_worker,
+      initargs=([_to_worker_coco_eval(e) for e in coco_evals],)) as pool:
+    results = pool.starmap(_evaluate_shard, tasks)
+
+  offset = 0
+  for coco_eval, shards in zip(coco_evals, all_shards):
+    coco_eval.evalImgs = _merge_shards(
+        coco_eval, shards, results[offset:offset + len(shards)])
+    coco_eval._paramsEval = copy.deepcopy(coco_eval.params)  # pylint: disable=protected-access
+    offset += len(shards)
@@ -0,0 +1,110 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for parallel_cocoeval."""
+
+from absl.testing import parameterized
+import numpy as np
+from pycocotools import cocoeval
+from pycocotools import mask as mask_api
+import tensorflow as tf, tf_keras
+
+from official.vision.evaluation import coco_utils
+from official.vision.evaluation import parallel_cocoeval
+
+
+def _random_boxes(rng, num_boxes, image_size):
+  xy = rng.uniform(0, image_size / 2, [num_boxes, 2])
+  wh = rng.uniform(2, image_size / 2, [num_boxes, 2])
+  return np.concatenate([xy, wh], axis=-1)
+
+
+def _box_to_rle(box, image_size):
+  mask = np.zeros([image_size, image_size], dtype=np.uint8)
+  x, y, w, h = box.astype(int)
+  mask[y:y + h + 1, x:x + w + 1] = 1
+  return mask_api.encode(np.asfortranarray(mask))
+
+
+def _create_coco_apis(eval_type, num_images=20, image_size=64):
+  rng = np.random.RandomState(0)
+  images = [{'id': i, 'height': image_size, 'width': image_size}
+            for i in range(1, num_images + 1)]
+  gt_annotations = []
+  detections = {'image_id': [], 'category_id': [], 'bbox': [], 'score': [],
+                'segmentation': []}
+  for image in images:
+    gt_boxes = _random_boxes(rng, 4, image_size)
+    gt_classes = rng.randint(1, 4, [4])
+    for box, category_id in zip(gt_boxes, gt_classes):
+      ann = {'id': len(gt_annotations) + 1, 'image_id': image['id'],
+             'category_id': int(category_id), 'bbox': box.tolist(),
+             'area': float(box[2] * box[3]), 'iscrowd': 0}
+      if eval_type == 'mask':
+        ann['segmentation'] = _box_to_rle(box, image_size)
+      gt_annotations.append(ann)
+    dt_boxes = np.concatenate(
+        [gt_boxes + rng.normal(0, 2, gt_boxes.shape),
+         _random_boxes(rng, 6, image_size)])
+    dt_boxes[:, 2:] = np.maximum(dt_boxes[:, 2:], 1)
+    detections['image_id'].append(np.full([10], image['id']))
+    detections['category_id'].append(
+        np.concatenate([gt_classes, rng.randint(1, 4, [6])]))
+    detections['bbox'].append(dt_boxes)
+    detections['score'].append(rng.random_sample([10]))
+    detections['segmentation'].extend(
+        [_box_to_rle(box, image_size) for box in dt_boxes])
+  for key in ['image_id', 'category_id', 'bbox', 'score']:
+    detections[key] = np.concatenate(detections[key])
+  coco_gt = coco_utils.COCOWrapper(
+      eval_type=eval_type,
+      gt_dataset={
+          'images': images,
+          'categories': [{'id': i} for i in range(1, 4)],
+          'annotations': gt_annotations,
+      })
+  return coco_gt, coco_gt.loadResFromArrays(detections)
+
+
+class ParallelCocoevalTest(tf.test.TestCase, parameterized.TestCase):
+
+  @parameterized.parameters(
+      ('box', ['bbox'], 2),
+      ('mask', ['bbox', 'segm'], 3),
+      ('mask', ['bbox', 'segm'], 1),
+  )
+  def test_evaluate_matches_cocoeval(self, eval_type, iou_types, num_workers):
+    coco_gt, coco_dt = _create_coco_apis(eval_type)
+
+    expected_stats = []
+    for iou_type in iou_types:
+      coco_eval = cocoeval.COCOeval(coco_gt, coco_dt, iouType=iou_type)
+      coco_eval.evaluate()
+      coco_eval.accumulate()
+      coco_eval.summarize()
+      expected_stats.append(coco_eval.stats)
+
+    coco_evals = [
+        cocoeval.COCOeval(coco_gt, coco_dt, iouType=iou_type)
+        for iou_type in iou_types
+    ]
+    parallel_cocoeval.evaluate(coco_evals, num_workers=num_workers)
+    for coco_eval, stats in zip(coco_evals, expected_stats):
+      coco_eval.accumulate()
+      coco_eval.summarize()
+      self.assertAllEqual(coco_eval.stats, stats)
+
+
+if __name__ == '__main__':
+  tf.test.main()
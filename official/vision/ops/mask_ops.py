@@ -25,6 +25,28 @@ import tensorflow as tf, tf_keras
 from official.vision.ops import spatial_transform_ops
 
 
+def _expand_boxes(boxes: np.ndarray, scale: float) -> np.ndarray:
+  """Expands an array of boxes by a given scale."""
+  # Reference: https://github.com/facebookresearch/Detectron/blob/master/detectron/utils/boxes.py#L227  # pylint: disable=line-too-long
+  # The `boxes` in the reference implementation is in [x1, y1, x2, y2] form,
+  # whereas `boxes` here is in [x1, y1, w, h] form
+  w_half = boxes[:, 2] * 0.5
+  h_half = boxes[:, 3] * 0.5
+  x_c = boxes[:, 0] + w_half
+  y_c = boxes[:, 1] + h_half
+
+  w_half *= scale
+  h_half *= scale
+
+  boxes_exp = np.zeros(boxes.shape)
+  boxes_exp[:, 0] = x_c - w_half
+  boxes_exp[:, 2] = x_c + w_half
+  boxes_exp[:, 1] = y_c - h_half
+  boxes_exp[:, 3] = y_c + h_half
+
+  return boxes_exp
+
+
 def paste_instance_masks(masks: np.ndarray, detected_boxes: np.ndarray,
                          image_height: int, image_width: int) -> np.ndarray:
   """Paste instance masks to generate the image segmentation results.
@@ -42,27 +64,6 @@ def paste_instance_masks(masks: np.ndarray, detected_boxes: np.ndarray,
       the instance masks *pasted* on the image canvas.
   """
 
-  def expand_boxes(boxes: np.ndarray, scale: float) -> np.ndarray:
-    """Expands an array of boxes by a given scale."""
-    # Reference: https://github.com/facebookresearch/Detectron/blob/master/detectron/utils/boxes.py#L227  # pylint: disable=line-too-long
-    # The `boxes` in the reference implementation is in [x1, y1, x2, y2] form,
-    # whereas `boxes` here is in [x1, y1, w, h] form
-    w_half = boxes[:, 2] * 0.5
-    h_half = boxes[:, 3] * 0.5
-    x_c = boxes[:, 0] + w_half
-    y_c = boxes[:, 1] + h_half
-
-    w_half *= scale
-    h_half *= scale
-
-    boxes_exp = np.zeros(boxes.shape)
-    boxes_exp[:, 0] = x_c - w_half
-    boxes_exp[:, 2] = x_c + w_half
-    boxes_exp[:, 1] = y_c - h_half
-    boxes_exp[:, 3] = y_c + h_half
-
-    return boxes_exp
-
   # Reference: https://github.com/facebookresearch/Detectron/blob/master/detectron/core/test.py#L812  # pylint: disable=line-too-long
   # To work around an issue with cv2.resize (it seems to automatically pad
   # with repeated border values), we manually zero-pad the masks by 1 pixel
@@ -73,7 +74,7 @@ def paste_instance_masks(masks: np.ndarray, detected_boxes: np.ndarray,
   scale = max((mask_width + 2.0) / mask_width,
               (mask_height + 2.0) / mask_height)
 
-  ref_boxes = expand_boxes(detected_boxes, scale)
+  ref_boxes = _expand_boxes(detected_boxes, scale)
   ref_boxes = ref_boxes.astype(np.int32)
   padded_mask = np.zeros((mask_height + 2, mask_width + 2), dtype=np.float32)
   segms = []
@@ -107,6 +108,107 @@ def paste_instance_masks(masks: np.ndarray, detected_boxes: np.ndarray,
   return segms
 
 
+def paste_instance_masks_to_crops(
+    masks: np.ndarray, detected_boxes: np.ndarray, image_height: int,
+    image_width: int) -> Tuple[List[np.ndarray], np.ndarray]:
+  """Pastes instance masks into crop-local canvases.
+
+  This produces the same masks as `paste_instance_masks`, but each instance
+  mask is returned as the crop of the image canvas covered by its (clipped)
+  reference box together with the offset of the crop, so that no full
+  `image_height x image_width` canvas is allocated per instance.
+
+  Args:
+    masks: a numpy array of shape [N, mask_height, mask_width] representing the
+      instance masks w.r.t. the `detected_boxes`.
+    detected_boxes: a numpy array of shape [N, 4] representing the reference
+      bounding boxes in [x, y, w, h] form.
+    image_height: an integer representing the height of the image.
+    image_width: an integer representing the width of the image.
+
+  Returns:
+    crops: a list of N uint8 numpy arrays of shape [crop_height, crop_width]
+      representing the binary instance masks within their crops.
+    offsets: an int32 numpy array of shape [N, 2] representing the [y, x]
+      offset of each crop in the image canvas.
+  """
+  _, mask_height, mask_width = masks.shape
+  scale = max((mask_width + 2.0) / mask_width,
+              (mask_height + 2.0) / mask_height)
+
+  # The box arithmetic and clipping are done for all the instances at once, see
+  # `paste_instance_masks` for the reference implementation.
+  ref_boxes = _expand_boxes(detected_boxes, scale).astype(np.int32)
+  widths = np.maximum(ref_boxes[:, 2] - ref_boxes[:, 0] + 1, 1)
+  heights = np.maximum(ref_boxes[:, 3] - ref_boxes[:, 1] + 1, 1)
+  x0 = np.clip(ref_boxes[:, 0], 0, image_width)
+  x1 = np.clip(ref_boxes[:, 2] + 1, 0, image_width)
+  y0 = np.clip(ref_boxes[:, 1], 0, image_height)
+  y1 = np.clip(ref_boxes[:, 3] + 1, 0, image_height)
+  x1 = np.maximum(x1, x0)
+  y1 = np.maximum(y1, y0)
+
+  padded_mask = np.zeros((mask_height + 2, mask_width + 2), dtype=np.float32)
+  crops = []
+  for mask_ind, mask in enumerate(masks):
+    padded_mask[1:-1, 1:-1] = mask[:, :]
+    mask = cv2.resize(padded_mask, (widths[mask_ind], heights[mask_ind]))
+    crop_y = y0[mask_ind] - ref_boxes[mask_ind, 1]
+    crop_x = x0[mask_ind] - ref_boxes[mask_ind, 0]
+    crop = mask[crop_y:crop_y + y1[mask_ind] - y0[mask_ind],
+                crop_x:crop_x + x1[mask_ind] - x0[mask_ind]]
+    crops.append(np.array(crop > 0.5, dtype=np.uint8))
+
+  offsets = np.stack([y0, x0], axis=-1).astype(np.int32)
+  return crops, offsets
+
+
+def crop_masks_to_rle_counts(crops: List[np.ndarray], offsets: np.ndarray,
+                             image_height: int,
+                             image_width: int) -> List[np.ndarray]:
+  """Computes the uncompressed COCO RLE counts of crop-local binary masks.
+
+  The counts are those of the masks pasted on the full image canvas, in the
+  column-major order used by COCO, i.e. the same as `pycocotools.mask.encode`
+  would produce on the full canvas, without materializing it.
+
+  Args:
+    crops: a list of N binary numpy arrays of shape [crop_height, crop_width],
+      e.g. from `paste_instance_masks_to_crops`.
+    offsets: a numpy array of shape [N, 2] representing the [y, x] offset of
+      each crop in the image canvas.
+    image_height: an integer representing the height of the image.
+    image_width: an integer representing the width of the image.
+
+  Returns:
+    counts: a list of N int64 numpy arrays with the alternating lengths of the
+      runs of zeros and ones, starting with zeros.
+  """
+  counts = []
+  for crop, (y, x) in zip(crops, offsets):
+    crop_height, crop_width = crop.shape
+    if not np.any(crop):
+      counts.append(np.array([image_height * image_width], dtype=np.int64))
+      continue
+    # Only the columns covered by the crop are laid out at full height.
+    columns = np.zeros((image_height, crop_width), dtype=np.uint8)
+    columns[y:y + crop_height, :] = crop
+    values = columns.ravel(order='F')
+    changes = np.flatnonzero(values[1:] != values[:-1]) + 1
+    runs = np.diff(np.concatenate([[0], changes, [values.size]]))
+    if values[0]:
+      runs = np.concatenate([[0], runs])
+    runs[0] += x * image_height
+    trailing_zeros = (image_width - x - crop_width) * image_height
+    if values[-1]:
+      if trailing_zeros:
+        runs = np.concatenate([runs, [trailing_zeros]])
+    else:
+      runs[-1] += trailing_zeros
+    counts.append(runs.astype(np.int64))
+  return counts
+
+
 def paste_instance_masks_v2(masks: np.ndarray, detected_boxes: np.ndarray,
                             image_height: int, image_width: int) -> np.ndarray:
   """Paste instance masks to generate the image segmentation (v2).
@@ -49,6 +49,46 @@ class MaskUtilsTest(tf.test.TestCase):
         np.array(masks > 0.5, dtype=np.uint8),
         1e-5)
 
+  def testPasteInstanceMasksToCrops(self):
+    image_height = 20
+    image_width = 30
+    masks = np.random.uniform(size=(4, 7, 7)).astype(np.float32)
+    detected_boxes = np.array([
+        [2.0, 3.0, 10.0, 8.0],
+        [-5.0, -4.0, 12.0, 9.0],
+        [22.0, 15.0, 15.0, 10.0],
+        [40.0, 30.0, 5.0, 5.0],
+    ])
+
+    image_masks = mask_ops.paste_instance_masks(
+        masks, detected_boxes, image_height, image_width)
+    crops, offsets = mask_ops.paste_instance_masks_to_crops(
+        masks, detected_boxes, image_height, image_width)
+
+    self.assertLen(crops, 4)
+    for image_mask, crop, (y, x) in zip(image_masks, crops, offsets):
+      pasted_crop = np.zeros((image_height, image_width), dtype=np.uint8)
+      pasted_crop[y:y + crop.shape[0], x:x + crop.shape[1]] = crop
+      self.assertAllEqual(pasted_crop, image_mask)
+
+  def testCropMasksToRleCounts(self):
+    image_height = 5
+    image_width = 4
+    crops = [
+        np.array([[1, 0], [1, 1]], dtype=np.uint8),
+        np.array([[1, 1], [1, 1]], dtype=np.uint8),
+        np.zeros((2, 2), dtype=np.uint8),
+    ]
+    offsets = np.array([[1, 1], [3, 2], [0, 0]])
+
+    counts = mask_ops.crop_masks_to_rle_counts(
+        crops, offsets, image_height, image_width)
+
+    # Column-major runs of zeros and ones over the full 5x4 canvas.
+    self.assertAllEqual(counts[0], [6, 2, 4, 1, 7])
+    self.assertAllEqual(counts[1], [13, 2, 3, 2])
+    self.assertAllEqual(counts[2], [20])
+
   def testInstanceMasksOverlap(self):
     boxes = tf.constant([[[0, 0, 4, 4], [1, 1, 5, 5]]])
     masks = tf.constant([[
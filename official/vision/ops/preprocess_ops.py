@@ -14,6 +14,7 @@
 
 """Preprocessing ops."""
 
+import functools
 import math
 from typing import Optional, Sequence, Tuple, Union
 
@@ -32,6 +33,9 @@ MEAN_RGB = tuple(255 * i for i in MEAN_NORM)
 STDDEV_RGB = tuple(255 * i for i in STDDEV_NORM)
 MEDIAN_RGB = (128.0, 128.0, 128.0)
 
+# The scaling ratios supported by JPEG decoding in the DCT domain.
+_JPEG_DCT_SCALING_RATIOS = (1, 2, 4, 8)
+
 # Alias for convenience. PLEASE use `box_ops.horizontal_flip_boxes` directly.
 horizontal_flip_boxes = box_ops.horizontal_flip_boxes
 vertical_flip_boxes = box_ops.vertical_flip_boxes
@@ -182,7 +186,9 @@ def resize_and_crop_image(
   2. Pad the rescaled image to the padded_size.
 
   Args:
-    image: a `Tensor` of shape [height, width, 3] representing an image.
+    image: a `Tensor` of shape [height, width, 3] representing an image, or of
+      shape [batch_size, height, width, 3] representing a batch of images of
+      the same size, which are all resized and cropped in the same way.
     desired_size: a `Tensor` or `int` list/tuple of two elements representing
       [height, width] of the desired actual output image size.
     padded_size: a `Tensor` or `int` list/tuple of two elements representing
@@ -201,8 +207,9 @@ def resize_and_crop_image(
       behaviour is to place it at left top corner.
 
   Returns:
-    output_image: `Tensor` of shape [height, width, 3] where [height, width]
-      equals to `output_size`.
+    output_image: `Tensor` of shape [height, width, 3], or [batch_size, height,
+      width, 3] for a batch of images, where [height, width] equals to
+      `output_size`.
     image_info: a 2D `Tensor` that encodes the information of the image and the
       applied preprocessing. It is in the format of
       [[original_height, original_width], [desired_height, desired_width],
@@ -212,77 +219,31 @@ def resize_and_crop_image(
       scaled dimension / original dimension.
   """
   with tf.name_scope('resize_and_crop_image'):
-    image_size = tf.cast(tf.shape(image)[0:2], tf.float32)
-
-    random_jittering = (
-        isinstance(aug_scale_min, tf.Tensor)
-        or isinstance(aug_scale_max, tf.Tensor)
-        or not math.isclose(aug_scale_min, 1.0)
-        or not math.isclose(aug_scale_max, 1.0)
+    image_size = tf.cast(tf.shape(image)[-3:-1], tf.float32)
+    scaled_size, image_scale, offset, random_jittering = (
+        _compute_resize_and_crop_params(
+            image_size,
+            desired_size,
+            aug_scale_min=aug_scale_min,
+            aug_scale_max=aug_scale_max,
+            seed=seed,
+            keep_aspect_ratio=keep_aspect_ratio,
+        )
     )
 
-    if random_jittering:
-      random_scale = tf.random.uniform(
-          [], aug_scale_min, aug_scale_max, seed=seed
-      )
-      scaled_size = tf.round(random_scale * tf.cast(desired_size, tf.float32))
-    else:
-      scaled_size = tf.cast(desired_size, tf.float32)
-
-    if keep_aspect_ratio:
-      scale = tf.minimum(
-          scaled_size[0] / image_size[0], scaled_size[1] / image_size[1]
-      )
-      scaled_size = tf.round(image_size * scale)
-
-    # Computes 2D image_scale.
-    image_scale = scaled_size / image_size
-
-    # Selects non-zero random offset (x, y) if scaled image is larger than
-    # desired_size.
-    if random_jittering:
-      max_offset = scaled_size - tf.cast(desired_size, tf.float32)
-      max_offset = tf.where(
-          tf.less(max_offset, 0), tf.zeros_like(max_offset), max_offset
-      )
-      offset = max_offset * tf.random.uniform(
-          [
-              2,
-          ],
-          0,
-          1,
-          seed=seed,
-      )
-      offset = tf.cast(offset, tf.int32)
-    else:
-      offset = tf.zeros((2,), tf.int32)
-
     scaled_image = tf.image.resize(
         image, tf.cast(scaled_size, tf.int32), method=method
     )
 
     if random_jittering:
       scaled_image = scaled_image[
+          ...,
           offset[0] : offset[0] + desired_size[0],
           offset[1] : offset[1] + desired_size[1],
           :,
       ]
 
-    output_image = scaled_image
-    if padded_size is not None:
-      if centered_crop:
-        scaled_image_size = tf.cast(tf.shape(scaled_image)[0:2], tf.int32)
-        output_image = tf.image.pad_to_bounding_box(
-            scaled_image,
-            tf.maximum((padded_size[0] - scaled_image_size[0]) // 2, 0),
-            tf.maximum((padded_size[1] - scaled_image_size[1]) // 2, 0),
-            padded_size[0],
-            padded_size[1],
-        )
-      else:
-        output_image = tf.image.pad_to_bounding_box(
-            scaled_image, 0, 0, padded_size[0], padded_size[1]
-        )
+    output_image = pad_scaled_image(scaled_image, padded_size, centered_crop)
 
     image_info = tf.stack([
         image_size,
@@ -293,6 +254,292 @@ def resize_and_crop_image(
     return output_image, image_info
 
 
+def _compute_resize_and_crop_params(
+    image_size,
+    desired_size,
+    aug_scale_min=1.0,
+    aug_scale_max=1.0,
+    seed=1,
+    keep_aspect_ratio=True,
+):
+  """Computes the scale and crop offset of `resize_and_crop_image`.
+
+  Args:
+    image_size: a float `Tensor` of [height, width] of the original image.
+    desired_size: a `Tensor` or `int` list/tuple of two elements representing
+      [height, width] of the desired actual output image size.
+    aug_scale_min: a `float` with range between [0, 1.0] representing minimum
+      random scale applied to desired_size for training scale jittering.
+    aug_scale_max: a `float` with range between [1.0, inf] representing maximum
+      random scale applied to desired_size for training scale jittering.
+    seed: seed for random scale jittering.
+    keep_aspect_ratio: whether or not to keep the aspect ratio when resizing.
+
+  Returns:
+    scaled_size: a float `Tensor` of [height, width] of the scaled image.
+    image_scale: a float `Tensor` of the [y_scale, x_scale] scaling factors.
+    offset: an int32 `Tensor` of the [y, x] offset of the crop in the scaled
+      image.
+    random_jittering: a `bool` of whether random scale jittering is applied,
+      in which case the scaled image is cropped to `desired_size`.
+  """
+  random_jittering = (
+      isinstance(aug_scale_min, tf.Tensor)
+      or isinstance(aug_scale_max, tf.Tensor)
+      or not math.isclose(aug_scale_min, 1.0)
+      or not math.isclose(aug_scale_max, 1.0)
+  )
+
+  if random_jittering:
+    random_scale = tf.random.uniform(
+        [], aug_scale_min, aug_scale_max, seed=seed
+    )
+    scaled_size = tf.round(random_scale * tf.cast(desired_size, tf.float32))
+  else:
+    scaled_size = tf.cast(desired_size, tf.float32)
+
+  if keep_aspect_ratio:
+    scale = tf.minimum(
+        scaled_size[0] / image_size[0], scaled_size[1] / image_size[1]
+    )
+    scaled_size = tf.round(image_size * scale)
+
+  # Computes 2D image_scale.
+  image_scale = scaled_size / image_size
+
+  # Selects non-zero random offset (x, y) if scaled image is larger than
+  # desired_size.
+  if random_jittering:
+    max_offset = scaled_size - tf.cast(desired_size, tf.float32)
+    max_offset = tf.where(
+        tf.less(max_offset, 0), tf.zeros_like(max_offset), max_offset
+    )
+    offset = max_offset * tf.random.uniform(
+        [
+            2,
+        ],
+        0,
+        1,
+        seed=seed,
+    )
+    offset = tf.cast(offset, tf.int32)
+  else:
+    offset = tf.zeros((2,), tf.int32)
+  return scaled_size, image_scale, offset, random_jittering
+
+
+def pad_scaled_image(scaled_image, padded_size, centered_crop=False):
+  """Pads a scaled image with zeros as in `resize_and_crop_image`.
+
+  Args:
+    scaled_image: a `Tensor` of shape [height, width, channels] or
+      [batch_size, height, width, channels].
+    padded_size: a `Tensor` or `int` list/tuple of two elements representing
+      [height, width] of the padded output image size. Can be None to disable
+      padding.
+    centered_crop: If `centered_crop` is set to True, then the image is placed
+      in the center of the padded image. Default behaviour is to place it at
+      left top corner.
+
+  Returns:
+    The padded image, or `scaled_image` if `padded_size` is None.
+  """
+  if padded_size is None:
+    return scaled_image
+  if centered_crop:
+    scaled_image_size = tf.cast(tf.shape(scaled_image)[-3:-1], tf.int32)
+    return tf.image.pad_to_bounding_box(
+        scaled_image,
+        tf.maximum((padded_size[0] - scaled_image_size[0]) // 2, 0),
+        tf.maximum((padded_size[1] - scaled_image_size[1]) // 2, 0),
+        padded_size[0],
+        padded_size[1],
+    )
+  return tf.image.pad_to_bounding_box(
+      scaled_image, 0, 0, padded_size[0], padded_size[1]
+  )
+
+
+def _decode_jpeg_and_resize_and_crop_image(
+    image_bytes,
+    desired_size,
+    padded_size,
+    aug_scale_min,
+    aug_scale_max,
+    seed,
+    keep_aspect_ratio,
+    centered_crop,
+    use_jpeg_dct_scaling,
+):
+  """Implements `decode_and_resize_and_crop_image` for JPEG images."""
+  image_size = tf.cast(
+      tf.image.extract_jpeg_shape(image_bytes)[0:2], tf.float32
+  )
+  scaled_size, image_scale, offset, random_jittering = (
+      _compute_resize_and_crop_params(
+          image_size,
+          desired_size,
+          aug_scale_min=aug_scale_min,
+          aug_scale_max=aug_scale_max,
+          seed=seed,
+          keep_aspect_ratio=keep_aspect_ratio,
+      )
+  )
+
+  # The window [offset, offset + output_size) of the scaled image is kept.
+  crop_offset = tf.cast(offset, tf.float32)
+  if random_jittering:
+    output_size = tf.minimum(
+        tf.cast(desired_size, tf.float32), scaled_size - crop_offset
+    )
+  else:
+    output_size = scaled_size
+
+  def _decode_and_resize(ratio):
+    # libjpeg decodes the image at ceil(size / ratio). A decoded pixel covers
+    # `ratio` original pixels, so it is scaled by `image_scale * ratio`.
+    decoded_size = tf.math.ceil(image_size / ratio)
+    scale = image_scale * ratio
+    # Only decodes the pixels under the kept window, with a one pixel margin
+    # for the bilinear interpolation at its borders.
+    window_min = tf.maximum(tf.floor(crop_offset / scale) - 1.0, 0.0)
+    window_max = tf.minimum(
+        tf.math.ceil((crop_offset + output_size) / scale) + 1.0, decoded_size
+    )
+    crop_window = tf.cast(
+        tf.concat([window_min, window_max - window_min], axis=0), tf.int32
+    )
+    image = tf.image.decode_and_crop_jpeg(
+        image_bytes, crop_window, channels=3, ratio=ratio
+    )
+    # Resizes the decoded window as if the whole image was resized to
+    # `scaled_size` and then cropped at `offset`.
+    scaled_image = tf.raw_ops.ScaleAndTranslate(
+        images=tf.expand_dims(image, axis=0),
+        size=tf.cast(output_size, tf.int32),
+        scale=scale,
+        translation=window_min * scale - crop_offset,
+        kernel_type='triangle',
+        antialias=False,
+    )
+    return scaled_image[0]
+
+  if use_jpeg_dct_scaling:
+    # Uses the largest DCT scaling ratio that does not decode the image smaller
+    # than `scaled_size`.
+    max_ratio = 1.0 / tf.reduce_max(image_scale)
+    ratio_index = tf.reduce_sum(
+        tf.cast(
+            tf.constant(_JPEG_DCT_SCALING_RATIOS[1:], tf.float32) <= max_ratio,
+            tf.int32,
+        )
+    )
+    scaled_image = tf.switch_case(
+        ratio_index,
+        [
+            functools.partial(_decode_and_resize, ratio)
+            for ratio in _JPEG_DCT_SCALING_RATIOS
+        ],
+    )
+  else:
+    scaled_image = _decode_and_resize(1)
+  scaled_image.set_shape([None, None, 3])
+
+  output_image = pad_scaled_image(scaled_image, padded_size, centered_crop)
+
+  image_info = tf.stack([
+      image_size,
+      tf.cast(desired_size, dtype=tf.float32),
+      image_scale,
+      tf.cast(offset, tf.float32),
+  ])
+  return output_image, image_info
+
+
+def decode_and_resize_and_crop_image(
+    image_bytes,
+    desired_size,
+    padded_size,
+    aug_scale_min=1.0,
+    aug_scale_max=1.0,
+    seed=1,
+    keep_aspect_ratio=True,
+    centered_crop=False,
+    use_jpeg_dct_scaling=True,
+):
+  """Decodes an encoded image and resizes it to output size (RetinaNet style).
+
+  This is a faster version of `decode_image` followed by
+  `resize_and_crop_image` with bilinear resizing. For JPEG images, only the
+  window of the image that is kept after the random scale jittering and crop is
+  decoded with `decode_and_crop_jpeg`. If `use_jpeg_dct_scaling` is True, the
+  image is also decoded at the smallest of 1/1, 1/2, 1/4 or 1/8 of its size
+  that is still larger than the scaled image, which JPEG decoding does almost
+  for free in the DCT domain. Other image formats are fully decoded.
+
+  The returned `image_info` is relative to the original image, as for
+  `resize_and_crop_image`, so boxes and masks are adjusted in the same way.
+
+  Args:
+    image_bytes: a string `Tensor` of the encoded image.
+    desired_size: a `Tensor` or `int` list/tuple of two elements representing
+      [height, width] of the desired actual output image size.
+    padded_size: a `Tensor` or `int` list/tuple of two elements representing
+      [height, width] of the padded output image size. Padding will be applied
+      after scaling the image to the desired_size. Can be None to disable
+      padding.
+    aug_scale_min: a `float` with range between [0, 1.0] representing minimum
+      random scale applied to desired_size for training scale jittering.
+    aug_scale_max: a `float` with range between [1.0, inf] representing maximum
+      random scale applied to desired_size for training scale jittering.
+    seed: seed for random scale jittering.
+    keep_aspect_ratio: whether or not to keep the aspect ratio when resizing.
+    centered_crop: If `centered_crop` is set to True, then resized crop (if
+      smaller than padded size) is place in the center of the image. Default
+      behaviour is to place it at left top corner.
+    use_jpeg_dct_scaling: whether to decode JPEG images at a reduced size when
+      the scaled image is at least twice smaller than the original image.
+
+  Returns:
+    output_image: a float32 `Tensor` of shape [height, width, 3] with values in
+      [0, 255], where [height, width] equals to `padded_size`, or to the scaled
+      and cropped image size if `padded_size` is None.
+    image_info: a 2D `Tensor` that encodes the information of the image and the
+      applied preprocessing, in the same format as `resize_and_crop_image`.
+  """
+  with tf.name_scope('decode_and_resize_and_crop_image'):
+    def _decode_and_resize_and_crop():
+      image = tf.io.decode_image(
+          image_bytes, channels=3, expand_animations=False
+      )
+      return resize_and_crop_image(
+          image,
+          desired_size,
+          padded_size,
+          aug_scale_min=aug_scale_min,
+          aug_scale_max=aug_scale_max,
+          seed=seed,
+          keep_aspect_ratio=keep_aspect_ratio,
+          centered_crop=centered_crop,
+      )
+
+    return tf.cond(
+        tf.io.is_jpeg(image_bytes),
+        lambda: _decode_jpeg_and_resize_and_crop_image(  # pylint: disable=g-long-lambda
+            image_bytes,
+            desired_size,
+            padded_size,
+            aug_scale_min=aug_scale_min,
+            aug_scale_max=aug_scale_max,
+            seed=seed,
+            keep_aspect_ratio=keep_aspect_ratio,
+            centered_crop=centered_crop,
+            use_jpeg_dct_scaling=use_jpeg_dct_scaling,
+        ),
+        _decode_and_resize_and_crop,
+    )
+
+
 def resize_and_crop_image_v2(
     image,
     short_side,
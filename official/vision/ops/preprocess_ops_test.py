@@ -206,6 +206,30 @@ class InputUtilsTest(parameterized.TestCase, tf.test.TestCase):
           1e-5,
       )
 
+  @parameterized.parameters((False,), (True,))
+  def test_resize_and_crop_image_batch(self, keep_aspect_ratio):
+    images = tf.convert_to_tensor(np.random.rand(3, 100, 200, 3), tf.float32)
+
+    resized_images, image_info = preprocess_ops.resize_and_crop_image(
+        images,
+        desired_size=(160, 160),
+        padded_size=(192, 192),
+        keep_aspect_ratio=keep_aspect_ratio,
+    )
+
+    self.assertAllEqual([3, 192, 192, 3], resized_images.shape)
+    for i in range(3):
+      expected_image, expected_image_info = (
+          preprocess_ops.resize_and_crop_image(
+              images[i],
+              desired_size=(160, 160),
+              padded_size=(192, 192),
+              keep_aspect_ratio=keep_aspect_ratio,
+          )
+      )
+      self.assertAllClose(expected_image, resized_images[i])
+      self.assertAllClose(expected_image_info, image_info)
+
   @parameterized.parameters(
       (100, 200, 100, 300, 32, 1.0, 1.0, 100, 200, 128, 320),
       (200, 100, 100, 300, 32, 1.0, 1.0, 200, 100, 320, 128),
@@ -308,6 +332,64 @@ class InputUtilsTest(parameterized.TestCase, tf.test.TestCase):
         image_bytes, tf.constant([input_height, input_width, 3], tf.int32)
     )
 
+  @parameterized.parameters(
+      ('JPEG', False, 1.0),
+      ('JPEG', True, 4.0),
+      ('PNG', True, 0.0),
+  )
+  def test_decode_and_resize_and_crop_image(
+      self, fmt, use_jpeg_dct_scaling, tolerance
+  ):
+    # A smooth image, so that JPEG decoding at a reduced size is close to
+    # resizing the fully decoded image.
+    y, x = np.meshgrid(np.arange(480), np.arange(640), indexing='ij')
+    image_array = np.uint8(
+        np.stack([y * 255 / 479, x * 255 / 639, (x + y) * 255 / 1118], -1)
+    )
+    image_bytes = tf.constant(_encode_image(image_array, fmt=fmt))
+    desired_size = (120, 160)
+    padded_size = (128, 192)
+
+    image, image_info = preprocess_ops.decode_and_resize_and_crop_image(
+        image_bytes,
+        desired_size,
+        padded_size,
+        use_jpeg_dct_scaling=use_jpeg_dct_scaling,
+    )
+    expected_image, expected_image_info = preprocess_ops.resize_and_crop_image(
+        tf.io.decode_image(image_bytes, channels=3), desired_size, padded_size
+    )
+
+    self.assertAllEqual([128, 192, 3], image.shape)
+    self.assertAllClose(expected_image_info, image_info)
+    self.assertAllClose(expected_image, image, atol=tolerance)
+
+  @parameterized.parameters((480, 640), (640, 480))
+  def test_decode_and_resize_and_crop_image_with_jittering(
+      self, input_height, input_width
+  ):
+    image_bytes = tf.constant(
+        _encode_image(
+            np.uint8(np.random.rand(input_height, input_width, 3) * 255),
+            fmt='JPEG',
+        )
+    )
+    image, image_info = preprocess_ops.decode_and_resize_and_crop_image(
+        image_bytes,
+        (128, 128),
+        (128, 128),
+        aug_scale_min=0.5,
+        aug_scale_max=2.0,
+    )
+
+    self.assertAllEqual([128, 128, 3], image.shape)
+    self.assertAllEqual([input_height, input_width], image_info[0])
+    self.assertAllEqual([128, 128], image_info[1])
+    scaled_size = image_info[0] * image_info[2]
+    self.assertAllInRange(
+        image_info[3], 0, np.maximum(np.max(scaled_size - 128), 0)
+    )
+
   @parameterized.parameters((400, 600, 0), (400, 600, 0.4), (600, 400, 1.4))
   def testColorJitter(self, input_height, input_width, color_jitter):
     image = tf.convert_to_tensor(np.random.rand(input_height, input_width, 3))
@@ -0,0 +1,137 @@
+# Copyright 2024 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r"""Serving latency benchmark of an exported vision SavedModel.
+
+Loads a SavedModel exported with `export_saved_model` and an `image_tensor`
+input, and calls its serving signature on random uint8 images, e.g.:
+
+```
+python3 -m official.vision.serving.benchmark_saved_model \
+  --saved_model_dir=${EXPORT_DIR_PATH}/saved_model \
+  --batch_size=8 \
+  --input_image_size=480,640 \
+  --num_runs=200
+```
+
+The first `num_warmup_runs` calls, which include tracing and initializing the
+model, are excluded from the reported latencies and throughput.
+"""
+
+import os
+import time
+from typing import Dict, Sequence
+
+from absl import app
+from absl import flags
+from absl import logging
+import numpy as np
+import tensorflow as tf, tf_keras
+
+_SAVED_MODEL_DIR = flags.DEFINE_string(
+    'saved_model_dir', None, 'The directory of the SavedModel to benchmark.')
+_SIGNATURE = flags.DEFINE_string(
+    'signature', 'serving_default', 'The serving signature to call.')
+_BATCH_SIZE = flags.DEFINE_integer(
+    'batch_size', 1, 'The number of images per request.')
+_INPUT_IMAGE_SIZE = flags.DEFINE_string(
+    'input_image_size', '640,640',
+    'The comma-separated string of two integers representing the height,width '
+    'of the images fed to the model.')
+_NUM_WARMUP_RUNS = flags.DEFINE_integer(
+    'num_warmup_runs', 10, 'The number of requests to run before measuring.')
+_NUM_RUNS = flags.DEFINE_integer(
+    'num_runs', 100, 'The number of requests to measure.')
+
+
+def _cpu_seconds() -> float:
+  """Returns the user and system CPU seconds used by this process."""
+  times = os.times()
+  return times.user + times.system
+
+
+def run_serving_benchmark(
+    serving_fn,
+    batch_size: int,
+    image_size: Sequence[int],
+    num_runs: int,
+    num_warmup_runs: int = 10) -> Dict[str, float]:
+  """Measures the latency of `serving_fn` on random uint8 images.
+
+  Args:
+    serving_fn: A serving signature taking a uint8 tensor of shape
+      [batch_size, height, width, 3].
+    batch_size: The number of images per request.
+    image_size: The [height, width] of the images.
+    num_runs: The number of requests to measure.
+    num_warmup_runs: The number of requests to run before measuring.
+
+  Returns:
+    A dictionary with the number of measured requests, the p50/p90/p99
+    request latencies in milliseconds, the throughput in images per second and
+    the CPU seconds used by this process per request.
+
+  Raises:
+    ValueError: If `num_runs` is not positive.
+  """
+  if num_runs <= 0:
+    raise ValueError(f'`num_runs` must be positive, got {num_runs}.')
+  images = tf.constant(
+      np.random.randint(
+          0, 256, size=[batch_size, *image_size, 3], dtype=np.uint8))
+
+  for _ in range(num_warmup_runs):
+    tf.nest.map_structure(lambda x: x.numpy(), serving_fn(images))
+
+  latencies = []
+  start_cpu = _cpu_seconds()
+  start = time.perf_counter()
+  for _ in range(num_runs):
+    run_start = time.perf_counter()
+    # Fetches the outputs so that the asynchronous execution is included.
+    tf.nest.map_structure(lambda x: x.numpy(), serving_fn(images))
+    latencies.append(time.perf_counter() - run_start)
+  elapsed = time.perf_counter() - start
+  cpu_seconds = _cpu_seconds() - start_cpu
+
+  latencies_ms = np.asarray(latencies) * 1000.0
+  results = {
+      'num_runs': num_runs,
+      'latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+      'latency_p90_ms': float(np.percentile(latencies_ms, 90)),
+      'latency_p99_ms': float(np.percentile(latencies_ms, 99)),
+      'images_per_sec': num_runs * batch_size / elapsed,
+      'cpu_sec_per_run': cpu_seconds / num_runs,
+  }
+  logging.info('Serving benchmark results: %s', results)
+  return results
+
+
+def main(_):
+  imported = tf.saved_model.load(_SAVED_MODEL_DIR.value)
+  serving_fn = imported.signatures[_SIGNATURE.value]
+  image_size = [int(x) for x in _INPUT_IMAGE_SIZE.value.split(',')]
+  results = run_serving_benchmark(
+      serving_fn,
+      batch_size=_BATCH_SIZE.value,
+      image_size=image_size,
+      num_runs=_NUM_RUNS.value,
+      num_warmup_runs=_NUM_WARMUP_RUNS.value)
+  for key, value in results.items():
+    logging.info('%s: %s', key, value)
+
+
+if __name__ == '__main__':
+  flags.mark_flag_as_required('saved_model_dir')
+  app.run(main)
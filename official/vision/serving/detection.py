@@ -66,18 +66,45 @@ class DetectionModule(export_base.ExportModule):
     return model
 
   def _build_anchor_boxes(self):
-    """Builds and returns anchor boxes."""
-    model_params = self.params.task.model
-    input_anchor = anchor.build_anchor_generator(
-        min_level=model_params.min_level,
-        max_level=model_params.max_level,
-        num_scales=model_params.anchor.num_scales,
-        aspect_ratios=model_params.anchor.aspect_ratios,
-        anchor_size=model_params.anchor.anchor_size)
-    return input_anchor(image_size=self._padded_size)
+    """Builds and returns anchor boxes.
+
+    The anchors only depend on the padded input size, so they are generated
+    once, eagerly, and embedded in the exported graph as constants.
+
+    Returns:
+      A dict mapping anchor levels to constant anchor boxes of shape
+      [height_l, width_l, num_anchors_per_location * 4].
+    """
+    if getattr(self, '_anchor_boxes', None) is None:
+      model_params = self.params.task.model
+      input_anchor = anchor.build_anchor_generator(
+          min_level=model_params.min_level,
+          max_level=model_params.max_level,
+          num_scales=model_params.anchor.num_scales,
+          aspect_ratios=model_params.anchor.aspect_ratios,
+          anchor_size=model_params.anchor.anchor_size)
+      with tf.init_scope():
+        self._anchor_boxes = {
+            level: boxes.numpy()
+            for level, boxes in input_anchor(
+                image_size=self._padded_size).items()
+        }
+    return {
+        level: tf.constant(boxes) for level, boxes in self._anchor_boxes.items()
+    }
 
   def _build_inputs(self, image):
-    """Builds detection model inputs for serving."""
+    """Builds detection model inputs for serving.
+
+    Args:
+      image: An image of shape [height, width, 3], or a batch of images of the
+        same size of shape [batch_size, height, width, 3].
+
+    Returns:
+      The normalized, resized and padded image or images, the anchor boxes,
+      and the image info of shape [4, 2], which is the same for all the images
+      of a batch.
+    """
 
     if isinstance(image, tf.RaggedTensor):
       image = image.to_tensor()
@@ -130,7 +157,8 @@ class DetectionModule(export_base.ExportModule):
     """Preprocesses inputs to be suitable for the model.
 
     Args:
-      images: The images tensor.
+      images: The images tensor, or a `tf.RaggedTensor` of images of different
+        sizes that are preprocessed one by one.
     Returns:
       images: The images tensor cast to float.
       anchor_boxes: Dict mapping anchor levels to anchor boxes.
@@ -139,6 +167,19 @@ class DetectionModule(export_base.ExportModule):
     """
     model_params = self.params.task.model
     with tf.device('cpu:0'):
+      if not isinstance(images, tf.RaggedTensor):
+        # All the images have the same size, so they are all resized and
+        # padded the same way in a single batched op instead of one by one.
+        images, anchor_boxes, image_info = self._build_inputs(images)
+        batch_size = tf.shape(images)[0]
+        anchor_boxes = {
+            level: tf.tile(tf.expand_dims(boxes, axis=0), [batch_size, 1, 1, 1])
+            for level, boxes in anchor_boxes.items()
+        }
+        image_info = tf.tile(tf.expand_dims(image_info, axis=0),
+                             [batch_size, 1, 1])
+        return images, anchor_boxes, image_info
+
       # Tensor Specs for map_fn outputs (images, anchor_boxes, and image_info).
       images_spec = tf.TensorSpec(shape=self._padded_size + [3],
                                   dtype=tf.float32)
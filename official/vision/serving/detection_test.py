@@ -153,6 +153,26 @@ class DetectionExportTest(tf.test.TestCase, parameterized.TestCase):
     self.assertAllEqual(outputs['num_detections'].numpy(),
                         expected_outputs['num_detections'].numpy())
 
+  @parameterized.parameters(
+      ('retinanet_resnetfpn_coco', [384, 640]),
+      ('maskrcnn_resnetfpn_coco', [640, 384]),
+  )
+  def test_batched_preprocess(self, experiment_name, image_size):
+    module = self._get_detection_module(experiment_name, 'image_tensor')
+    images = tf.constant(
+        np.random.randint(0, 256, size=[2, *image_size, 3], dtype=np.uint8))
+
+    images_out, anchor_boxes, image_info = module.preprocess(images)
+    # A ragged batch is preprocessed one image at a time.
+    expected_images, expected_anchor_boxes, expected_image_info = (
+        module.preprocess(tf.RaggedTensor.from_tensor(images)))
+
+    self.assertAllClose(expected_images, images_out)
+    self.assertAllClose(expected_image_info, image_info)
+    self.assertEqual(expected_anchor_boxes.keys(), anchor_boxes.keys())
+    for level, boxes in anchor_boxes.items():
+      self.assertAllEqual(expected_anchor_boxes[level], boxes)
+
   @parameterized.parameters(('retinanet_resnetfpn_coco',),
                             ('maskrcnn_spinenet_coco',))
   def test_build_model_pass_with_none_batch_size(self, experiment_type):
@@ -108,11 +108,13 @@ class RetinaNetTask(base_task.Task):
         decoder = tf_example_decoder.TfExampleDecoder(
             regenerate_source_id=decoder_cfg.regenerate_source_id,
             attribute_names=decoder_cfg.attribute_names,
+            decode_image=decoder_cfg.decode_image,
         )
       elif params.decoder.type == 'label_map_decoder':
         decoder = tf_example_label_map_decoder.TfExampleDecoderLabelMap(
             label_map=decoder_cfg.label_map,
-            regenerate_source_id=decoder_cfg.regenerate_source_id)
+            regenerate_source_id=decoder_cfg.regenerate_source_id,
+            decode_image=decoder_cfg.decode_image)
       else:
         raise ValueError('Unknown decoder type: {}!'.format(
             params.decoder.type))
@@ -115,7 +115,8 @@ class SemanticSegmentationTask(base_task.Task):
         dtype=params.dtype,
         image_feature=params.image_feature,
         additional_dense_features=params.additional_dense_features,
-        centered_crop=params.centered_crop)
+        centered_crop=params.centered_crop,
+        decode_and_crop_image=params.decode_and_crop_image)
 
     reader = input_reader_factory.input_reader_generator(
         params,
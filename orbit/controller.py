@@ -14,10 +14,14 @@
 
 """Provides a `Controller` class for managing the outer training loop."""
 
+import collections
+from concurrent import futures
+import contextlib
 import pprint
+import threading
 import time
 
-from typing import Callable, Iterable, Optional, Union
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple, Union
 
 from absl import logging
 
@@ -35,6 +39,43 @@ _orbit_api_gauge = monitoring.BoolGauge(
 )
 
 
+class _PendingEval(
+    collections.namedtuple("_PendingEval",
+                           ["future", "checkpoint_path", "restored"])):
+  """An asynchronous evaluation that is running or waiting to run.
+
+  Attributes:
+    future: The `concurrent.futures.Future` of the evaluation output.
+    checkpoint_path: The path of the evaluated checkpoint.
+    restored: A `threading.Event` set once the checkpoint has been read.
+  """
+
+
+def _max_checkpoints_to_keep(
+    checkpoint_manager: tf.train.CheckpointManager) -> Optional[int]:
+  """Returns the `max_to_keep` of `checkpoint_manager` (`None` keeps all)."""
+  return checkpoint_manager._max_to_keep  # pylint: disable=protected-access
+
+
+def _checkpoint_interval_elapsed(
+    checkpoint_manager: tf.train.CheckpointManager) -> bool:
+  """Returns whether `checkpoint_manager.save` would save a checkpoint now.
+
+  This mirrors the `check_interval` logic of `CheckpointManager.save`.
+
+  Args:
+    checkpoint_manager: A `CheckpointManager` with a `checkpoint_interval`.
+  """
+  # pylint: disable=protected-access
+  last_step = checkpoint_manager._last_checkpoint_step
+  if last_step is None:
+    return True
+  step = int(checkpoint_manager._step_counter.numpy())
+  interval = checkpoint_manager.checkpoint_interval
+  return step != last_step and step // interval != last_step // interval
+  # pylint: enable=protected-access
+
+
 def _log(message: str):
   """Logs `message` to the `info` log, and also prints to stdout."""
   logging.info(message)
@@ -111,7 +152,14 @@ class Controller:
       # Evaluation related
       eval_summary_dir: Optional[str] = None,
       summary_manager: Optional[utils.SummaryManagerInterface] = None,
-      eval_summary_manager: Optional[utils.SummaryManagerInterface] = None):
+      eval_summary_manager: Optional[utils.SummaryManagerInterface] = None,
+      async_eval_checkpoint: Optional[tf.train.Checkpoint] = None,
+      max_pending_async_evals: int = 1,
+      # Profiling related
+      enable_phase_timing: bool = False,
+      phase_timing_actions: Optional[Iterable[Action]] = None,
+      profile_steps: Optional[Sequence[Tuple[int, int]]] = None,
+      profile_dir: Optional[str] = None):
     """Initializes a `Controller` instance.
 
     Note that if `checkpoint_manager` is provided and there are checkpoints in
@@ -172,12 +220,47 @@ class Controller:
         `eval_summary_dir` will be ignored. Otherwise the eval summary manager
         will be created internally for TensorBoard summaries by default from the
         `eval_summary_dir`.
+      async_eval_checkpoint: An optional `tf.train.Checkpoint` tracking the
+        variables used by `evaluator`, which must be separate from the ones
+        updated by `trainer` (e.g. a second copy of the model). If set,
+        `train_and_evaluate` runs evaluations asynchronously: at every eval
+        interval a checkpoint is written with `checkpoint_manager`, and a
+        background thread restores it into `async_eval_checkpoint`, runs
+        `evaluator`, calls `eval_actions` and writes the eval summaries at the
+        step of the checkpoint, while training continues.
+      max_pending_async_evals: The maximum number of asynchronous evaluations
+        that may be running or waiting to run. When the limit is reached,
+        training blocks until the oldest evaluation finishes. It may not exceed
+        the `max_to_keep` of `checkpoint_manager`. Training also blocks before
+        saving a checkpoint that would delete a checkpoint not yet restored by
+        its pending evaluation.
+      enable_phase_timing: Whether to time the phases of the outer loop on the
+        host. If `True`, after each inner loop of training a record of the
+        seconds spent since the previous record in `trainer.train` ("train"),
+        train actions ("train_actions"), writing summaries ("summary"), saving
+        checkpoints ("checkpoint") and evaluating ("eval"), plus the "total"
+        and unaccounted ("other") time, is logged, written as "phase_time/*"
+        training summaries and passed to `phase_timing_actions`.
+      phase_timing_actions: Optional `orbit.Action`s to call with each phase
+        timing record. Only used if `enable_phase_timing` is `True`.
+      profile_steps: Optional sequence of `(start, stop)` global step windows
+        to capture `tf.profiler` traces for. A trace is started before the
+        first inner loop of training that runs a step in `[start, stop)` and
+        stopped after the first inner loop that reaches `stop`, so the windows
+        are rounded to `steps_per_loop`.
+      profile_dir: The directory to write profiler traces to. If `None`, it
+        will be set to `summary_dir`.
 
     Raises:
       ValueError: If both `trainer` and `evaluator` are `None`.
       ValueError: If `steps_per_loop` is not a positive integer or a callable.
       ValueError: If `summary_interval` is not a positive integer or is not
         divisible by `steps_per_loop`.
+      ValueError: If `async_eval_checkpoint` is set without `evaluator` and
+        `checkpoint_manager`, or `max_pending_async_evals` is not positive or
+        exceeds the `max_to_keep` of `checkpoint_manager`.
+      ValueError: If `profile_steps` is set without a profile directory, or
+        contains an empty window.
     """
     if trainer is None and evaluator is None:
       raise ValueError("`trainer` and `evaluator` should not both be `None`.")
@@ -205,6 +288,34 @@ class Controller:
     if not isinstance(global_step, tf.Variable):
       raise ValueError("`global_step` must be a `tf.Variable`.")
 
+    if profile_steps:
+      if not (profile_dir or summary_dir):
+        raise ValueError(
+            "`profile_dir` or `summary_dir` is required when `profile_steps` "
+            "is provided.")
+      for start, stop in profile_steps:
+        if start >= stop:
+          raise ValueError(
+              f"`profile_steps` window ({start}, {stop}) must have start < "
+              "stop.")
+
+    if async_eval_checkpoint is not None:
+      if evaluator is None or checkpoint_manager is None:
+        raise ValueError(
+            "`evaluator` and `checkpoint_manager` are required when "
+            "`async_eval_checkpoint` is provided.")
+      if max_pending_async_evals < 1:
+        raise ValueError(
+            f"`max_pending_async_evals` ({max_pending_async_evals}) must be "
+            "a positive integer.")
+      max_to_keep = _max_checkpoints_to_keep(checkpoint_manager)
+      if max_to_keep is not None and max_pending_async_evals > max_to_keep:
+        raise ValueError(
+            f"`max_pending_async_evals` ({max_pending_async_evals}) must not "
+            f"exceed the `max_to_keep` ({max_to_keep}) of "
+            "`checkpoint_manager`, as the checkpoints of the pending "
+            "evaluations would be deleted before they are evaluated.")
+
     self.trainer = trainer
     self.evaluator = evaluator
 
@@ -230,9 +341,33 @@ class Controller:
             summary_dir, tf.summary.scalar, global_step=self.global_step)
       self._steps_per_loop = steps_per_loop
 
+    self._phase_timer = PhaseTimer() if enable_phase_timing else None
+    self.phase_timing_actions = (
+        () if phase_timing_actions is None else tuple(phase_timing_actions))
+    self._profile_steps = sorted(profile_steps or ())
+    self._profile_dir = profile_dir or summary_dir
+    self._profiling = False
+
+    self._async_eval_checkpoint = async_eval_checkpoint
+    self._max_pending_async_evals = max_pending_async_evals
+    self._pending_async_evals = collections.deque()
+    # Evaluations run on a single background thread, in order. The thread is
+    # started by the first evaluation of `train_and_evaluate` and stopped when
+    # it returns.
+    self._async_eval_executor = None
+    if async_eval_checkpoint is not None:
+      # Eval summaries are written at the step of the evaluated checkpoint
+      # rather than at the current (still increasing) training step.
+      self._async_eval_step = tf.Variable(
+          0, dtype=tf.int64, trainable=False, name="async_eval_step")
+
     if self.evaluator is not None:
       eval_summary_dir = eval_summary_dir or summary_dir
-      if eval_summary_dir == summary_dir and self.trainer is not None:
+      if async_eval_checkpoint is not None and not eval_summary_manager:
+        self.eval_summary_manager = utils.SummaryManager(
+            eval_summary_dir, tf.summary.scalar,
+            global_step=self._async_eval_step)
+      elif eval_summary_dir == summary_dir and self.trainer is not None:
         # Reuse the summary writer if train and evaluation summary directory
         # are the same.
         self.eval_summary_manager = self.summary_manager
@@ -280,12 +415,17 @@ class Controller:
       # Calculates steps to run for the next train loop.
       num_steps = min(steps - current_step, self.steps_per_loop)
       self._train_n_steps(num_steps)
-      self._maybe_save_checkpoint()
+      with self._time_phase("checkpoint"):
+        self._maybe_save_checkpoint()
+      self._write_phase_timing()
       current_step = self.global_step.numpy()
 
     if checkpoint_at_completion:
-      self._maybe_save_checkpoint(check_interval=False)
+      with self._time_phase("checkpoint"):
+        self._maybe_save_checkpoint(check_interval=False)
 
+    # Training may end before the end of a profile window.
+    self._stop_profiler()
     self._sync_on_async_checkpointing()
 
   def evaluate(self, steps: int = -1) -> Optional[runner.Output]:
@@ -309,7 +449,11 @@ class Controller:
       ValueError: If `steps` is not a positive value or -1.
     """
     self._require("evaluator", for_method="evaluate")
+    return self._evaluate(steps, self.global_step.numpy())
 
+  def _evaluate(self, steps: int,
+                current_step: int) -> Optional[runner.Output]:
+    """Runs evaluation and logs and summarizes it for `current_step`."""
     if steps > 0:
       steps_msg = f"running {steps} steps of evaluation..."
     elif steps == -1:
@@ -317,7 +461,6 @@ class Controller:
     else:
       raise ValueError(f"`steps` ({steps}) should be > 0, or == -1.")
 
-    current_step = self.global_step.numpy()
     _log(f" eval | step: {current_step: 6d} | {steps_msg}")
 
     start = time.time()
@@ -364,6 +507,11 @@ class Controller:
     In addition, this method will run a final evaluation at the end of the
     training sequence.
 
+    If `async_eval_checkpoint` was passed to `Controller.__init__`, the
+    evaluations run in the background on checkpoints of the model while
+    training continues, and this method waits for all of them to finish before
+    returning.
+
     When async checkpointing is enabled, a sync is triggered at the end of this
     method to make sure any ongoing async checkpoint saving is finished before
     returning.
@@ -387,14 +535,27 @@ class Controller:
     output = None
     current_step = self.global_step.numpy()  # Cache, since this is expensive.
     eval_interval = eval_interval or (train_steps - current_step)
-    while current_step < train_steps:
-      interval = min(train_steps - current_step, eval_interval)
-      num_steps = current_step + interval
-      self.train(steps=num_steps, checkpoint_at_completion=False)
-      output = self.evaluate(steps=eval_steps)
-      current_step = self.global_step.numpy()
-    self._maybe_save_checkpoint(check_interval=False)
-    self._sync_on_async_checkpointing()
+    try:
+      while current_step < train_steps:
+        interval = min(train_steps - current_step, eval_interval)
+        num_steps = current_step + interval
+        self.train(steps=num_steps, checkpoint_at_completion=False)
+        with self._time_phase("eval"):
+          if self._async_eval_checkpoint is not None:
+            self._evaluate_async(steps=eval_steps)
+          else:
+            output = self.evaluate(steps=eval_steps)
+        current_step = self.global_step.numpy()
+      with self._time_phase("checkpoint"):
+        self._maybe_save_checkpoint(check_interval=False)
+        self._sync_on_async_checkpointing()
+      if self._async_eval_checkpoint is not None:
+        with self._time_phase("eval"):
+          output = self._wait_for_async_evals(max_pending=0)
+    finally:
+      # On errors, cancels the evaluations that have not started yet.
+      self._shutdown_async_evals()
+    self._write_phase_timing()
     return output
 
   def evaluate_continuously(
@@ -505,8 +666,10 @@ class Controller:
     if not self.step_timer:
       self.step_timer = StepTimer(self.global_step)
     current_step = self.global_step.numpy()
+    self._maybe_start_profiler(current_step, num_steps)
 
-    with self.summary_manager.summary_writer().as_default():
+    with self._time_phase("train"), \
+        self.summary_manager.summary_writer().as_default():
       should_record = False  # Allows static optimization in no-summary cases.
       if self.summary_interval:
         # Create a predicate to determine when summaries should be written.
@@ -526,19 +689,175 @@ class Controller:
       logging.warning(message)
 
     train_output = train_output or {}
-    for action in self.train_actions:
-      action(train_output)
-    train_output = tf.nest.map_structure(utils.get_value, train_output)
+    with self._time_phase("train_actions"):
+      for action in self.train_actions:
+        action(train_output)
+    with self._time_phase("train"):
+      train_output = tf.nest.map_structure(utils.get_value, train_output)
 
     current_step = self.global_step.numpy()
+    self._maybe_stop_profiler(current_step)
     steps_per_second = self.step_timer.steps_per_second()
     _log(f"train | step: {current_step: 6d} | "
          f"steps/sec: {steps_per_second: 6.1f} | "
          f"output: {_format_output(train_output)}")
 
     train_output["steps_per_second"] = steps_per_second
-    self.summary_manager.write_summaries(train_output)
-    self.summary_manager.flush()
+    with self._time_phase("summary"):
+      self.summary_manager.write_summaries(train_output)
+      self.summary_manager.flush()
+
+  def _time_phase(self, name: str):
+    """Returns a context manager timing the `name` phase, if enabled."""
+    if self._phase_timer is None:
+      return contextlib.nullcontext()
+    return self._phase_timer.time(name)
+
+  def _write_phase_timing(self):
+    """Logs and summarizes the phase times recorded since the last call."""
+    if self._phase_timer is None:
+      return
+    record = self._phase_timer.pop_record()
+    current_step = self.global_step.numpy()
+    _log(f"phase | step: {current_step: 6d} | " +
+         " | ".join(f"{name}: {value:.3f} sec" for name, value in
+                    record.items()))
+    for action in self.phase_timing_actions:
+      action(record)
+    if self.trainer is not None:
+      # The time spent writing these summaries goes into the next record.
+      with self._time_phase("summary"):
+        self.summary_manager.write_summaries(
+            {f"phase_time/{name}": value for name, value in record.items()})
+        self.summary_manager.flush()
+
+  def _maybe_start_profiler(self, current_step: int, num_steps: int):
+    """Starts a profiler trace if the next steps overlap a profile window."""
+    if self._profiling:
+      return
+    for start, stop in self._profile_steps:
+      if start < current_step + num_steps and current_step < stop:
+        _log(f"profile | step: {current_step: 6d} | starting profiler trace "
+             f"for steps [{start}, {stop}) in {self._profile_dir}.")
+        tf.profiler.experimental.start(self._profile_dir)
+        self._profiling = True
+        return
+
+  def _maybe_stop_profiler(self, current_step: int):
+    """Stops the profiler trace once the end of its window is reached."""
+    if not self._profiling:
+      return
+    for start, stop in self._profile_steps:
+      if start < current_step and current_step < stop:
+        return
+    self._stop_profiler()
+
+  def _stop_profiler(self):
+    """Stops the running profiler trace, if any."""
+    if self._profiling:
+      tf.profiler.experimental.stop()
+      self._profiling = False
+      _log(f"profile | step: {self.global_step.numpy(): 6d} | stopped "
+           "profiler trace.")
+
+  def _evaluate_async(self, steps: int):
+    """Schedules an evaluation of the current model in the background.
+
+    A checkpoint is saved for the current global step (unless one already
+    exists), and its evaluation is queued on the background thread. If
+    `max_pending_async_evals` evaluations are already pending, this blocks
+    until the oldest one finishes.
+
+    Args:
+      steps: The number of evaluation steps to run, see `evaluate`.
+    """
+    assert isinstance(self.checkpoint_manager, tf.train.CheckpointManager)
+    current_step = self.global_step.numpy()
+    checkpoint_path = self.checkpoint_manager.latest_checkpoint
+    if (checkpoint_path is None or
+        not checkpoint_path.endswith(f"-{current_step}")):
+      self._wait_for_async_eval_restores()
+      checkpoint_path = self.checkpoint_manager.save(
+          checkpoint_number=current_step, options=self._checkpoint_options)
+      _log(f"saved checkpoint to {checkpoint_path}.")
+    # The background thread restores from the checkpoint files directly.
+    self._sync_on_async_checkpointing()
+
+    self._wait_for_async_evals(max_pending=self._max_pending_async_evals - 1)
+    _log(f" eval | step: {current_step: 6d} | "
+         f"scheduled asynchronous evaluation of {checkpoint_path}")
+    if self._async_eval_executor is None:
+      self._async_eval_executor = futures.ThreadPoolExecutor(
+          max_workers=1, thread_name_prefix="orbit_async_eval")
+    restored = threading.Event()
+    self._pending_async_evals.append(
+        _PendingEval(
+            future=self._async_eval_executor.submit(self._run_async_eval,
+                                                    steps, checkpoint_path,
+                                                    current_step, restored),
+            checkpoint_path=checkpoint_path,
+            restored=restored))
+
+  def _run_async_eval(self, steps: int, checkpoint_path: str, step: int,
+                      restored: threading.Event) -> Optional[runner.Output]:
+    """Restores `checkpoint_path` for the evaluator and evaluates it."""
+    assert isinstance(self._async_eval_checkpoint, tf.train.Checkpoint)
+    try:
+      with self.strategy.scope():
+        self._async_eval_checkpoint.read(checkpoint_path).expect_partial()
+    finally:
+      # The checkpoint files are no longer needed, even if reading failed.
+      restored.set()
+    self._async_eval_step.assign(step)
+    # The default summary step is thread-local.
+    tf.summary.experimental.set_step(self._async_eval_step)
+    return self._evaluate(steps, step)
+
+  def _wait_for_async_evals(self,
+                            max_pending: int) -> Optional[runner.Output]:
+    """Waits until at most `max_pending` asynchronous evaluations are pending.
+
+    Args:
+      max_pending: The number of pending evaluations to leave running.
+
+    Returns:
+      The output of the most recent evaluation waited for, or `None` if no
+      evaluation was waited for.
+    """
+    output = None
+    while len(self._pending_async_evals) > max_pending:
+      # Re-raises any error raised by the evaluation.
+      output = self._pending_async_evals.popleft().future.result()
+    return output
+
+  def _wait_for_async_eval_restores(self):
+    """Waits for the restores of the checkpoints the next save may delete.
+
+    `CheckpointManager.save` deletes the oldest checkpoints beyond its
+    `max_to_keep`, which may still have to be read by pending evaluations.
+    """
+    if not self._pending_async_evals:
+      return
+    assert isinstance(self.checkpoint_manager, tf.train.CheckpointManager)
+    max_to_keep = _max_checkpoints_to_keep(self.checkpoint_manager)
+    if max_to_keep is None:
+      return
+    checkpoints = self.checkpoint_manager.checkpoints
+    deletable = set(checkpoints[:len(checkpoints) + 1 - max_to_keep])
+    for pending_eval in self._pending_async_evals:
+      if pending_eval.checkpoint_path in deletable:
+        pending_eval.restored.wait()
+
+  def _shutdown_async_evals(self):
+    """Stops the asynchronous evaluation thread, if any.
+
+    Evaluations that have not started are cancelled, and the running one, if
+    any, is waited for.
+    """
+    if self._async_eval_executor is not None:
+      self._async_eval_executor.shutdown(wait=True, cancel_futures=True)
+      self._async_eval_executor = None
+    self._pending_async_evals.clear()
 
   def _maybe_save_checkpoint(self, check_interval: bool = True):
     """Conditionally saves a checkpoint.
@@ -557,6 +876,10 @@ class Controller:
       A boolean indicating whether a checkpoint was saved.
     """
     if self.checkpoint_manager and self.checkpoint_manager.checkpoint_interval:
+      # Only waits for pending evaluations if a checkpoint will be saved.
+      if not check_interval or _checkpoint_interval_elapsed(
+          self.checkpoint_manager):
+        self._wait_for_async_eval_restores()
       ckpt_path = self.checkpoint_manager.save(
           checkpoint_number=self.global_step.numpy(),
           check_interval=check_interval,
@@ -581,6 +904,36 @@ class Controller:
       self.checkpoint_manager.sync()
 
 
+class PhaseTimer:
+  """Utility class for accumulating the host time spent in named phases."""
+
+  def __init__(self):
+    self.start()
+
+  def start(self):
+    self.phase_times = collections.OrderedDict()
+    self.last_time = time.time()
+
+  @contextlib.contextmanager
+  def time(self, name: str):
+    """Adds the time spent in the context to the `name` phase."""
+    start = time.time()
+    try:
+      yield
+    finally:
+      self.phase_times[name] = (
+          self.phase_times.get(name, 0.) + time.time() - start)
+
+  def pop_record(self, restart: bool = True) -> Dict[str, float]:
+    """Returns the phase times, total and unaccounted time since `start`."""
+    record = dict(self.phase_times)
+    record["total"] = time.time() - self.last_time
+    record["other"] = max(record["total"] - sum(self.phase_times.values()), 0.)
+    if restart:
+      self.start()
+    return record
+
+
 class StepTimer:
   """Utility class for measuring steps/second."""
 
@@ -853,6 +853,200 @@ class ControllerTest(tf.test.TestCase, parameterized.TestCase):
     test_controller.train(steps=10)
     self.assertEqual(test_runner.global_step, 10)
 
+  def test_train_and_evaluate_async(self):
+    test_runner = TestRunner()
+    eval_runner = TestRunner()
+
+    checkpoint = tf.train.Checkpoint(
+        model=test_runner.model, optimizer=test_runner.optimizer)
+    checkpoint_manager = tf.train.CheckpointManager(
+        checkpoint,
+        self.model_dir,
+        max_to_keep=None,
+        step_counter=test_runner.global_step)
+
+    class StepRecorderAction:
+      """Records the evaluation outputs and the model they were run on."""
+
+      def __init__(self):
+        self.outputs = []
+
+      def __call__(self, output):
+        self.outputs.append(
+            (output, eval_runner.model.get_layer("dense").kernel.numpy()))
+
+    recorder = StepRecorderAction()
+    test_controller = controller.Controller(
+        trainer=test_runner,
+        evaluator=eval_runner,
+        global_step=test_runner.global_step,
+        steps_per_loop=2,
+        checkpoint_manager=checkpoint_manager,
+        eval_actions=[recorder],
+        summary_dir=os.path.join(self.model_dir, "summaries/train"),
+        eval_summary_dir=os.path.join(self.model_dir, "summaries/eval"),
+        async_eval_checkpoint=tf.train.Checkpoint(model=eval_runner.model),
+        max_pending_async_evals=2)
+    output = test_controller.train_and_evaluate(
+        train_steps=10, eval_steps=2, eval_interval=6)
+
+    self.assertIn("eval_loss", output)
+    self.assertLen(recorder.outputs, 2)
+    # The last evaluation ran on the final trained weights.
+    self.assertAllClose(recorder.outputs[-1][1],
+                        test_runner.model.get_layer("dense").kernel.numpy())
+    self.assertNotEmpty(
+        tf.io.gfile.glob(os.path.join(self.model_dir, "ckpt-6*")))
+
+    # Eval summaries are written at the steps of the evaluated checkpoints.
+    eval_summary_dir = os.path.join(self.model_dir, "summaries/eval")
+    steps = []
+    event_paths = tf.io.gfile.glob(os.path.join(eval_summary_dir, "events*"))
+    for event in tf.compat.v1.train.summary_iterator(event_paths[-1]):
+      for value in event.summary.value:
+        if value.tag == "eval_loss":
+          steps.append(event.step)
+    self.assertEqual(steps, [6, 10])
+    # The background thread is stopped when `train_and_evaluate` returns.
+    self.assertIsNone(test_controller._async_eval_executor)  # pylint: disable=protected-access
+
+  def test_train_and_evaluate_async_with_checkpoint_rotation(self):
+    test_runner = TestRunner()
+    eval_runner = TestRunner()
+
+    checkpoint = tf.train.Checkpoint(
+        model=test_runner.model, optimizer=test_runner.optimizer)
+    # Every training loop saves a checkpoint, which deletes the previous one.
+    checkpoint_manager = tf.train.CheckpointManager(
+        checkpoint,
+        self.model_dir,
+        max_to_keep=1,
+        step_counter=test_runner.global_step,
+        checkpoint_interval=2)
+
+    kernels = []
+    test_controller = controller.Controller(
+        trainer=test_runner,
+        evaluator=eval_runner,
+        global_step=test_runner.global_step,
+        steps_per_loop=2,
+        checkpoint_manager=checkpoint_manager,
+        eval_actions=[
+            lambda _: kernels.append(
+                eval_runner.model.get_layer("dense").kernel.numpy())
+        ],
+        summary_dir=os.path.join(self.model_dir, "summaries/train"),
+        eval_summary_dir=os.path.join(self.model_dir, "summaries/eval"),
+        async_eval_checkpoint=tf.train.Checkpoint(model=eval_runner.model),
+        max_pending_async_evals=1)
+    test_controller.train_and_evaluate(
+        train_steps=10, eval_steps=2, eval_interval=4)
+
+    self.assertLen(kernels, 3)
+    self.assertAllClose(kernels[-1],
+                        test_runner.model.get_layer("dense").kernel.numpy())
+    self.assertLen(checkpoint_manager.checkpoints, 1)
+
+  def test_checkpoint_interval_elapsed_matches_checkpoint_manager(self):
+    step = tf.Variable(0, dtype=tf.int64)
+    checkpoint_manager = tf.train.CheckpointManager(
+        tf.train.Checkpoint(step=step),
+        self.model_dir,
+        max_to_keep=None,
+        step_counter=step,
+        checkpoint_interval=4)
+    for value in [0, 2, 3, 4, 4, 7, 9]:
+      step.assign(value)
+      elapsed = controller._checkpoint_interval_elapsed(checkpoint_manager)  # pylint: disable=protected-access
+      saved = checkpoint_manager.save(check_interval=True) is not None
+      self.assertEqual(elapsed, saved, msg=f"step {value}")
+
+  def test_async_eval_pending_evals_bounded_by_max_to_keep(self):
+    test_runner = TestRunner()
+    checkpoint_manager = tf.train.CheckpointManager(
+        tf.train.Checkpoint(model=test_runner.model),
+        self.model_dir,
+        max_to_keep=2)
+    with self.assertRaisesRegex(ValueError, "`max_to_keep`"):
+      controller.Controller(
+          trainer=test_runner,
+          evaluator=TestRunner(),
+          global_step=test_runner.global_step,
+          steps_per_loop=2,
+          checkpoint_manager=checkpoint_manager,
+          async_eval_checkpoint=tf.train.Checkpoint(model=test_runner.model),
+          max_pending_async_evals=3)
+
+  def test_async_eval_requires_checkpoint_manager(self):
+    test_runner = TestRunner()
+    with self.assertRaisesRegex(ValueError, "`checkpoint_manager`"):
+      controller.Controller(
+          trainer=test_runner,
+          evaluator=test_runner,
+          global_step=test_runner.global_step,
+          steps_per_loop=2,
+          async_eval_checkpoint=tf.train.Checkpoint(model=test_runner.model))
+
+  def test_phase_timing(self):
+    test_runner = TestRunner()
+
+    checkpoint = tf.train.Checkpoint(
+        model=test_runner.model, optimizer=test_runner.optimizer)
+    checkpoint_manager = tf.train.CheckpointManager(
+        checkpoint,
+        self.model_dir,
+        max_to_keep=None,
+        step_counter=test_runner.global_step,
+        checkpoint_interval=4)
+    records = []
+    test_controller = controller.Controller(
+        trainer=test_runner,
+        evaluator=test_runner,
+        global_step=test_runner.global_step,
+        steps_per_loop=2,
+        checkpoint_manager=checkpoint_manager,
+        summary_dir=os.path.join(self.model_dir, "summaries/train"),
+        eval_summary_dir=os.path.join(self.model_dir, "summaries/eval"),
+        enable_phase_timing=True,
+        phase_timing_actions=[records.append])
+    test_controller.train_and_evaluate(
+        train_steps=8, eval_steps=2, eval_interval=4)
+
+    # One record per inner loop, plus one after the final evaluation.
+    self.assertLen(records, 5)
+    for record in records[:4]:
+      self.assertContainsSubset(["train", "checkpoint", "total", "other"],
+                                record.keys())
+      self.assertAllGreaterEqual(list(record.values()), 0.)
+    self.assertIn("eval", records[2])
+    self.assertIn("eval", records[4])
+    self.assertNotEmpty(
+        summaries_with_matching_keyword(
+            "phase_time/train", os.path.join(self.model_dir,
+                                             "summaries/train")))
+
+  def test_profile_steps(self):
+    test_runner = TestRunner()
+    profile_dir = os.path.join(self.model_dir, "profile")
+    test_controller = controller.Controller(
+        trainer=test_runner,
+        global_step=test_runner.global_step,
+        steps_per_loop=2,
+        profile_steps=[(2, 4)],
+        profile_dir=profile_dir)
+    test_controller.train(steps=6)
+    self.assertNotEmpty(
+        tf.io.gfile.glob(os.path.join(profile_dir, "plugins/profile/*")))
+
+  def test_profile_steps_requires_directory(self):
+    test_runner = TestRunner()
+    with self.assertRaisesRegex(ValueError, "`profile_dir`"):
+      controller.Controller(
+          trainer=test_runner,
+          global_step=test_runner.global_step,
+          steps_per_loop=2,
+          profile_steps=[(2, 4)])
+
 
 if __name__ == "__main__":
   tf.test.main()
@@ -24,9 +24,15 @@ python models/research/object_detection/metrics/oid_od_challenge_evaluation.py \
     --input_predictions=/path/to/input/predictions.csv \
     --output_metrics=/path/to/output/metric.csv \
     --input_annotations_segm=[/path/to/input/annotations-human-mask.csv] \
+    --num_workers=[8] \
 
 If optional flag has_masks is True, Mask column is also expected in CSV.
 
+If num_workers is larger than 1, the images are split into that many shards
+which are evaluated in separate processes, and the evaluation states of the
+shards are merged in image id order before computing the metrics, so the
+metrics are the same as with a single process.
+
 CSVs with bounding box annotations, instance segmentations and image label
 can be downloaded from the Open Images Challenge website:
 https://storage.googleapis.com/openimages/web/challenge.html
@@ -41,9 +47,11 @@ from __future__ import division
 from __future__ import print_function
 
 import logging
+import multiprocessing
 
 from absl import app
 from absl import flags
+import numpy as np
 import pandas as pd
 from google.protobuf import text_format
 
@@ -66,6 +74,9 @@ flags.DEFINE_string('output_metrics', None, 'Output file with csv metrics.')
 flags.DEFINE_string(
     'input_annotations_segm', None,
     'File with groundtruth instance segmentation annotations [OPTIONAL].')
+flags.DEFINE_integer(
+    'num_workers', 1,
+    'Number of processes to evaluate the images with [OPTIONAL].')
 
 FLAGS = flags.FLAGS
 
@@ -93,6 +104,101 @@ def _load_labelmap(labelmap_path):
   return labelmap_dict, categories
 
 
+def _add_images(challenge_evaluator, annotations, predictions,
+                class_label_map):
+  """Adds the groundtruth and predictions of all images to the evaluator.
+
+  The predictions are grouped by image once, so that finding the predictions of
+  an image does not scan all the predictions.
+
+  Args:
+    challenge_evaluator: The `OpenImagesChallengeEvaluator` to add images to.
+    annotations: Pandas DataFrame with the groundtruth boxes and image labels.
+    predictions: Pandas DataFrame with the detection predictions.
+    class_label_map: Class labelmap from string label name to an integer.
+  """
+  prediction_indices = predictions.groupby('ImageID').indices
+  no_predictions = predictions.iloc[:0]
+  images_processed = 0
+  for image_id, image_groundtruth in annotations.groupby('ImageID'):
+    if not images_processed % 1000:
+      logging.info('Processing image %d', images_processed)
+    groundtruth_dictionary = utils.build_groundtruth_dictionary(
+        image_groundtruth, class_label_map)
+    challenge_evaluator.add_single_ground_truth_image_info(
+        image_id, groundtruth_dictionary)
+
+    if image_id in prediction_indices:
+      image_predictions = predictions.iloc[prediction_indices[image_id]]
+    else:
+      image_predictions = no_predictions
+    prediction_dictionary = utils.build_predictions_dictionary(
+        image_predictions, class_label_map)
+    challenge_evaluator.add_single_detected_image_info(image_id,
+                                                       prediction_dictionary)
+    images_processed += 1
+
+
+def _evaluate_shard(shard):
+  """Evaluates a shard of the images in a worker process.
+
+  Args:
+    shard: A tuple of the groundtruth and predictions DataFrames of the shard,
+      the class labelmap, the categories and whether masks are evaluated.
+
+  Returns:
+    The internal state of the evaluation of the shard and its image ids, which
+    can be passed to `merge_internal_state`.
+  """
+  (annotations, predictions, class_label_map, categories,
+   evaluate_masks) = shard
+  challenge_evaluator = (
+      object_detection_evaluation.OpenImagesChallengeEvaluator(
+          categories, evaluate_masks=evaluate_masks))
+  _add_images(challenge_evaluator, annotations, predictions, class_label_map)
+  return challenge_evaluator.get_internal_state()
+
+
+def evaluate(annotations, predictions, class_label_map, categories,
+             evaluate_masks=False, num_workers=1):
+  """Evaluates the predictions with the Open Images Challenge metrics.
+
+  Args:
+    annotations: Pandas DataFrame with the groundtruth boxes and image labels.
+    predictions: Pandas DataFrame with the detection predictions.
+    class_label_map: Class labelmap from string label name to an integer.
+    categories: A list with dictionaries, one dictionary per category.
+    evaluate_masks: Whether to evaluate instance segmentation masks.
+    num_workers: If larger than 1, the number of processes to evaluate the
+      images with.
+
+  Returns:
+    A dictionary of metrics.
+  """
+  challenge_evaluator = (
+      object_detection_evaluation.OpenImagesChallengeEvaluator(
+          categories, evaluate_masks=evaluate_masks))
+  if num_workers > 1:
+    # The shards are contiguous ranges of the sorted image ids, and their
+    # states are merged in order, so the detections of each class are merged
+    # in the same order as `_add_images` adds them in a single process.
+    image_ids = np.sort(annotations['ImageID'].unique())
+    shards = []
+    for shard_image_ids in np.array_split(image_ids, num_workers):
+      shards.append(
+          (annotations[annotations['ImageID'].isin(shard_image_ids)],
+           predictions[predictions['ImageID'].isin(shard_image_ids)],
+           class_label_map, categories, evaluate_masks))
+    # TensorFlow is not fork-safe, so the workers are spawned.
+    with multiprocessing.get_context('spawn').Pool(num_workers) as pool:
+      for state_tuple, shard_image_ids in pool.imap(_evaluate_shard, shards):
+        challenge_evaluator.merge_internal_state(shard_image_ids, state_tuple)
+  else:
+    _add_images(challenge_evaluator, annotations, predictions,
+                class_label_map)
+  return challenge_evaluator.evaluate()
+
+
 def main(unused_argv):
   flags.mark_flag_as_required('input_annotations_boxes')
   flags.mark_flag_as_required('input_annotations_labels')
@@ -118,28 +224,10 @@ def main(unused_argv):
   all_annotations = pd.concat([all_location_annotations, all_label_annotations])
 
   class_label_map, categories = _load_labelmap(FLAGS.input_class_labelmap)
-  challenge_evaluator = (
-      object_detection_evaluation.OpenImagesChallengeEvaluator(
-          categories, evaluate_masks=is_instance_segmentation_eval))
-
   all_predictions = pd.read_csv(FLAGS.input_predictions)
-  images_processed = 0
-  for _, groundtruth in enumerate(all_annotations.groupby('ImageID')):
-    logging.info('Processing image %d', images_processed)
-    image_id, image_groundtruth = groundtruth
-    groundtruth_dictionary = utils.build_groundtruth_dictionary(
-        image_groundtruth, class_label_map)
-    challenge_evaluator.add_single_ground_truth_image_info(
-        image_id, groundtruth_dictionary)
-
-    prediction_dictionary = utils.build_predictions_dictionary(
-        all_predictions.loc[all_predictions['ImageID'] == image_id],
-        class_label_map)
-    challenge_evaluator.add_single_detected_image_info(image_id,
-                                                       prediction_dictionary)
-    images_processed += 1
-
-  metrics = challenge_evaluator.evaluate()
+  metrics = evaluate(all_annotations, all_predictions, class_label_map,
+                     categories, is_instance_segmentation_eval,
+                     FLAGS.num_workers)
 
   with open(FLAGS.output_metrics, 'w') as fid:
     io_utils.write_csv(fid, metrics)
@@ -0,0 +1,86 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""Tests for oid_challenge_evaluation."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import pandas as pd
+import tensorflow.compat.v1 as tf
+
+from object_detection.metrics import oid_challenge_evaluation
+
+
+def _create_fixture(num_images=7):
+  """Creates groundtruth and predictions with tied scores across images."""
+  rng = np.random.RandomState(0)
+  labels = ['/m/04bcr3', '/m/083vt']
+  box_rows = []
+  label_rows = []
+  prediction_rows = []
+  # The image ids are not sorted, as in the challenge CSVs.
+  for i in rng.permutation(num_images):
+    image_id = 'image%02d' % i
+    for label in labels:
+      label_rows.append([image_id, label, None, None, None, None, None, 1])
+      xmin, ymin = rng.uniform(0.0, 0.5, [2])
+      box_rows.append(
+          [image_id, label, xmin, xmin + 0.4, ymin, ymin + 0.4, 0, None])
+      for _ in range(2):
+        dx, dy = rng.uniform(-0.1, 0.1, [2])
+        # Few distinct scores, so that many detections have the same score.
+        score = rng.choice([0.3, 0.6, 0.9])
+        prediction_rows.append([
+            image_id, label, xmin + dx, xmin + dx + 0.4, ymin + dy,
+            ymin + dy + 0.4, score
+        ])
+  annotations = pd.DataFrame(
+      box_rows + label_rows,
+      columns=[
+          'ImageID', 'LabelName', 'XMin', 'XMax', 'YMin', 'YMax', 'IsGroupOf',
+          'ConfidenceImageLabel'
+      ])
+  predictions = pd.DataFrame(
+      prediction_rows,
+      columns=['ImageID', 'LabelName', 'XMin', 'XMax', 'YMin', 'YMax', 'Score'])
+  class_label_map = {label: i + 1 for i, label in enumerate(labels)}
+  categories = [{'id': i + 1, 'name': label} for i, label in enumerate(labels)]
+  return annotations, predictions, class_label_map, categories
+
+
+class OidChallengeEvaluationTest(tf.test.TestCase):
+
+  def testMultiProcessEvaluationMatchesSingleProcess(self):
+    annotations, predictions, class_label_map, categories = _create_fixture()
+    expected_metrics = oid_challenge_evaluation.evaluate(
+        annotations, predictions, class_label_map, categories)
+    self.assertGreater(
+        expected_metrics['OpenImagesDetectionChallenge_Precision/mAP@0.5IOU'],
+        0.0)
+
+    for num_workers in (2, 3):
+      metrics = oid_challenge_evaluation.evaluate(
+          annotations,
+          predictions,
+          class_label_map,
+          categories,
+          num_workers=num_workers)
+      self.assertEqual(metrics, expected_metrics)
+
+
+if __name__ == '__main__':
+  tf.test.main()
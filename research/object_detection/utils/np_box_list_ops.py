@@ -30,6 +30,11 @@ from object_detection.utils import np_box_list
 from object_detection.utils import np_box_ops
 
 
+# The number of boxes whose pairwise IOU is computed at once in
+# `_greedy_nms_indices`.
+_NMS_TILE_SIZE = 128
+
+
 class SortOrder(object):
   """Enum class for sort order.
 
@@ -212,29 +217,9 @@ def non_max_suppression(boxlist,
     else:
       return boxlist
 
-  boxes = boxlist.get()
-  num_boxes = boxlist.num_boxes()
-  # is_index_valid is True only for all remaining valid boxes,
-  is_index_valid = np.full(num_boxes, 1, dtype=bool)
-  selected_indices = []
-  num_output = 0
-  for i in range(num_boxes):
-    if num_output < max_output_size:
-      if is_index_valid[i]:
-        num_output += 1
-        selected_indices.append(i)
-        is_index_valid[i] = False
-        valid_indices = np.where(is_index_valid)[0]
-        if valid_indices.size == 0:
-          break
-
-        intersect_over_union = np_box_ops.iou(
-            np.expand_dims(boxes[i, :], axis=0), boxes[valid_indices, :])
-        intersect_over_union = np.squeeze(intersect_over_union, axis=0)
-        is_index_valid[valid_indices] = np.logical_and(
-            is_index_valid[valid_indices],
-            intersect_over_union <= iou_threshold)
-  return gather(boxlist, np.array(selected_indices))
+  selected_indices = _greedy_nms_indices(
+      boxlist.get(), iou_threshold, max_output_size)
+  return gather(boxlist, selected_indices)
 
 
 def multi_class_non_max_suppression(boxlist, score_thresh, iou_thresh,
@@ -291,21 +276,31 @@ def multi_class_non_max_suppression(boxlist, score_thresh, iou_thresh,
   if num_boxes != num_scores:
     raise ValueError('Incorrect scores field length: actual vs expected.')
 
-  selected_boxes_list = []
+  # Boxes of all classes are suppressed together, in class-major order and by
+  # decreasing score within each class, with a class mask on the IOU so that
+  # boxes of different classes never suppress each other.
+  candidate_indices = []
+  candidate_classes = []
   for class_idx in range(num_classes):
-    boxlist_and_class_scores = np_box_list.BoxList(boxlist.get())
-    class_scores = np.reshape(scores[0:num_scores, class_idx], [-1])
-    boxlist_and_class_scores.add_field('scores', class_scores)
-    boxlist_filt = filter_scores_greater_than(boxlist_and_class_scores,
-                                              score_thresh)
-    nms_result = non_max_suppression(boxlist_filt,
-                                     max_output_size=max_output_size,
-                                     iou_threshold=iou_thresh,
-                                     score_threshold=score_thresh)
-    nms_result.add_field(
-        'classes', np.zeros_like(nms_result.get_field('scores')) + class_idx)
-    selected_boxes_list.append(nms_result)
-  selected_boxes = concatenate(selected_boxes_list)
+    class_scores = scores[:, class_idx]
+    class_indices = np.where(np.greater(class_scores, score_thresh))[0]
+    class_indices = class_indices[np.argsort(class_scores[class_indices])[::-1]]
+    candidate_indices.append(class_indices)
+    candidate_classes.append(np.full(class_indices.size, class_idx))
+  candidate_indices = np.concatenate(candidate_indices)
+  candidate_classes = np.concatenate(candidate_classes)
+
+  selected = _greedy_nms_indices(
+      boxlist.get()[candidate_indices], iou_thresh, max_output_size,
+      classes=candidate_classes)
+  selected_boxes = np_box_list.BoxList(
+      boxlist.get()[candidate_indices[selected]])
+  selected_scores = scores[candidate_indices[selected],
+                           candidate_classes[selected]]
+  selected_boxes.add_field('scores', selected_scores)
+  selected_boxes.add_field(
+      'classes',
+      np.zeros_like(selected_scores) + candidate_classes[selected])
   sorted_boxes = sort_by_field(selected_boxes, 'scores')
   return sorted_boxes
 
@@ -561,3 +556,109 @@ def _update_valid_indices_by_removing_high_iou_boxes(
     selected_indices, is_index_valid, intersect_over_union, threshold):
   max_iou = np.max(intersect_over_union[:, selected_indices], axis=1)
   return np.logical_and(is_index_valid, max_iou <= threshold)
+
+
+def _pairwise_iou(boxes1, boxes2):
+  """Computes the same pairwise IOU as `np_box_ops.iou` with fewer copies."""
+  intersect = np.maximum(
+      np.minimum(boxes1[:, 2:3], boxes2[:, 2]) -
+      np.maximum(boxes1[:, 0:1], boxes2[:, 0]), 0., dtype=np.float64)
+  intersect *= np.maximum(
+      np.minimum(boxes1[:, 3:4], boxes2[:, 3]) -
+      np.maximum(boxes1[:, 1:2], boxes2[:, 1]), 0., dtype=np.float64)
+  intersect /= (
+      np.add.outer(np_box_ops.area(boxes1), np_box_ops.area(boxes2)) -
+      intersect)
+  return intersect
+
+
+def _greedy_nms_indices(boxes, iou_threshold, max_output_size, classes=None):
+  """Greedily selects boxes that do not overlap previously selected boxes.
+
+  The boxes are visited in tiles of `_NMS_TILE_SIZE`. The selection among the
+  boxes of a tile that are still valid is computed from their IOU matrix by
+  iterating "keep the boxes not suppressed by an earlier kept box" to its fixed
+  point. As the first box of a tile is always resolved and every iteration
+  resolves at least one more, this gives the same selection as visiting the
+  boxes one by one. The kept boxes of the tile then suppress the valid boxes of
+  later tiles at once.
+
+  Args:
+    boxes: a numpy array with shape [N, 4] holding N boxes in the order in
+      which they are visited, i.e. by decreasing score within each class.
+    iou_threshold: a box is suppressed by a selected box if their IOU is not
+      less than or equal to this threshold.
+    max_output_size: maximum number of boxes to select, per class if `classes`
+      is given.
+    classes: optional integer numpy array with shape [N] holding the class of
+      each box, in non-decreasing order. Boxes only suppress boxes of the same
+      class.
+
+  Returns:
+    an integer numpy array with the indices of the selected boxes in increasing
+    order.
+  """
+  num_boxes = boxes.shape[0]
+  if classes is None:
+    classes = np.zeros(num_boxes, dtype=np.int64)
+  if iou_threshold == 1.0:
+    selected = np.arange(num_boxes)
+  else:
+    is_valid = np.ones(num_boxes, dtype=bool)
+    num_selected_per_class = np.zeros(
+        np.max(classes) + 1 if num_boxes else 0, dtype=np.int64)
+    selected_tiles = []
+    for start in range(0, num_boxes, _NMS_TILE_SIZE):
+      end = start + _NMS_TILE_SIZE
+      tile = start + np.where(is_valid[start:end])[0]
+      if not tile.size:
+        continue
+      # suppresses[i, j] is True if box i of the tile suppresses box j when i
+      # is kept.
+      suppresses = np.triu(
+          np.logical_and(
+              np.logical_not(
+                  _pairwise_iou(boxes[tile], boxes[tile]) <= iou_threshold),
+              classes[tile][:, np.newaxis] == classes[tile][np.newaxis, :]),
+          k=1)
+      is_kept = np.ones(tile.size, dtype=bool)
+      while True:
+        new_is_kept = np.logical_not(np.any(suppresses[is_kept], axis=0))
+        if np.array_equal(new_is_kept, is_kept):
+          break
+        is_kept = new_is_kept
+      kept = tile[is_kept]
+      selected_tiles.append(kept)
+      num_selected_per_class += np.bincount(
+          classes[kept], minlength=num_selected_per_class.size)
+
+      # The remaining boxes of the classes that reached `max_output_size` are
+      # dropped instead of suppressed.
+      is_full = num_selected_per_class[classes[kept]] >= max_output_size
+      for class_idx in np.unique(classes[kept][is_full]):
+        is_valid[np.searchsorted(classes, class_idx):np.searchsorted(
+            classes, class_idx, side='right')] = False
+      kept = kept[np.logical_not(is_full)]
+      if not kept.size:
+        continue
+      # Only boxes up to the last one of the classes of the tile can be
+      # suppressed by the kept boxes.
+      classes_end = np.searchsorted(classes, classes[kept[-1]], side='right')
+      later = end + np.where(is_valid[end:classes_end])[0]
+      if later.size:
+        is_suppressed = np.logical_and(
+            np.logical_not(
+                _pairwise_iou(boxes[kept], boxes[later]) <= iou_threshold),
+            classes[kept][:, np.newaxis] == classes[later][np.newaxis, :])
+        is_valid[later[np.any(is_suppressed, axis=0)]] = False
+    selected = (np.concatenate(selected_tiles) if selected_tiles
+                else np.zeros(0, dtype=np.int64))
+
+  # Keeps the first `max_output_size` selected boxes of each class.
+  selected_classes = classes[selected]
+  order = np.argsort(selected_classes, kind='stable')
+  class_starts = np.searchsorted(selected_classes[order],
+                                 selected_classes[order])
+  rank_in_class = np.empty(selected.size, dtype=np.int64)
+  rank_in_class[order] = np.arange(selected.size) - class_starts
+  return selected[rank_in_class < max_output_size]
@@ -24,6 +24,7 @@ import tensorflow.compat.v1 as tf
 
 from object_detection.utils import np_box_list
 from object_detection.utils import np_box_list_ops
+from object_detection.utils import np_box_ops
 
 
 class AreaRelatedTest(tf.test.TestCase):
@@ -413,6 +414,52 @@ class NonMaximumSuppressionTest(tf.test.TestCase):
     self.assertAllClose(classes_clean, expected_classes)
     self.assertAllClose(boxes, expected_boxes)
 
+  def _random_boxes(self, num_boxes):
+    random_state = np.random.RandomState(0)
+    y_min_x_min = random_state.uniform(0, 100, size=(num_boxes, 2))
+    height_width = random_state.uniform(1, 20, size=(num_boxes, 2))
+    return np.concatenate([y_min_x_min, y_min_x_min + height_width], axis=1)
+
+  def test_nms_matches_greedy_selection_across_tiles(self):
+    boxes = self._random_boxes(1000)
+    scores = np.random.RandomState(1).uniform(size=1000)
+    boxlist = np_box_list.BoxList(boxes)
+    boxlist.add_field('scores', scores)
+    iou_threshold = 0.3
+
+    expected_indices = []
+    for i in np.argsort(-scores):
+      if len(expected_indices) == 200:
+        break
+      if not expected_indices or np.all(
+          np_box_ops.iou(boxes[i:i + 1], boxes[expected_indices]) <=
+          iou_threshold):
+        expected_indices.append(i)
+    nms_boxlist = np_box_list_ops.non_max_suppression(
+        boxlist, max_output_size=200, iou_threshold=iou_threshold)
+    self.assertAllEqual(nms_boxlist.get(), boxes[expected_indices])
+
+  def test_multiclass_nms_matches_nms_per_class(self):
+    boxes = self._random_boxes(1000)
+    scores = np.random.RandomState(1).uniform(size=(1000, 4))
+    boxlist = np_box_list.BoxList(boxes)
+    boxlist.add_field('scores', scores)
+
+    boxlist_clean = np_box_list_ops.multi_class_non_max_suppression(
+        boxlist, score_thresh=0.2, iou_thresh=0.3, max_output_size=50)
+    classes_clean = boxlist_clean.get_field('classes')
+    for class_idx in range(4):
+      class_boxlist = np_box_list.BoxList(boxes)
+      class_boxlist.add_field('scores', scores[:, class_idx])
+      expected_boxlist = np_box_list_ops.non_max_suppression(
+          class_boxlist, max_output_size=50, iou_threshold=0.3,
+          score_threshold=0.2)
+      self.assertAllEqual(boxlist_clean.get()[classes_clean == class_idx],
+                          expected_boxlist.get())
+      self.assertAllEqual(
+          boxlist_clean.get_field('scores')[classes_clean == class_idx],
+          expected_boxlist.get_field('scores'))
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -34,7 +34,9 @@ from __future__ import print_function
 from abc import ABCMeta
 from abc import abstractmethod
 import collections
+import copy
 import logging
+import multiprocessing
 import unicodedata
 import numpy as np
 import six
@@ -324,6 +326,27 @@ class ObjectDetectionEvaluator(DetectionEvaluator):
     if image_id in self._image_ids:
       logging.warning('Image with id %s already added.', image_id)
 
+    self._evaluation.add_single_ground_truth_image_info(
+        image_key=image_id,
+        **self._groundtruth_kwargs(image_id, groundtruth_dict))
+    self._image_ids.update([image_id])
+
+  def _groundtruth_kwargs(self, image_id, groundtruth_dict):
+    """Converts a groundtruth dictionary to `ObjectDetectionEvaluation` args.
+
+    Args:
+      image_id: A unique string/integer identifier for the image.
+      groundtruth_dict: A groundtruth dictionary as passed to
+        `add_single_ground_truth_image_info`.
+
+    Returns:
+      The keyword arguments of
+      `ObjectDetectionEvaluation.add_single_ground_truth_image_info` other than
+      `image_key`.
+
+    Raises:
+      ValueError: If instance masks are not in groundtruth dictionary.
+    """
     groundtruth_classes = (
         groundtruth_dict[standard_fields.InputDataFields.groundtruth_classes] -
         self._label_id_offset)
@@ -349,14 +372,12 @@ class ObjectDetectionEvaluator(DetectionEvaluator):
         raise ValueError('Instance masks not in groundtruth dictionary.')
       groundtruth_masks = groundtruth_dict[
           standard_fields.InputDataFields.groundtruth_instance_masks]
-    self._evaluation.add_single_ground_truth_image_info(
-        image_key=image_id,
+    return dict(
         groundtruth_boxes=groundtruth_dict[
             standard_fields.InputDataFields.groundtruth_boxes],
         groundtruth_class_labels=groundtruth_classes,
         groundtruth_is_difficult_list=groundtruth_difficult,
         groundtruth_masks=groundtruth_masks)
-    self._image_ids.update([image_id])
 
   def add_single_detected_image_info(self, image_id, detections_dict):
     """Adds detections for a single image to be used for evaluation.
@@ -376,6 +397,24 @@ class ObjectDetectionEvaluator(DetectionEvaluator):
           of shape [num_boxes, height, width] containing `num_boxes` masks of
           values ranging between 0 and 1.
 
+    Raises:
+      ValueError: If detection masks are not in detections dictionary.
+    """
+    self._evaluation.add_single_detected_image_info(
+        image_key=image_id, **self._detections_kwargs(detections_dict))
+
+  def _detections_kwargs(self, detections_dict):
+    """Converts a detections dictionary to `ObjectDetectionEvaluation` args.
+
+    Args:
+      detections_dict: A detections dictionary as passed to
+        `add_single_detected_image_info`.
+
+    Returns:
+      The keyword arguments of
+      `ObjectDetectionEvaluation.add_single_detected_image_info` other than
+      `image_key`.
+
     Raises:
       ValueError: If detection masks are not in detections dictionary.
     """
@@ -389,8 +428,7 @@ class ObjectDetectionEvaluator(DetectionEvaluator):
         raise ValueError('Detection masks not in detections dictionary.')
       detection_masks = detections_dict[
           standard_fields.DetectionResultFields.detection_masks]
-    self._evaluation.add_single_detected_image_info(
-        image_key=image_id,
+    return dict(
         detected_boxes=detections_dict[
             standard_fields.DetectionResultFields.detection_boxes],
         detected_scores=detections_dict[
@@ -398,6 +436,60 @@ class ObjectDetectionEvaluator(DetectionEvaluator):
         detected_class_labels=detection_classes,
         detected_masks=detection_masks)
 
+  def add_image_infos(self,
+                      image_infos,
+                      num_workers=0,
+                      images_per_chunk=256,
+                      max_pending_chunks_per_worker=2):
+    """Adds the groundtruth and detections of a stream of images.
+
+    The images are evaluated in chunks, possibly in parallel, see
+    `ObjectDetectionEvaluation.add_image_infos`. This gives the same metrics
+    as adding the groundtruth and detections of each image with the
+    `add_single_*` methods, without keeping the groundtruth of the images.
+
+    Args:
+      image_infos: an iterable of `(image_id, groundtruth_dict,
+        detections_dict)` tuples, one per image, with the dictionaries of
+        `add_single_ground_truth_image_info` and
+        `add_single_detected_image_info`. `detections_dict` is None if the
+        image has no detections.
+      num_workers: the number of worker processes. If 0 or 1, the images are
+        evaluated in this process.
+      images_per_chunk: the number of images evaluated per chunk.
+      max_pending_chunks_per_worker: the number of chunks per worker that can
+        be evaluated or waiting to be merged at a time.
+
+    Raises:
+      NotImplementedError: If a subclass overrides the `add_single_*` methods,
+        as their per-image logic would be bypassed.
+      ValueError: If instance or detection masks are missing when evaluating
+        masks.
+    """
+    if (type(self).add_single_ground_truth_image_info is not
+        ObjectDetectionEvaluator.add_single_ground_truth_image_info or
+        type(self).add_single_detected_image_info is not
+        ObjectDetectionEvaluator.add_single_detected_image_info):
+      raise NotImplementedError(
+          '{} does not support add_image_infos.'.format(type(self).__name__))
+
+    def _evaluation_image_infos():
+      for image_id, groundtruth_dict, detections_dict in image_infos:
+        if image_id in self._image_ids:
+          logging.warning('Image with id %s already added.', image_id)
+        groundtruth = self._groundtruth_kwargs(image_id, groundtruth_dict)
+        detections = None
+        if detections_dict is not None:
+          detections = self._detections_kwargs(detections_dict)
+        self._image_ids.update([image_id])
+        yield image_id, groundtruth, detections
+
+    self._evaluation.add_image_infos(
+        _evaluation_image_infos(),
+        num_workers=num_workers,
+        images_per_chunk=images_per_chunk,
+        max_pending_chunks_per_worker=max_pending_chunks_per_worker)
+
   def evaluate(self):
     """Compute evaluation result.
 
@@ -1078,6 +1170,32 @@ ObjectDetectionEvaluationState = collections.namedtuple(
     ])
 
 
+# The number of per-image score and tp/fp label arrays of a class after which
+# they are concatenated into a single array.
+_DETECTIONS_CHUNK_SIZE = 1024
+
+
+def _evaluate_image_chunk(template, image_infos):
+  """Evaluates a chunk of images with an empty copy of the template.
+
+  Args:
+    template: an `ObjectDetectionEvaluation` with the settings to evaluate the
+      images with, and no images.
+    image_infos: a list of `(image_key, groundtruth, detections)` tuples as
+      passed to `ObjectDetectionEvaluation.add_image_infos`.
+
+  Returns:
+    A tuple of the compact internal state of the evaluation of the chunk and
+    the image keys that have detections.
+  """
+  evaluation = template._empty_copy()  # pylint: disable=protected-access
+  for image_key, groundtruth, detections in image_infos:
+    evaluation.add_single_ground_truth_image_info(image_key, **groundtruth)
+    if detections is not None:
+      evaluation.add_single_detected_image_info(image_key, **detections)
+  return evaluation.get_internal_state(), evaluation.detection_keys
+
+
 class ObjectDetectionEvaluation(object):
   """Internal implementation of Pascal object detection metrics."""
 
@@ -1135,6 +1253,11 @@ class ObjectDetectionEvaluation(object):
     self.use_weighted_mean_ap = use_weighted_mean_ap
     self.label_id_offset = label_id_offset
 
+    self._initialize_groundtruth()
+    self._initialize_detections()
+
+  def _initialize_groundtruth(self):
+    """Initializes internal groundtruth data structures."""
     self.groundtruth_boxes = {}
     self.groundtruth_class_labels = {}
     self.groundtruth_masks = {}
@@ -1143,13 +1266,21 @@ class ObjectDetectionEvaluation(object):
     self.num_gt_instances_per_class = np.zeros(self.num_class, dtype=float)
     self.num_gt_imgs_per_class = np.zeros(self.num_class, dtype=int)
 
-    self._initialize_detections()
+  def _empty_copy(self):
+    """Returns an evaluation with the same settings and no images."""
+    evaluation = copy.copy(self)
+    evaluation._initialize_groundtruth()  # pylint: disable=protected-access
+    evaluation._initialize_detections()  # pylint: disable=protected-access
+    return evaluation
 
   def _initialize_detections(self):
     """Initializes internal data structures."""
     self.detection_keys = set()
     self.scores_per_class = [[] for _ in range(self.num_class)]
     self.tp_fp_labels_per_class = [[] for _ in range(self.num_class)]
+    # The number of leading entries of `scores_per_class[i]` and
+    # `tp_fp_labels_per_class[i]` that are already concatenated chunks.
+    self._num_detection_chunks_per_class = np.zeros(self.num_class, dtype=int)
     self.num_images_correctly_detected_per_class = np.zeros(self.num_class)
     self.average_precision_per_class = np.empty(self.num_class, dtype=float)
     self.average_precision_per_class.fill(np.nan)
@@ -1162,14 +1293,32 @@ class ObjectDetectionEvaluation(object):
   def clear_detections(self):
     self._initialize_detections()
 
+  def _compact_detections(self, class_index, num_chunks):
+    """Concatenates the score and tp/fp label arrays of a class.
+
+    Args:
+      class_index: the 0-indexed class to compact.
+      num_chunks: the number of leading arrays that are left as they are.
+    """
+    for values in (self.scores_per_class[class_index],
+                   self.tp_fp_labels_per_class[class_index]):
+      if len(values) > num_chunks + 1:
+        values[num_chunks:] = [np.concatenate(values[num_chunks:])]
+
   def get_internal_state(self):
     """Returns internal state of the evaluation.
 
     NOTE: that only evaluation results will be returned
-    (e.g. no raw predictions or groundtruth).
+    (e.g. no raw predictions or groundtruth). The scores and tp/fp labels of
+    each class are concatenated into at most one array, so that the state is
+    compact to serialize and merge across processes.
     Returns:
       internal state of the evaluation.
     """
+    for class_index in range(self.num_class):
+      self._compact_detections(class_index, num_chunks=0)
+    self._num_detection_chunks_per_class = np.array(
+        [len(scores) for scores in self.scores_per_class], dtype=int)
     return ObjectDetectionEvaluationState(
         self.num_gt_instances_per_class, self.scores_per_class,
         self.tp_fp_labels_per_class, self.num_gt_imgs_per_class,
@@ -1191,6 +1340,7 @@ class ObjectDetectionEvaluation(object):
     for i in range(self.num_class):
       self.scores_per_class[i].extend(scores_per_class[i])
       self.tp_fp_labels_per_class[i].extend(tp_fp_labels_per_class[i])
+      self._maybe_compact_detections(i)
       self.num_gt_instances_per_class[i] += num_gt_instances_per_class[i]
       self.num_gt_imgs_per_class[i] += num_gt_imgs_per_class[i]
       self.num_images_correctly_detected_per_class[
@@ -1329,9 +1479,94 @@ class ObjectDetectionEvaluation(object):
       if scores[i].shape[0] > 0:
         self.scores_per_class[i].append(scores[i])
         self.tp_fp_labels_per_class[i].append(tp_fp_labels[i])
+        self._maybe_compact_detections(i)
     (self.num_images_correctly_detected_per_class
     ) += is_class_correctly_detected_in_image
 
+  def _maybe_compact_detections(self, class_index):
+    """Concatenates the latest arrays of a class once there are enough.
+
+    Keeps the number of small per-image arrays held for a class bounded, while
+    every array is only copied once.
+
+    Args:
+      class_index: the 0-indexed class to compact.
+    """
+    num_chunks = self._num_detection_chunks_per_class[class_index]
+    if (len(self.scores_per_class[class_index]) - num_chunks >=
+        _DETECTIONS_CHUNK_SIZE):
+      self._compact_detections(class_index, num_chunks)
+      self._num_detection_chunks_per_class[class_index] += 1
+
+  def add_image_infos(self,
+                      image_infos,
+                      num_workers=0,
+                      images_per_chunk=256,
+                      max_pending_chunks_per_worker=2):
+    """Adds the groundtruth and detections of a stream of images.
+
+    The images are read from `image_infos` in chunks of `images_per_chunk`.
+    Each chunk is evaluated by an empty copy of this evaluation, in one of
+    `num_workers` spawned processes if `num_workers` > 1, and the compact
+    internal state of the copy is merged into this evaluation in the order of
+    the chunks, which gives the same metrics as adding the images one by one.
+    At most `max_pending_chunks_per_worker` chunks per worker are read ahead of
+    the merged ones, so the stream is never held in memory as a whole. Unlike
+    the `add_single_*` methods, the groundtruth of the images is not kept, and
+    images whose detections were already added are only reported, not skipped.
+
+    Args:
+      image_infos: an iterable of `(image_key, groundtruth, detections)`
+        tuples, one per image. `groundtruth` is a dictionary of the keyword
+        arguments of `add_single_ground_truth_image_info` other than
+        `image_key`, and `detections` is a dictionary of the keyword arguments
+        of `add_single_detected_image_info` other than `image_key`, or None if
+        the image has no detections.
+      num_workers: the number of worker processes. If 0 or 1, the chunks are
+        evaluated in this process.
+      images_per_chunk: the number of images evaluated per chunk.
+      max_pending_chunks_per_worker: the number of chunks per worker that can
+        be evaluated or waiting to be merged at a time.
+    """
+    def _chunks():
+      chunk = []
+      for image_info in image_infos:
+        chunk.append(image_info)
+        if len(chunk) == images_per_chunk:
+          yield chunk
+          chunk = []
+      if chunk:
+        yield chunk
+
+    def _merge(result):
+      state, image_keys = result
+      duplicate_keys = self.detection_keys & image_keys
+      if duplicate_keys:
+        logging.warning(
+            'images %s have already been added to the detection result '
+            'database', sorted(duplicate_keys))
+      self.detection_keys.update(image_keys)
+      self.merge_internal_state(state)
+
+    # The template is small, as it has no images, and is sent with every chunk.
+    template = self._empty_copy()
+    if num_workers <= 1:
+      for chunk in _chunks():
+        _merge(_evaluate_image_chunk(template, chunk))
+      return
+
+    max_pending_chunks = num_workers * max_pending_chunks_per_worker
+    # TensorFlow is not fork-safe, so the workers are spawned.
+    with multiprocessing.get_context('spawn').Pool(num_workers) as pool:
+      pending = collections.deque()
+      for chunk in _chunks():
+        if len(pending) >= max_pending_chunks:
+          _merge(pending.popleft().get())
+        pending.append(
+            pool.apply_async(_evaluate_image_chunk, (template, chunk)))
+      while pending:
+        _merge(pending.popleft().get())
+
   def _update_ground_truth_statistics(self, groundtruth_class_labels,
                                       groundtruth_is_difficult_list,
                                       groundtruth_is_group_of_list):
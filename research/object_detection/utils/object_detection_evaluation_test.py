@@ -524,6 +524,57 @@ class PascalEvaluationTest(tf.test.TestCase):
     pascal_evaluator.clear()
     self.assertFalse(pascal_evaluator._image_ids)
 
+  def test_add_image_infos_matches_adding_single_images(self):
+    categories = [{'id': 1, 'name': 'cat'},
+                  {'id': 2, 'name': 'dog'},
+                  {'id': 3, 'name': 'elephant'}]
+    random_state = np.random.RandomState(0)
+    image_infos = []
+    for i in range(30):
+      gt_min = random_state.uniform(0, 50, size=(3, 2))
+      det_min = gt_min + random_state.uniform(-2, 2, size=(3, 2))
+      groundtruth_dict = {
+          standard_fields.InputDataFields.groundtruth_boxes:
+              np.concatenate([gt_min, gt_min + 10], axis=1),
+          standard_fields.InputDataFields.groundtruth_classes:
+              random_state.randint(1, 4, size=3),
+      }
+      detections_dict = {
+          standard_fields.DetectionResultFields.detection_boxes:
+              np.concatenate([det_min, det_min + 10], axis=1),
+          standard_fields.DetectionResultFields.detection_scores:
+              random_state.uniform(size=3),
+          standard_fields.DetectionResultFields.detection_classes:
+              random_state.randint(1, 4, size=3),
+      }
+      # Some images have no detections.
+      image_infos.append(
+          ('img%d' % i, groundtruth_dict, detections_dict if i % 4 else None))
+
+    pascal_evaluator = object_detection_evaluation.PascalDetectionEvaluator(
+        categories)
+    for image_id, groundtruth_dict, detections_dict in image_infos:
+      pascal_evaluator.add_single_ground_truth_image_info(
+          image_id, groundtruth_dict)
+      if detections_dict is not None:
+        pascal_evaluator.add_single_detected_image_info(
+            image_id, detections_dict)
+    expected_metrics = pascal_evaluator.evaluate()
+
+    for num_workers in (0, 2):
+      pascal_evaluator = object_detection_evaluation.PascalDetectionEvaluator(
+          categories)
+      pascal_evaluator.add_image_infos(
+          iter(image_infos), num_workers=num_workers, images_per_chunk=7)
+      self.assertAllClose(expected_metrics, pascal_evaluator.evaluate())
+      self.assertLen(pascal_evaluator._image_ids, len(image_infos))
+
+  def test_add_image_infos_is_not_supported_with_custom_image_logic(self):
+    evaluator = object_detection_evaluation.OpenImagesDetectionEvaluator(
+        [{'id': 1, 'name': 'cat'}])
+    with self.assertRaises(NotImplementedError):
+      evaluator.add_image_infos([])
+
 
 class WeightedPascalEvaluationTest(tf.test.TestCase):
 
@@ -1054,6 +1105,65 @@ class ObjectDetectionEvaluationTest(tf.test.TestCase):
     self.assertAlmostEqual(copy_mean_ap, mean_ap)
     self.assertAlmostEqual(copy_mean_corloc, mean_corloc)
 
+  def _random_image_infos(self, num_images, num_classes):
+    random_state = np.random.RandomState(0)
+    image_infos = []
+    for i in range(num_images):
+      num_gt = random_state.randint(1, 5)
+      num_det = random_state.randint(0, 8)
+      gt_min = random_state.uniform(0, 50, size=(num_gt, 2))
+      det_min = random_state.uniform(0, 50, size=(num_det, 2))
+      groundtruth = {
+          'groundtruth_boxes':
+              np.concatenate([gt_min, gt_min + 10], axis=1),
+          'groundtruth_class_labels':
+              random_state.randint(0, num_classes, size=num_gt),
+      }
+      detections = {
+          'detected_boxes':
+              np.concatenate([det_min, det_min + 10], axis=1),
+          'detected_scores':
+              random_state.uniform(size=num_det),
+          'detected_class_labels':
+              random_state.randint(0, num_classes, size=num_det),
+      }
+      image_infos.append(('img%d' % i, groundtruth, detections))
+    return image_infos
+
+  def test_add_image_infos_matches_adding_single_images(self):
+    image_infos = self._random_image_infos(num_images=50, num_classes=3)
+    od_eval = object_detection_evaluation.ObjectDetectionEvaluation(3)
+    for image_key, groundtruth, detections in image_infos:
+      od_eval.add_single_ground_truth_image_info(image_key, **groundtruth)
+      od_eval.add_single_detected_image_info(image_key, **detections)
+    expected_metrics = od_eval.evaluate()
+
+    for num_workers in (0, 2):
+      streaming_od_eval = object_detection_evaluation.ObjectDetectionEvaluation(
+          3)
+      streaming_od_eval.add_image_infos(
+          iter(image_infos), num_workers=num_workers, images_per_chunk=7)
+      metrics = streaming_od_eval.evaluate()
+      self.assertEqual(streaming_od_eval.detection_keys, od_eval.detection_keys)
+      self.assertAllClose(metrics.average_precisions,
+                          expected_metrics.average_precisions)
+      self.assertAllClose(metrics.corlocs, expected_metrics.corlocs)
+      for i in range(3):
+        self.assertAllClose(metrics.precisions[i],
+                            expected_metrics.precisions[i])
+        self.assertAllClose(metrics.recalls[i], expected_metrics.recalls[i])
+
+  def test_get_internal_state_is_compact(self):
+    image_infos = self._random_image_infos(num_images=20, num_classes=3)
+    od_eval = object_detection_evaluation.ObjectDetectionEvaluation(3)
+    for image_key, groundtruth, detections in image_infos:
+      od_eval.add_single_ground_truth_image_info(image_key, **groundtruth)
+      od_eval.add_single_detected_image_info(image_key, **detections)
+    state = od_eval.get_internal_state()
+    for i in range(od_eval.num_class):
+      self.assertLessEqual(len(state.scores_per_class[i]), 1)
+      self.assertLessEqual(len(state.tp_fp_labels_per_class[i]), 1)
+
 
 @unittest.skipIf(tf_version.is_tf2(), 'Eval Metrics ops are supported in TF1.X '
                  'only.')